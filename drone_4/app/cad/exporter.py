@@ -1,7 +1,22 @@
 import os
+import json
+import shutil
+import hashlib
+import numpy as np
 import cadquery as cq
 from app.cad.assembly import DroneAssembler
 
+# Optional: Convex hull collision meshes
+try:
+    from scipy.spatial import ConvexHull
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# Bump when the collision geometry recipe changes (invalidates the cache)
+COLLISION_CACHE_VERSION = 1
+COLLISION_MODES = ("hull", "box", "mesh")
+
 class URDFExporter:
     """
     Exports a DroneAssembler configuration to a URDF file + STL meshes.
@@ -29,7 +44,110 @@ class URDFExporter:
         
         return f'<inertia ixx="{ixx:.8f}" ixy="0" ixz="0" iyy="{iyy:.8f}" iyz="0" izz="{izz:.8f}"/>'
 
-    def export(self, output_dir="static/urdf_test"):
+    def _spec_hash(self, mode):
+        """Cache key: everything that changes the base link shape."""
+        key = {
+            "specs": self.specs,
+            "motor_mount": self.assembler.motor_mount,
+            "arm_thick": self.assembler.arm_thick,
+            "offset": self.assembler.offset,
+            "mode": mode,
+            "version": COLLISION_CACHE_VERSION
+        }
+        blob = json.dumps(key, sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+    def _write_hull_stl(self, shape, path, tolerance=0.5):
+        """Convex hull of the tessellated shape as a binary STL (mm, outward normals)."""
+        vertices, _ = shape.val().tessellate(tolerance)
+        points = np.array([[v.x, v.y, v.z] for v in vertices])
+        hull = ConvexHull(points)
+
+        tris = points[hull.simplices] # (F, 3, 3)
+        normals = hull.equations[:, :3]
+        # Qhull doesn't orient simplices, flip the ones facing inward
+        inward = np.einsum("ij,ij->i", np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0]), normals) < 0
+        tris[inward] = tris[inward][:, [0, 2, 1]]
+
+        # Binary STL (PyBullet's loader doesn't read ASCII): 80B header, count, 50B per facet
+        record = np.dtype([("normal", "<f4", 3), ("v", "<f4", (3, 3)), ("attr", "<u2")])
+        data = np.zeros(len(tris), dtype=record)
+        data["normal"] = normals
+        data["v"] = tris
+        with open(path, "wb") as f:
+            f.write(b"collision_hull".ljust(80, b" "))
+            f.write(np.uint32(len(tris)).tobytes())
+            f.write(data.tobytes())
+        return len(tris)
+
+    def _collision_geometry(self, base_link, output_dir, mode, cache_dir):
+        """
+        Simplified base-link collision, computed once per design and cached by spec hash.
+
+        Returns:
+            (geometry_xml, origin_xyz) for the base link <collision>
+        """
+        if mode == "mesh":
+            return '<mesh filename="base.stl" scale="0.001 0.001 0.001"/>', "0 0 0"
+
+        if mode == "hull" and not HAS_SCIPY:
+            print("⚠️  WARNING: 'scipy' not installed. Falling back to box collision.")
+            mode = "box"
+
+        key = self._spec_hash(mode)
+        entry_path = os.path.join(cache_dir, f"{key}.json") if cache_dir else None
+        entry = None
+        if entry_path and os.path.exists(entry_path):
+            with open(entry_path, "r") as f:
+                entry = json.load(f)
+            if mode == "hull" and not os.path.exists(os.path.join(cache_dir, entry.get("mesh", ""))):
+                entry = None # Mesh went missing, rebuild
+
+        if entry:
+            print(f"   ♻️  Collision cache hit ({mode}, {key})")
+        else:
+            print(f"   🧱 computing_{mode}_collision...")
+            bb = base_link.val().BoundingBox()
+            entry = {
+                "mode": mode,
+                # Meters, centered on the bounding box
+                "center_m": [(bb.xmin + bb.xmax) / 2000.0, (bb.ymin + bb.ymax) / 2000.0, (bb.zmin + bb.zmax) / 2000.0],
+                "size_m": [(bb.xmax - bb.xmin) / 1000.0, (bb.ymax - bb.ymin) / 1000.0, (bb.zmax - bb.zmin) / 1000.0]
+            }
+            if mode == "hull":
+                hull_dir = cache_dir or output_dir
+                os.makedirs(hull_dir, exist_ok=True)
+                entry["mesh"] = f"{key}_hull.stl"
+                entry["facets"] = self._write_hull_stl(base_link, os.path.join(hull_dir, entry["mesh"]))
+            if entry_path:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(entry_path, "w") as f:
+                    json.dump(entry, f, indent=2)
+
+        if mode == "hull":
+            # URDF mesh paths are relative to the URDF, so the hull travels with it
+            src = os.path.join(cache_dir or output_dir, entry["mesh"])
+            dst = os.path.join(output_dir, "collision.stl")
+            if os.path.abspath(src) != os.path.abspath(dst):
+                shutil.copyfile(src, dst)
+            return '<mesh filename="collision.stl" scale="0.001 0.001 0.001"/>', "0 0 0"
+
+        # Box primitives are centered on their origin
+        sx, sy, sz = entry["size_m"]
+        cx, cy, cz = entry["center_m"]
+        return f'<box size="{sx:.5f} {sy:.5f} {sz:.5f}"/>', f"{cx:.5f} {cy:.5f} {cz:.5f}"
+
+    def export(self, output_dir="static/urdf_test", collision="hull", cache_dir="static/collision_cache"):
+        """
+        Args:
+            output_dir: Where drone.urdf + meshes are written
+            collision: Base link collision geometry. "hull" (convex hull, needs scipy),
+                       "box" (bounding box primitive) or "mesh" (full visual mesh, slowest)
+            cache_dir: Collision geometry cache (keyed by spec hash). None disables it.
+        """
+        if collision not in COLLISION_MODES:
+            raise ValueError(f"Unknown collision mode '{collision}'. Use one of {COLLISION_MODES}")
+
         print(f"   📂 Exporting Simulation Assets to: {output_dir}")
         os.makedirs(output_dir, exist_ok=True)
         project_name = self.specs.get("name", "drone")
@@ -72,6 +190,9 @@ class URDFExporter:
         base_mass_kg = 0.450 # 450g Frame+Electronics
         base_inertia = self._get_inertia_xml(base_link, base_mass_kg)
 
+        # Collision stays cheap: the detailed mesh is for visuals only
+        base_collision, base_collision_xyz = self._collision_geometry(base_link, output_dir, collision, cache_dir)
+
         # --- 2. GENERATE PROP LINK (Moving Parts) ---
         print("   💨 generating_propellers...")
         from app.cad.components import Propeller
@@ -110,9 +231,9 @@ class URDFExporter:
       </material>
     </visual>
     <collision>
-      <origin rpy="0 0 0" xyz="0 0 0"/>
+      <origin rpy="0 0 0" xyz="{base_collision_xyz}"/>
       <geometry>
-        <mesh filename="base.stl" scale="0.001 0.001 0.001"/>
+        {base_collision}
       </geometry>
     </collision>
   </link>
@@ -21,6 +21,15 @@ class Settings:
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
     GOOGLE_SEARCH_ENGINE_ID: str = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
     
+    # Scrape cache (see app/services/scrape_cache.py): readwrite | refresh | offline | off
+    SCRAPE_CACHE_DIR: str = os.getenv("SCRAPE_CACHE_DIR", "scrape_cache")
+    SCRAPE_CACHE_MODE: str = os.getenv("SCRAPE_CACHE_MODE", "readwrite")
+    
+    # Search layer (see app/services/search_service.py): google | replay
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "google")
+    SEARCH_CACHE_DIR: str = os.getenv("SEARCH_CACHE_DIR", "search_cache")
+    SEARCH_DAILY_QUOTA: int = int(os.getenv("SEARCH_DAILY_QUOTA", "100"))
+    
     # Celery / Redis
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
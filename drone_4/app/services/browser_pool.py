@@ -0,0 +1,294 @@
+# FILE: app/services/browser_pool.py
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+# --- CONFIGURATION ---
+POOL_BROWSERS = 2             # Chromium processes kept alive for the whole run
+CONTEXTS_PER_BROWSER = 4      # Concurrent pages per browser (one page per context)
+PAGE_MAX_USES = 25            # Recycle a page after this many borrows (leaks, stale state)
+
+# Launch options to improve success rate against simple bot detection
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+HTTP_TIMEOUT_S = 10.0
+HTTP_MAX_CONNECTIONS = 20
+# Desktop viewport (mobile views often hide technical spec tables behind accordions)
+VIEWPORT = {"width": 1920, "height": 1080}
+
+# --- REQUEST INTERCEPTION ---
+# Profiles: resource types aborted in the browser + whether tracker / ad hosts are cut.
+# Documents, XHR/fetch and first-party scripts always go through (JS-built spec tables).
+BLOCK_PROFILES = {
+    "scrape": {"types": {"image", "media", "font", "stylesheet", "texttrack", "manifest", "other"}, "trackers": True},
+    "visual": {"types": {"media", "font", "texttrack", "manifest"}, "trackers": True}, # Screenshots need images + CSS
+    "none": {"types": set(), "trackers": False}
+}
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "adservice.google", "facebook.net", "connect.facebook", "hotjar.com", "clarity.ms", "klaviyo.com",
+    "tiktok.com", "snapchat.com", "pinterest.com", "bat.bing.com", "criteo", "segment.io", "segment.com",
+    "intercom", "zendesk", "trustpilot", "yotpo", "judge.me", "gorgias", "newrelic", "sentry.io"
+)
+MAX_CAPTURED_IMAGES = 64
+
+# Network-idle heuristic: done when no request has been in flight for NETWORK_IDLE_MS
+NETWORK_IDLE_MS = 500
+NETWORK_IDLE_TIMEOUT_MS = 5000
+NETWORK_IDLE_POLL_MS = 50
+
+class _Slot:
+    """One borrowable context (and its recycled page) on one of the pool's browsers."""
+    def __init__(self, browser_idx):
+        self.browser_idx = browser_idx
+        self.generation = -1 # Browser launch the context belongs to
+        self.context = None
+        self.page = None
+        self.uses = 0
+        self.profile = BLOCK_PROFILES["none"]
+        self.images = []       # Image URLs seen (and blocked) during the current borrow
+        self.inflight = 0      # Requests in flight on the page
+        self.last_activity = 0.0
+
+class BrowserPool:
+    """
+    Process-wide pool of headless Chromium browsers (N browsers x M contexts).
+    Browser startup is a multi-second fixed cost, so browsers are launched once,
+    lazily, and every scraper / refinery / data lookup borrows a page from them.
+
+    - Pages are reused between borrows and recycled after PAGE_MAX_USES.
+    - A crashed (disconnected) browser is relaunched on the next borrow.
+    - A page whose borrower raised is discarded, so a wedged tab never gets handed out again.
+    """
+    def __init__(self, browsers=POOL_BROWSERS, contexts_per_browser=CONTEXTS_PER_BROWSER,
+                 page_max_uses=PAGE_MAX_USES, headless=True):
+        self.n_browsers = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.page_max_uses = page_max_uses
+        self.headless = headless
+
+        self.playwright = None
+        self.browsers = [None] * browsers
+        self.generations = [0] * browsers
+        self._slots = None
+        self._start_lock = asyncio.Lock()
+        self._launch_locks = [asyncio.Lock() for _ in range(browsers)]
+        self._page_slots = {}
+        self.stats = {"launches": 0, "crashes": 0, "borrows": 0, "pages_opened": 0, "requests_blocked": 0}
+
+    async def start(self):
+        """Starts Playwright and fills the slot queue (browsers launch on first use)."""
+        if self._slots is not None: return self
+        async with self._start_lock:
+            if self._slots is None:
+                self.playwright = await async_playwright().start()
+                slots = asyncio.Queue()
+                # Interleave browsers so concurrent borrowers spread across processes
+                for _ in range(self.contexts_per_browser):
+                    for idx in range(self.n_browsers):
+                        slots.put_nowait(_Slot(idx))
+                self._slots = slots
+        return self
+
+    async def _browser(self, idx):
+        """The live browser for a slot index, (re)launching it if needed."""
+        browser = self.browsers[idx]
+        if browser is not None and browser.is_connected(): return browser
+        async with self._launch_locks[idx]:
+            browser = self.browsers[idx]
+            if browser is None or not browser.is_connected():
+                if browser is not None:
+                    self.stats["crashes"] += 1
+                    print(f"   ⚠️  Browser {idx} disconnected. Relaunching...")
+                browser = await self.playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+                self.browsers[idx] = browser
+                self.generations[idx] += 1
+                self.stats["launches"] += 1
+        return browser
+
+    async def _prepare(self, slot):
+        """Returns the slot's page, rebuilding the context / page when stale."""
+        browser = await self._browser(slot.browser_idx)
+        if slot.context is None or slot.generation != self.generations[slot.browser_idx]:
+            slot.context = await browser.new_context(viewport=VIEWPORT, user_agent=USER_AGENT)
+            slot.generation = self.generations[slot.browser_idx]
+            slot.page = None
+
+        if slot.page is not None and (slot.page.is_closed() or slot.uses >= self.page_max_uses):
+            await self._discard_page(slot)
+        if slot.page is None:
+            slot.page = await self._new_page(slot)
+            slot.uses = 0
+            self.stats["pages_opened"] += 1
+        slot.uses += 1
+        return slot.page
+
+    async def _new_page(self, slot):
+        """Opens a page with the interception route and in-flight request tracking installed."""
+        page = await slot.context.new_page()
+        loop = asyncio.get_running_loop()
+
+        def started(_):
+            slot.inflight += 1
+            slot.last_activity = loop.time()
+
+        def finished(_):
+            slot.inflight = max(slot.inflight - 1, 0)
+            slot.last_activity = loop.time()
+
+        page.on("request", started)
+        page.on("requestfinished", finished)
+        page.on("requestfailed", finished)
+        await page.route("**/*", lambda route: self._route(slot, route))
+        slot.inflight, slot.last_activity = 0, loop.time()
+        self._page_slots[page] = slot
+        return page
+
+    async def _route(self, slot, route):
+        """Aborts requests the borrower's profile blocks; images are recorded, not downloaded."""
+        request = route.request
+        profile = slot.profile
+        if request.resource_type in profile["types"] or \
+                (profile["trackers"] and any(host in request.url for host in TRACKER_HOSTS)):
+            if request.resource_type == "image" and len(slot.images) < MAX_CAPTURED_IMAGES:
+                slot.images.append(request.url)
+            self.stats["requests_blocked"] += 1
+            try: await route.abort()
+            except Exception: pass # Page closed / navigated meanwhile
+            return
+        try: await route.continue_()
+        except Exception: pass
+
+    def captured_images(self, page):
+        """Image URLs the page requested during this borrow (blocked ones included)."""
+        slot = self._page_slots.get(page)
+        return list(slot.images) if slot else []
+
+    async def wait_for_idle(self, page, idle_ms=NETWORK_IDLE_MS, timeout_ms=NETWORK_IDLE_TIMEOUT_MS):
+        """
+        Waits until no request has been in flight for idle_ms (or timeout_ms passes).
+        Replaces fixed sleeps after navigation / scrolling / clicks.
+
+        Returns:
+            True if the page went idle, False on timeout
+        """
+        slot = self._page_slots.get(page)
+        if slot is None:
+            await asyncio.sleep(idle_ms / 1000.0)
+            return True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_ms / 1000.0
+        while loop.time() < deadline:
+            if slot.inflight == 0 and loop.time() - slot.last_activity >= idle_ms / 1000.0:
+                return True
+            await asyncio.sleep(NETWORK_IDLE_POLL_MS / 1000.0)
+        return False
+
+    async def _discard_page(self, slot):
+        page, slot.page = slot.page, None
+        if page is not None:
+            self._page_slots.pop(page, None)
+        if page is not None and not page.is_closed():
+            try: await page.close()
+            except Exception: pass
+
+    @asynccontextmanager
+    async def page(self, profile="none"):
+        """
+        Borrows a page for the duration of the block.
+
+        Args:
+            profile: Request interception profile (BLOCK_PROFILES key)
+
+        Usage:
+            async with pool.page("scrape") as page:
+                await page.goto(url)
+        """
+        await self.start()
+        slot = await self._slots.get()
+        self.stats["borrows"] += 1
+        try:
+            page = await self._prepare(slot)
+            slot.profile = BLOCK_PROFILES[profile]
+            slot.images = []
+            yield page
+        except BaseException:
+            await self._discard_page(slot)
+            raise
+        finally:
+            self._slots.put_nowait(slot)
+
+    async def close(self):
+        """Closes every browser and stops Playwright."""
+        for idx, browser in enumerate(self.browsers):
+            if browser is not None:
+                try: await browser.close()
+                except Exception: pass
+            self.browsers[idx] = None
+        self._page_slots.clear()
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+        self._slots = None
+
+# --- SHARED POOL ---
+# One pool per event loop (asyncio.run() in scripts / Celery tasks starts a fresh loop)
+_POOL = None
+_POOL_LOOP = None
+
+def get_browser_pool():
+    """The shared BrowserPool of the running event loop (created on first call)."""
+    global _POOL, _POOL_LOOP
+    loop = asyncio.get_running_loop()
+    if _POOL is None or _POOL_LOOP is not loop:
+        _POOL, _POOL_LOOP = BrowserPool(), loop
+    return _POOL
+
+async def close_browser_pool():
+    """Shuts the shared pool and HTTP client down (call once at the end of a run)."""
+    global _POOL, _POOL_LOOP
+    pool, _POOL, _POOL_LOOP = _POOL, None, None
+    if pool is not None:
+        print(f"   🧹 Browser pool closed: {pool.stats['launches']} launches, {pool.stats['borrows']} pages served, "
+              f"{pool.stats['requests_blocked']} requests blocked.")
+        await pool.close()
+    await close_http_client()
+
+# --- SHARED HTTP CLIENT ---
+# Keep-alive connection pool for static (no browser) fetches, one per event loop
+_HTTP_CLIENT = None
+_HTTP_LOOP = None
+
+def get_http_client():
+    """The shared httpx.AsyncClient of the running event loop (browser-like headers)."""
+    global _HTTP_CLIENT, _HTTP_LOOP
+    if not HAS_HTTPX:
+        raise RuntimeError("httpx is not installed (pip install httpx)")
+    loop = asyncio.get_running_loop()
+    if _HTTP_CLIENT is None or _HTTP_LOOP is not loop:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
+                     "Accept-Language": "en-US,en;q=0.9"},
+            follow_redirects=True, timeout=HTTP_TIMEOUT_S,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS))
+        _HTTP_LOOP = loop
+    return _HTTP_CLIENT
+
+async def close_http_client():
+    global _HTTP_CLIENT, _HTTP_LOOP
+    client, _HTTP_CLIENT, _HTTP_LOOP = _HTTP_CLIENT, None, None
+    if client is not None:
+        await client.aclose()
+
+async def run_with_browser_pool(coro):
+    """Runs a coroutine and closes the shared browser pool afterwards (wrap for asyncio.run)."""
+    try:
+        return await coro
+    finally:
+        await close_browser_pool()
@@ -2,7 +2,7 @@
 import asyncio
 import re
 from bs4 import BeautifulSoup
-from app.services.search_service import find_components
+from app.services.search_service import find_components_async
 from app.services.recon_service import Scraper
 
 # A whitelist of trusted sources for motor thrust data.
@@ -87,7 +87,7 @@ async def find_thrust_data(motor_name: str, prop_size_inch: float) -> dict | Non
     clean_motor_name = re.sub(r'(\d{4}).*', r'\1', motor_name).strip()
     
     query = f'"{clean_motor_name}" {prop_size_inch} inch propeller thrust test data'
-    search_results = find_components(query, limit=5)
+    search_results = await find_components_async(query, limit=5)
 
     # Prioritize results from our trusted domain list
     prioritized_urls = [
@@ -107,16 +107,10 @@ async def find_thrust_data(motor_name: str, prop_size_inch: float) -> dict | Non
                 if not scraped_data or not scraped_data.get('text'):
                     continue
                 
-                # We need the raw HTML for table parsing, which recon_service doesn't provide.
-                # A better long-term solution would be to make scrape_product_page return HTML.
-                # For now, we can infer it from the text (less reliable). A direct scrape would be better.
-                # Let's assume for this implementation we have a way to get the full HTML.
-                # A more realistic implementation would require modifying the scraper.
-                # Let's mock this by re-scraping for the full content.
-                page = await scraper.browser.new_page()
-                await page.goto(url, timeout=20000)
-                html_content = await page.content()
-                await page.close()
+                # Raw HTML for table parsing (from the scrape cache, no second page load)
+                html_content = await scraper.fetch_html(url)
+                if not html_content:
+                    continue
 
                 thrust_table = await _parse_thrust_table(html_content)
                 if thrust_table:
@@ -4,7 +4,7 @@ import json
 from app.services.recon_service import Scraper
 from app.services.vision_service import analyze_specs_multimodal  # UPDATED IMPORT
 from app.services.library_service import infer_motor_mounting, extract_prop_diameter
-from app.services.search_service import find_components
+from app.services.search_service import find_components_async
 from app.services.ai_service import generate_vision_prompt 
 
 # ... (Keep DOMAIN_BLOCKLIST and validate_critical_specs as they were) ...
@@ -130,7 +130,7 @@ async def fuse_component_data(part_type: str, search_query: str, search_limit: i
         return None
 
     # STEP 2: Find candidates
-    results = find_components(search_query, limit=search_limit)
+    results = await find_components_async(search_query, limit=search_limit)
     if not results: 
         return None
 
@@ -2,6 +2,8 @@
 import re
 import math
 import numpy as np
+from app.sim.curves import compile_curve
+from app.sim.battery import battery_params_from_specs
 
 # --- CONFIGURATION ---
 GRAVITY = 9.81
@@ -49,14 +51,28 @@ def _calculate_auw(bom):
     # Add 10% overhead for wires, straps, solder, tape
     return total_g * 1.1
 
+def _motor_thrust_table(motor_item):
+    """Measured thrust table on the motor, if sourcing found one (data_service or refine_arsenal format)."""
+    specs = (motor_item or {}).get('specs') or {}
+    table = specs.get('thrust_table') or specs.get('thrust_data')
+    return table if isinstance(table, dict) else None
+
 def _estimate_max_thrust(motor_item, prop_item):
     """
     Estimates max thrust per motor in Grams.
-    In a full production version, this would query the data_service thrust tables.
-    Here we use a robust heuristic based on Stator Size and KV.
+    Uses the motor's measured thrust table when there is one, otherwise
+    a robust heuristic based on Stator Size and KV.
     """
     if not motor_item: return 1000.0 # Default fallback
     
+    table = _motor_thrust_table(motor_item)
+    if table:
+        try:
+            thrust_n, _ = compile_curve(table)
+            return thrust_n[-1] / 9.8 * 1000.0 # Back to grams (curves use the Aerodynamics 9.8 factor)
+        except ValueError:
+            pass # Unusable table, fall back to the heuristic
+
     specs = motor_item.get('specs', {})
     kv = _extract_number(specs.get('kv', 1700))
     # Try to parse stator size from model name (e.g., "2207")
@@ -139,6 +155,15 @@ def generate_physics_config(bom):
         }
     }
     
+    # Measured curve drives Aerodynamics / BatchDynamics directly (see app/sim/curves.py)
+    thrust_table = _motor_thrust_table(motors)
+    if thrust_table:
+        config["thrust_curve"] = thrust_table
+
+    # Pack parameters for the in-sim energy / voltage-sag model (see app/sim/battery.py)
+    if battery:
+        config["battery"] = battery_params_from_specs(battery.get('specs', {}))
+
     print(f"   📊 Physics Ready: Mass={mass_kg}kg, MaxForce={max_force_newtons}N, TWR={twr:.1f}")
     return config
 
@@ -1,107 +1,228 @@
 # FILE: app/services/recon_service.py
-from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-import asyncio
 import re
 import json
+from app.services.browser_pool import get_browser_pool, get_http_client, HAS_HTTPX
+from app.services.scrape_cache import get_scrape_cache
+
+# --- CONFIGURATION ---
+# A static (no-JS) fetch is good enough when it already has a price, an image and
+# either a spec table or a real amount of text; anything less escalates to Chromium.
+MIN_STATIC_TEXT_CHARS = 1500
+# Image URLs that are UI chrome rather than product shots
+UI_IMAGE_HINTS = ['icon', 'logo', 'button', 'rating', 'star', 'gif', 'loader', 'pixel']
+
+# _scrape_static() marker: the origin confirmed the cached copy (304)
+NOT_MODIFIED = "not_modified"
 
 class Scraper:
-    def __init__(self):
-        self.playwright = None
-        self.browser = None
+    """
+    Product page scraper. Borrows pages from the shared browser pool, so entering
+    and leaving the context is cheap; the browsers outlive it (see close_browser_pool).
+    Results and raw HTML go through the on-disk scrape cache (see scrape_cache).
+    """
+    def __init__(self, pool=None, cache=None):
+        self.pool = pool
+        self.cache = cache if cache is not None else get_scrape_cache()
 
     async def __aenter__(self):
-        self.playwright = await async_playwright().start()
-        # Launch options to improve success rate against simple bot detection
-        self.browser = await self.playwright.chromium.launch(
-            headless=True,
-            args=["--disable-blink-features=AutomationControlled"]
-        )
+        if self.pool is None:
+            self.pool = get_browser_pool()
+        if not (self.cache and self.cache.offline):
+            await self.pool.start()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.browser: await self.browser.close()
-        if self.playwright: await self.playwright.stop()
+        pass # Browsers belong to the pool
+
+    def page(self, profile="scrape"):
+        """
+        Borrows a pooled page (desktop viewport + UA preset): `async with scraper.page() as page:`
+        The default "scrape" profile blocks images, media, fonts, CSS and trackers (see BLOCK_PROFILES).
+        """
+        return self.pool.page(profile)
 
     async def scrape_product_page(self, url: str):
         print(f"🕵️  Deep Scraping: {url}")
-        page = await self.browser.new_page()
-        
-        # 1. Set Desktop Viewport (Crucial for Table Rendering)
-        # Mobile views often hide technical spec tables behind accordions
-        await page.set_viewport_size({"width": 1920, "height": 1080})
-        
-        await page.set_extra_http_headers({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-        })
 
+        # 0. Cache: fresh hit, or offline replay (re-parsed so extraction changes apply)
+        entry = self.cache.get(url) if self.cache else None
+        if self.cache and self.cache.offline:
+            return self._replay(entry, url)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.stats["hits"] += 1
+            print(f"   ♻️  Cache hit: {url}")
+            return entry["result"]
+        if self.cache: self.cache.stats["misses"] += 1
+
+        # 1. Fast path: plain HTTP GET (Shopify / WooCommerce ship JSON-LD, meta price and tables in the HTML)
+        #    Stale entries are revalidated with If-None-Match / If-Modified-Since
+        static, html, validators = await self._scrape_static(url, entry)
+        if static == NOT_MODIFIED:
+            self.cache.touch(entry)
+            print(f"   ♻️  Not modified (304): {url}")
+            return entry["result"]
+        if static and self._is_complete(static):
+            self._store(url, static, html, validators)
+            return static
+
+        # 2. Escalate: render in Chromium (JS-built pages, lazy galleries)
+        print(f"   🌐 Static HTML incomplete, rendering: {url}")
+        async with self.page() as page:
+            rendered, rendered_html = await self._scrape_page(page, url)
+        if rendered:
+            self._store(url, rendered, rendered_html, validators)
+            return rendered
+        if static:
+            self._store(url, static, html, validators)
+        return static
+
+    async def fetch_html(self, url: str):
+        """Raw HTML of a page, scraping it (through the cache) when needed."""
+        entry = self.cache.get(url) if self.cache else None
+        if entry is None or not (self.cache.offline or self.cache.is_fresh(entry)):
+            if self.cache is None:
+                async with self.page() as page:
+                    await page.goto(url, timeout=20000)
+                    return await page.content()
+            await self.scrape_product_page(url)
+            entry = self.cache.get(url)
+        return self.cache.load_html(entry) if entry else None
+
+    def _replay(self, entry, url):
+        """Offline mode: cached result, re-extracted from the stored HTML when available."""
+        if entry is None:
+            print(f"   📴 Offline: not cached, skipping {url}")
+            return None
+        self.cache.stats["hits"] += 1
+        html = self.cache.load_html(entry)
+        if not html:
+            return entry["result"]
+        result = self._parse_html(html, entry["url"], entry["result"].get("title") if entry["result"] else None)
+        result["fetch_method"] = "replay"
+        return result
+
+    def _store(self, url, result, html, validators):
+        if self.cache:
+            self.cache.put(url, result, html, **validators)
+
+    async def _scrape_static(self, url, entry=None):
+        """
+        Fetches and parses the page without a browser.
+
+        Returns:
+            (result, html, validators): result is None when not possible / not HTML,
+            NOT_MODIFIED when the cached entry is still current
+        """
+        if not HAS_HTTPX:
+            print("   ⚠️  WARNING: 'httpx' not installed. Skipping the static fetch path.")
+            return None, None, {}
+        try:
+            headers = self.cache.validators(entry) if self.cache else {}
+            response = await get_http_client().get(url, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                return NOT_MODIFIED, None, {}
+            validators = {"etag": response.headers.get("etag"), "last_modified": response.headers.get("last-modified")}
+            if response.status_code != 200 or "html" not in response.headers.get("content-type", "html"):
+                return None, None, validators
+            result = self._parse_html(response.text, str(response.url))
+            result["fetch_method"] = "http"
+            return result, response.text, validators
+        except Exception as e:
+            print(f"   ⚠️  Static fetch failed ({url}): {e}")
+            return None, None, {}
+
+    def _is_complete(self, result):
+        """Does a static scrape carry the critical data (price, image, specs)?"""
+        has_specs = bool(result.get("structured_tables")) or len(result.get("text", "")) >= MIN_STATIC_TEXT_CHARS
+        return result.get("price") is not None and bool(result.get("image_url")) and has_specs
+
+    async def _scrape_page(self, page, url):
+        # Desktop viewport + user agent are preset on the pooled context
         try:
             await page.goto(url, timeout=30000, wait_until="domcontentloaded")
             
             # 2. Scroll to Bottom (Trigger Lazy Loading)
             # Many sites (GetFPV, RDQ) lazy load images in the description
             await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await asyncio.sleep(1.5) # Wait for network requests to settle
+            await self.pool.wait_for_idle(page) # Until lazy-load / XHR traffic settles
 
             content = await page.content()
             title = await page.title()
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # --- STRATEGY A: STRUCTURED TABLE EXTRACTION ---
-            # Extract raw <table> data before we clean the soup
-            tables_data = []
-            for table in soup.find_all("table"):
-                rows = []
-                for tr in table.find_all("tr"):
-                    # Get both th and td
-                    cells = [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
-                    # Only keep rows that look like key-value pairs or data headers
-                    if len(cells) >= 2:
-                        rows.append(" : ".join(cells))
-                
-                if rows:
-                    tables_data.append("\n".join(rows))
-            
-            structured_specs = "\n--- TABLE DATA ---\n".join(tables_data)
+            result = self._parse_html(content, page.url, title)
+            result["fetch_method"] = "browser"
 
-            # --- STRATEGY B: MULTI-IMAGE EXTRACTION ---
-            # We want gallery images + description images (diagrams)
-            images = self._extract_all_viable_images(soup, page.url)
+            # Lazy images the page requested (blocked, never downloaded) when the DOM scan came up short
+            if len(result["images"]) < 2:
+                seen = set(result["images"])
+                for src in self.pool.captured_images(page):
+                    if src not in seen and not src.startswith("data:") and \
+                            not any(x in src.lower() for x in UI_IMAGE_HINTS):
+                        result["images"].append(src)
+                        seen.add(src)
+                result["images"] = result["images"][:6]
+                result["image_url"] = result["images"][0] if result["images"] else None
+            return result, content
 
-            # --- STRATEGY C: PRICE & TEXT ---
-            price = self._extract_price(soup, content) # Pass full content for regex fallback
+        except Exception as e:
+            print(f"❌ Scrape Error ({url}): {e}")
+            return None, None
 
-            # Clean up DOM elements we don't need for text analysis
-            for tag in soup(["script", "style", "nav", "footer", "header", "svg", "iframe", "noscript", "button", "input", "form"]):
-                tag.decompose()
-            
-            # Extract list items specifically (often specs are in <ul>)
-            ul_text = ""
-            for ul in soup.find_all("ul"):
-                ul_text += ul.get_text(separator="\n", strip=True) + "\n"
+    def _parse_html(self, content, base_url, title=None):
+        """Runs the table / image / price / text extraction on a page's HTML."""
+        soup = BeautifulSoup(content, 'html.parser')
+        if title is None:
+            title = soup.title.get_text(strip=True) if soup.title else ""
 
-            # Get remaining body text
-            raw_body_text = soup.get_text(separator=' ', strip=True)
+        # --- STRATEGY A: STRUCTURED TABLE EXTRACTION ---
+        # Extract raw <table> data before we clean the soup
+        tables_data = []
+        for table in soup.find_all("table"):
+            rows = []
+            for tr in table.find_all("tr"):
+                # Get both th and td
+                cells = [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
+                # Only keep rows that look like key-value pairs or data headers
+                if len(cells) >= 2:
+                    rows.append(" : ".join(cells))
             
-            # Combine sources for the LLM context
-            # We prioritize the UL text and Table text, then general body
-            clean_text = (ul_text + "\n" + raw_body_text)[:15000] # Limit size for tokens
-
-            return {
-                "title": title,
-                "text": clean_text,
-                "structured_tables": structured_specs,
-                "image_url": images[0] if images else None, # Primary image for UI
-                "images": images, # Full list for AI analysis
-                "price": price
-            }
+            if rows:
+                tables_data.append("\n".join(rows))
+        
+        structured_specs = "\n--- TABLE DATA ---\n".join(tables_data)
 
-        except Exception as e:
-            print(f"❌ Scrape Error ({url}): {e}")
-            return None
-        finally:
-            await page.close()
+        # --- STRATEGY B: MULTI-IMAGE EXTRACTION ---
+        # We want gallery images + description images (diagrams)
+        images = self._extract_all_viable_images(soup, base_url)
+
+        # --- STRATEGY C: PRICE & TEXT ---
+        price = self._extract_price(soup, content) # Pass full content for regex fallback
+
+        # Clean up DOM elements we don't need for text analysis
+        for tag in soup(["script", "style", "nav", "footer", "header", "svg", "iframe", "noscript", "button", "input", "form"]):
+            tag.decompose()
+        
+        # Extract list items specifically (often specs are in <ul>)
+        ul_text = ""
+        for ul in soup.find_all("ul"):
+            ul_text += ul.get_text(separator="\n", strip=True) + "\n"
+
+        # Get remaining body text
+        raw_body_text = soup.get_text(separator=' ', strip=True)
+        
+        # Combine sources for the LLM context
+        # We prioritize the UL text and Table text, then general body
+        clean_text = (ul_text + "\n" + raw_body_text)[:15000] # Limit size for tokens
+
+        return {
+            "title": title,
+            "text": clean_text,
+            "structured_tables": structured_specs,
+            "image_url": images[0] if images else None, # Primary image for UI
+            "images": images, # Full list for AI analysis
+            "price": price
+        }
 
     def _extract_all_viable_images(self, soup, base_url):
         """
@@ -135,7 +256,7 @@ class Scraper:
             for img in soup.find_all('img'):
                 src = img.get('src') or img.get('data-src')
                 # Filter out obvious UI elements
-                if src and not any(x in src.lower() for x in ['icon', 'logo', 'button', 'rating', 'star', 'gif', 'loader', 'pixel']):
+                if src and not any(x in src.lower() for x in UI_IMAGE_HINTS):
                      candidates.add(self._fix_url(src, base_url))
 
         # Convert to list and limit
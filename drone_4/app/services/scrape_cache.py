@@ -0,0 +1,209 @@
+# FILE: app/services/scrape_cache.py
+import gzip
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from app.config import settings
+
+# --- CONFIGURATION ---
+# Cache modes (settings.SCRAPE_CACHE_MODE):
+#   "readwrite" - serve fresh entries, revalidate / refetch stale ones (default)
+#   "refresh"   - always revalidate with the origin, keep writing the cache
+#   "offline"   - replay only: never touch the network, re-parse cached HTML
+#   "off"       - no cache
+CACHE_MODES = ("readwrite", "refresh", "offline", "off")
+
+# Freshness per domain (hours), matched on the host suffix
+DEFAULT_TTL_HOURS = 72.0
+DOMAIN_TTL_HOURS = {
+    "amazon.com": 12.0,        # Prices / stock move daily
+    "aliexpress.com": 12.0,
+    "banggood.com": 24.0,
+    "getfpv.com": 48.0,
+    "racedayquads.com": 48.0,
+    "miniquadtestbench.com": 24.0 * 30, # Static test data
+    "tmotor.com": 24.0 * 14
+}
+
+# Query parameters that never change the page content
+TRACKING_PREFIXES = ("utm_", "mc_")
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "srsltid", "ref", "_pos", "_sid", "_ss", "_psq"}
+
+def normalize_url(url):
+    """Canonical form used as the cache key (lowercase host, no fragment / tracking params, sorted query)."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = parts.netloc.lower()
+    if host.startswith("www."): host = host[4:]
+    if host.endswith(":80") or host.endswith(":443"): host = host.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") or "/"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES))
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+def ttl_for(url):
+    """Freshness lifetime (s) for a URL's domain."""
+    host = urlsplit(normalize_url(url)).netloc
+    for domain, hours in DOMAIN_TTL_HOURS.items():
+        if host == domain or host.endswith("." + domain):
+            return hours * 3600.0
+    return DEFAULT_TTL_HOURS * 3600.0
+
+class ScrapeCache:
+    """
+    On-disk cache of scrape results + raw HTML, and of rendered page captures.
+
+    Layout:
+        <root>/entries/<ab>/<sha256(normalized url)>.json   result, validators, fetch time
+        <root>/captures/<ab>/<sha256(normalized url)>.json  rendered text + blob digests (see put_capture)
+        <root>/blobs/<ab>/<sha256(html)>.html.gz            raw HTML, content-addressed (identical pages stored once)
+        <root>/blobs/<ab>/<sha256(jpeg)>.jpg                screenshots, content-addressed
+    """
+    def __init__(self, root=None, mode=None):
+        self.root = os.path.abspath(root or settings.SCRAPE_CACHE_DIR)
+        self.mode = mode or settings.SCRAPE_CACHE_MODE
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unknown scrape cache mode '{self.mode}' (expected one of {CACHE_MODES})")
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "writes": 0}
+
+    @property
+    def offline(self):
+        return self.mode == "offline"
+
+    def _path(self, kind, digest, suffix):
+        return os.path.join(self.root, kind, digest[:2], digest + suffix)
+
+    def _write(self, path, data):
+        """Atomic write (readers never see half a file)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _read_entry(self, kind, url):
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        try:
+            with open(self._path(kind, key, ".json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, kind, entry):
+        key = hashlib.sha256(entry["normalized_url"].encode("utf-8")).hexdigest()
+        self._write(self._path(kind, key, ".json"), json.dumps(entry).encode("utf-8"))
+
+    def _put_html(self, html):
+        """Stores an HTML blob (once per content hash). Returns its digest, None without HTML."""
+        if not html: return None
+        digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        blob = self._path("blobs", digest, ".html.gz")
+        if not os.path.exists(blob):
+            self._write(blob, gzip.compress(html.encode("utf-8"), 6))
+        return digest
+
+    def get(self, url):
+        """The cached entry for a URL (any age), or None."""
+        return self._read_entry("entries", url)
+
+    def is_fresh(self, entry):
+        """Inside its domain TTL (never in "refresh" mode)."""
+        if self.mode == "refresh": return False
+        return time.time() - entry.get("fetched_at", 0) < ttl_for(entry["url"])
+
+    def load_html(self, entry):
+        """Raw HTML of an entry, None if it wasn't stored."""
+        digest = entry.get("html_sha256")
+        if not digest: return None
+        try:
+            with gzip.open(self._path("blobs", digest, ".html.gz"), "rt", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, url, result, html=None, etag=None, last_modified=None):
+        """Stores a scrape result (and its HTML blob). Returns the entry."""
+        entry = {
+            "url": url,
+            "normalized_url": normalize_url(url),
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "html_sha256": self._put_html(html),
+            "result": result
+        }
+        self._write_entry("entries", entry)
+        self.stats["writes"] += 1
+        return entry
+
+    def touch(self, entry):
+        """Origin answered 304 Not Modified: restart the entry's TTL."""
+        entry["fetched_at"] = time.time()
+        self._write_entry("entries", entry)
+        self.stats["revalidated"] += 1
+
+    # --- RENDERED CAPTURES ---
+    # What a browser session saw on a page (after any clicks): kept apart from the
+    # scrape results because the same URL is rendered with a different profile
+    def get_capture(self, url):
+        """The cached capture for a URL (any age), or None."""
+        return self._read_entry("captures", url)
+
+    def put_capture(self, url, text, html=None, screenshot=None):
+        """
+        Stores a rendered page capture. Returns the entry.
+
+        Args:
+            text: Visible text the page was read for
+            html: Rendered DOM (stored as an HTML blob)
+            screenshot: JPEG bytes (stored as a screenshot blob)
+        """
+        shot_digest = None
+        if screenshot:
+            shot_digest = hashlib.sha256(screenshot).hexdigest()
+            blob = self._path("blobs", shot_digest, ".jpg")
+            if not os.path.exists(blob):
+                self._write(blob, screenshot)
+
+        entry = {
+            "url": url,
+            "normalized_url": normalize_url(url),
+            "fetched_at": time.time(),
+            "html_sha256": self._put_html(html),
+            "screenshot_sha256": shot_digest,
+            "text": text
+        }
+        self._write_entry("captures", entry)
+        self.stats["writes"] += 1
+        return entry
+
+    def load_screenshot(self, entry):
+        """Screenshot bytes of a capture, None if it wasn't stored."""
+        digest = entry.get("screenshot_sha256")
+        if not digest: return None
+        try:
+            with open(self._path("blobs", digest, ".jpg"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def validators(self, entry):
+        """Conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry and entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+# --- SHARED CACHE ---
+_CACHE = None
+
+def get_scrape_cache():
+    """The process-wide cache configured from settings, None when SCRAPE_CACHE_MODE is "off"."""
+    global _CACHE
+    if settings.SCRAPE_CACHE_MODE == "off":
+        return None
+    if _CACHE is None:
+        _CACHE = ScrapeCache()
+    return _CACHE
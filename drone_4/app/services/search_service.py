@@ -1,67 +1,247 @@
 # FILE: app/services/search_service.py
-from googleapiclient.discovery import build
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
 from app.config import settings
 
-def find_components(query: str, limit: int = 5) -> list[dict]:
+try:
+    from googleapiclient.discovery import build
+    HAS_GOOGLE_CLIENT = True
+except ImportError:
+    HAS_GOOGLE_CLIENT = False
+
+# --- CONFIGURATION ---
+# Backends (settings.SEARCH_BACKEND):
+#   "google" - Custom Search API, responses memoized on disk (default)
+#   "replay" - recorded responses only (offline runs / tests), never calls the API
+# Daily live-query budget: settings.SEARCH_DAILY_QUOTA (Custom Search free tier is 100 / day)
+SEARCH_TTL_HOURS = 24.0 * 7   # Search rankings drift slowly; a week avoids repeat paid queries
+
+# One discovery client per process (building it costs a discovery document round trip)
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+def normalize_query(query, limit):
+    """Cache key form of a query: case / whitespace folded, plus the result count."""
+    folded = re.sub(r"\s+", " ", query.strip().lower())
+    return f"{folded}|{min(limit, 10)}"
+
+def _search_query(query):
+    # Append 'buy' or 'price' to ensure we get e-commerce results if not present
+    return query if "buy" in query or "price" in query else f"{query} buy"
+
+class SearchCache:
     """
-    Searches Google Custom Search API for drone components.
-    Attempts to extract Product data (Price, Image) from PageMap (Rich Snippets).
+    On-disk memo of raw Custom Search responses + daily quota ledger.
+
+    Layout:
+        <root>/queries/<ab>/<sha256(normalized query)>.json   query, fetched_at, raw API items
+        <root>/quota.json                                     {"YYYY-MM-DD": live queries used}
     """
-    if not settings.GOOGLE_API_KEY or not settings.GOOGLE_SEARCH_ENGINE_ID:
-        print("❌ Error: GOOGLE_API_KEY or GOOGLE_SEARCH_ENGINE_ID missing.")
-        return []
+    def __init__(self, root=None, ttl_hours=SEARCH_TTL_HOURS, daily_quota=None):
+        self.root = os.path.abspath(root or settings.SEARCH_CACHE_DIR)
+        self.ttl = ttl_hours * 3600.0
+        self.daily_quota = daily_quota or settings.SEARCH_DAILY_QUOTA
+        self.stats = {"hits": 0, "misses": 0, "live_queries": 0}
 
-    print(f"🔎 Google Search: '{query}'...")
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "queries", digest[:2], digest + ".json")
 
-    try:
-        service = build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY)
-        
-        # Append 'buy' or 'price' to ensure we get e-commerce results if not present
-        search_query = query if "buy" in query or "price" in query else f"{query} buy"
+    def _write(self, path, data):
+        """Atomic write (readers never see half a file)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        """The recorded response for a normalized query (any age), or None."""
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
 
-        res = service.cse().list(
-            q=search_query,
+    def is_fresh(self, entry):
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, key, query, items):
+        entry = {"key": key, "query": query, "fetched_at": time.time(), "items": items}
+        self._write(self._path(key), entry)
+        return entry
+
+    # --- QUOTA ---
+    def _quota_path(self):
+        return os.path.join(self.root, "quota.json")
+
+    def quota_used(self):
+        """Live queries spent today (UTC)."""
+        try:
+            with open(self._quota_path(), "r") as f:
+                return json.load(f).get(time.strftime("%Y-%m-%d", time.gmtime()), 0)
+        except (OSError, ValueError):
+            return 0
+
+    def charge(self):
+        """Records one live query against today's quota."""
+        today = time.strftime("%Y-%m-%d", time.gmtime())
+        try:
+            with open(self._quota_path(), "r") as f:
+                ledger = json.load(f)
+        except (OSError, ValueError):
+            ledger = {}
+        ledger = {today: ledger.get(today, 0) + 1} # Only today's count matters
+        self._write(self._quota_path(), ledger)
+        self.stats["live_queries"] += 1
+
+    def quota_left(self):
+        return max(self.daily_quota - self.quota_used(), 0)
+
+_CACHE = None
+
+def get_search_cache():
+    """The process-wide search cache configured from settings."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = SearchCache()
+    return _CACHE
+
+def _get_service():
+    """The shared Custom Search discovery client (built once)."""
+    global _SERVICE
+    if _SERVICE is None:
+        _SERVICE = build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY, cache_discovery=False)
+    return _SERVICE
+
+def _live_search(query, limit):
+    """One Custom Search API call. Returns the raw result items."""
+    with _SERVICE_LOCK: # The discovery client's HTTP transport isn't thread-safe
+        res = _get_service().cse().list(
+            q=_search_query(query),
             cx=settings.GOOGLE_SEARCH_ENGINE_ID,
             num=limit if limit <= 10 else 10 # API Max is 10
         ).execute()
+    return res.get("items", [])
+
+def _parse_items(items):
+    """Custom Search items -> component results (PageMap price / image)."""
+    results = []
+    for item in items:
+        # --- Data Extraction Strategies ---
+
+        # 1. Extract Image from Rich Snippets (PageMap)
+        image_url = None
+        pagemap = item.get("pagemap", {})
+
+        if "cse_image" in pagemap and len(pagemap["cse_image"]) > 0:
+            image_url = pagemap["cse_image"][0].get("src")
+
+        # 2. Extract Price from 'Offer' or 'Product' Schema
+        price = "Check Site"
+        currency = ""
+
+        # Try 'offer' schema first
+        offers = pagemap.get("offer", [])
+        if offers:
+            price = offers[0].get("price", price)
+            currency = offers[0].get("pricecurrency", "$")
 
-        results = []
-        items = res.get("items", [])
-
-        for item in items:
-            # --- Data Extraction Strategies ---
-            
-            # 1. Extract Image from Rich Snippets (PageMap)
-            image_url = None
-            pagemap = item.get("pagemap", {})
-            
-            if "cse_image" in pagemap and len(pagemap["cse_image"]) > 0:
-                image_url = pagemap["cse_image"][0].get("src")
-            
-            # 2. Extract Price from 'Offer' or 'Product' Schema
-            price = "Check Site"
-            currency = ""
-            
-            # Try 'offer' schema first
-            offers = pagemap.get("offer", [])
-            if offers:
-                price = offers[0].get("price", price)
-                currency = offers[0].get("pricecurrency", "$")
-            
-            # 3. Clean up Source
-            display_link = item.get("displayLink", "Unknown")
-
-            results.append({
-                "title": item.get("title"),
-                "price": f"{price} {currency}".strip(),
-                "source": display_link,
-                "link": item.get("link"),
-                "image_url": image_url
-            })
-
-        print(f"✅ Found {len(results)} results.")
-        return results
+        # 3. Clean up Source
+        display_link = item.get("displayLink", "Unknown")
 
+        results.append({
+            "title": item.get("title"),
+            "price": f"{price} {currency}".strip(),
+            "source": display_link,
+            "link": item.get("link"),
+            "image_url": image_url
+        })
+    return results
+
+def _lookup(query, limit):
+    """
+    Cache / quota front half shared by the sync and async entry points.
+
+    Returns:
+        (items or None, entry): items when the search is answered without the API,
+        None when a live call is needed (and allowed)
+    """
+    cache = get_search_cache()
+    key = normalize_query(query, limit)
+    entry = cache.get(key)
+
+    if entry is not None and cache.is_fresh(entry):
+        cache.stats["hits"] += 1
+        print(f"♻️  Search cache hit: '{query}'")
+        return entry["items"], entry
+    cache.stats["misses"] += 1
+
+    if settings.SEARCH_BACKEND == "replay":
+        if entry is None:
+            print(f"📴 Replay: no recorded results for '{query}'")
+            return [], None
+        return entry["items"], entry # Stale recordings are fine offline
+
+    if not settings.GOOGLE_API_KEY or not settings.GOOGLE_SEARCH_ENGINE_ID:
+        print("❌ Error: GOOGLE_API_KEY or GOOGLE_SEARCH_ENGINE_ID missing.")
+        return (entry["items"] if entry else []), entry
+    if not HAS_GOOGLE_CLIENT:
+        print("⚠️  WARNING: 'google-api-python-client' not installed. Using recorded results only.")
+        return (entry["items"] if entry else []), entry
+    if cache.quota_left() <= 0:
+        print(f"⚠️  Search quota exhausted ({cache.daily_quota}/day). Using recorded results for '{query}'.")
+        return (entry["items"] if entry else []), entry
+    return None, entry
+
+def _record(query, limit, items):
+    cache = get_search_cache()
+    cache.charge()
+    cache.put(normalize_query(query, limit), query, items)
+
+def _finish(items):
+    results = _parse_items(items)
+    print(f"✅ Found {len(results)} results.")
+    return results
+
+def find_components(query: str, limit: int = 5) -> list[dict]:
+    """
+    Searches Google Custom Search API for drone components.
+    Attempts to extract Product data (Price, Image) from PageMap (Rich Snippets).
+    Responses are memoized on disk (see SearchCache); prefer find_components_async in async code.
+    """
+    print(f"🔎 Google Search: '{query}'...")
+    items, entry = _lookup(query, limit)
+    if items is not None:
+        return _finish(items)
+
+    try:
+        items = _live_search(query, limit)
+        _record(query, limit, items)
+        return _finish(items)
+    except Exception as e:
+        print(f"❌ Google Search failed: {e}")
+        return _finish(entry["items"]) if entry else []
+
+async def find_components_async(query: str, limit: int = 5) -> list[dict]:
+    """
+    find_components for async pipelines: cache hits return immediately,
+    live API calls run in a worker thread so the event loop keeps scraping.
+    """
+    print(f"🔎 Google Search: '{query}'...")
+    items, entry = _lookup(query, limit)
+    if items is not None:
+        return _finish(items)
+
+    try:
+        items = await asyncio.to_thread(_live_search, query, limit)
+        _record(query, limit, items)
+        return _finish(items)
     except Exception as e:
         print(f"❌ Google Search failed: {e}")
-        return []
\ No newline at end of file
+        return _finish(entry["items"]) if entry else []
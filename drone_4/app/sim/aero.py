@@ -1,44 +1,75 @@
 import pybullet as p
 import numpy as np
+from app.sim.curves import ThrustCurveTable
+from app.sim.mixer import TORQUE_RATIO, rotor_layout
 
 class Aerodynamics:
     """
     Simulates the forces of air acting on the drone.
-    1. Propeller Thrust (F = k * rpm^2)
+    1. Propeller Thrust (F = k * rpm^2, or a measured thrust curve)
     2. Reaction Torque (Yaw)
     3. Linear Drag (Air Resistance)
     """
-    def __init__(self, max_thrust_g=1200.0, num_motors=4):
+    def __init__(self, max_thrust_g=1200.0, num_motors=4, thrust_curves=None, spin_dirs=None):
+        """
+        Args:
+            max_thrust_g: Per-motor thrust at 100% throttle (used when there are no curves)
+            num_motors: Number of propellers driven by update()
+            thrust_curves: Optional thrust table (data_service._parse_thrust_table format),
+                           one shared table or a list with one per motor. Compiled into
+                           dense lookup tables here, so update() only does an array lookup.
+            spin_dirs: Per-prop spin (-1 = CW, +1 = CCW), in prop_links order.
+                       Defaults to the standard layout for num_motors (see mixer.rotor_layout).
+        """
         # Convert grams to Newtons (1000g ~= 9.8N)
         self.max_thrust_n = (max_thrust_g / 1000.0) * 9.8
+        self.num_motors = num_motors
+
+        self.curves = ThrustCurveTable(thrust_curves, shape=(num_motors,)) if thrust_curves else None
+        if self.curves is not None:
+            self.max_thrust_n = float(np.mean(self.curves.max_thrust_n))
+
+        # Available-thrust multiplier (battery voltage sag, see BatteryModel.thrust_scale)
+        self.thrust_scale = 1.0
+
+        # World-frame wind (m/s). Gusts enter through the drag path below.
+        self.wind = np.zeros(3)
+
+        # Last applied per-motor thrust (N) and current draw (A, NaN without current data)
+        self.last_thrust_n = np.zeros(num_motors)
+        self.last_current_a = np.full(num_motors, np.nan)
         
         # Physics Coefficients
         self.drag_coeff_xy = 0.5  # Drag when moving sideways
         self.drag_coeff_z = 1.0   # Drag when falling/climbing (flat plate)
-        self.torque_ratio = 0.02  # Relationship between Thrust and Yaw Torque
+        self.torque_ratio = TORQUE_RATIO  # Relationship between Thrust and Yaw Torque
         
         # Propeller Spin Directions (Standard Betaflight Quad X)
         # 0: FL (CW), 1: FR (CCW), 2: RL (CCW), 3: RR (CW)
         # Note: Directions depend on your specific build order, 
-        # but opposing pairs must spin opposite ways to cancel yaw.
-        self.spin_dirs = [-1, 1, 1, -1]
+        # but neighbouring props must spin opposite ways to cancel yaw.
+        if spin_dirs is None:
+            spin_dirs = rotor_layout(num_motors)[1]
+        self.spin_dirs = np.asarray(spin_dirs, dtype=float)
 
-    def update(self, drone_id, prop_links, motor_inputs):
+    def update(self, drone_id, prop_links, motor_inputs, client=0):
         """
         Apply forces for a single simulation step.
         
         Args:
             drone_id: PyBullet body ID
-            prop_links: List of joint indices for the 4 props
-            motor_inputs: List of 4 floats [0.0 to 1.0] (Throttle % per motor)
+            prop_links: List of joint indices, one per prop
+            motor_inputs: num_motors floats [0.0 to 1.0] (Throttle % per motor)
+            client: PyBullet physics client id that owns drone_id
         """
-        if len(motor_inputs) != 4:
-            return
+        if len(motor_inputs) != self.num_motors or len(prop_links) != self.num_motors:
+            raise ValueError(f"Expected {self.num_motors} motor inputs and prop links, "
+                             f"got {len(motor_inputs)} and {len(prop_links)}")
 
         # 1. Apply Global Drag (Wind Resistance)
         # Get Velocity in World coordinates
-        lin_vel, _ = p.getBaseVelocity(drone_id)
-        vx, vy, vz = lin_vel
+        lin_vel, _ = p.getBaseVelocity(drone_id, physicsClientId=client)
+        vx, vy, vz = np.asarray(lin_vel) - self.wind # Air-relative velocity
         
         # Force is opposite to velocity: F = -C * v
         drag_x = -self.drag_coeff_xy * vx * abs(vx) # Quadratic drag
@@ -51,15 +82,22 @@ class Aerodynamics:
             -1, # -1 = Base Link
             forceObj=[drag_x, drag_y, drag_z], 
             posObj=[0, 0, 0], 
-            flags=p.LINK_FRAME
+            flags=p.LINK_FRAME,
+            physicsClientId=client
         )
 
-        # 2. Apply Motor Thrust & Torque
+        # 2. Apply Motor Thrust & Torque (all motors in one vectorized lookup)
+        throttles = np.clip(np.asarray(motor_inputs, dtype=float), 0.0, 1.0)
+        thrusts = self.motor_thrust(throttles)
+        self.last_thrust_n = thrusts
+        if self.curves is not None and self.curves.has_current:
+            self.last_current_a = self.curves.current(throttles)
+        # If prop spins CW (-1), torque on frame is CCW (+1)
+        torques = thrusts * self.torque_ratio * -self.spin_dirs
+
         for i, link_idx in enumerate(prop_links):
-            throttle = np.clip(motor_inputs[i], 0.0, 1.0)
-            
-            # Thrust Formula: F_max * throttle^2
-            thrust_n = self.max_thrust_n * (throttle ** 2)
+            throttle = throttles[i]
+            thrust_n = float(thrusts[i])
             
             # Apply Thrust Vector (Upwards relative to the prop)
             # [0, 0, thrust] applies force along the Z-axis of the PROP LINK
@@ -68,18 +106,17 @@ class Aerodynamics:
                 link_idx,
                 forceObj=[0, 0, thrust_n],
                 posObj=[0, 0, 0], # At the origin of the prop link
-                flags=p.LINK_FRAME
+                flags=p.LINK_FRAME,
+                physicsClientId=client
             )
             
             # Apply Yaw Torque (Reaction force on the frame)
-            # If prop spins CW (-1), torque on frame is CCW (+1)
-            torque_z = thrust_n * self.torque_ratio * -self.spin_dirs[i]
-            
             p.applyExternalTorque(
                 drone_id,
                 link_idx,
-                torqueObj=[0, 0, torque_z],
-                flags=p.LINK_FRAME
+                torqueObj=[0, 0, float(torques[i])],
+                flags=p.LINK_FRAME,
+                physicsClientId=client
             )
             
             # 3. Visuals: Spin the prop mesh
@@ -90,9 +127,16 @@ class Aerodynamics:
                 link_idx,
                 controlMode=p.VELOCITY_CONTROL,
                 targetVelocity=self.spin_dirs[i] * visual_rpm * 50,
-                force=0.5 # Weak force, just for visuals
+                force=0.5, # Weak force, just for visuals
+                physicsClientId=client
             )
 
+    def motor_thrust(self, throttles):
+        """Per-motor thrust in Newtons. Thrust curve lookup, or F_max * throttle^2 without one."""
+        if self.curves is not None:
+            return self.thrust_scale * self.curves.thrust(throttles)
+        return self.thrust_scale * self.max_thrust_n * np.asarray(throttles, dtype=float) ** 2
+
 # --- TEST HARNESS ---
 if __name__ == "__main__":
     import time
@@ -123,12 +167,12 @@ if __name__ == "__main__":
             inputs = [throttle] * 4
             
             # Run Physics
-            aero.update(sim.drone_id, sim.prop_joints, inputs)
+            aero.update(sim.drone_id, sim.prop_joints, inputs, client=sim.client)
             sim.step()
             
             # Camera Follow
-            pos, _ = p.getBasePositionAndOrientation(sim.drone_id)
-            p.resetDebugVisualizerCamera(1.0, 45, -20, pos)
+            pos, _ = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)
+            p.resetDebugVisualizerCamera(1.0, 45, -20, pos, physicsClientId=sim.client)
             
             time.sleep(1./240.)
             
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.sim.batch import RATE, BatchDynamics, BatchFlightController, altitude_hold_throttle
+from app.sim.mixer import DEFAULT_GAINS
+from app.sim.stability import AXES, hover_equilibrium, prescreen_batch
+
+# --- CONFIGURATION ---
+# Search space, in log10. Roll and pitch share one Kp/Kd pair (symmetric X frames).
+PARAM_NAMES = ("rp_kp", "rp_kd", "yaw_kp", "yaw_kd")
+LOG_BOUNDS = np.log10([[0.02, 5.0], [0.002, 1.0], [0.05, 8.0], [0.001, 1.0]])
+LOG_START = np.log10([0.5, 0.3, 1.5, 0.03]) # The default tune (+ a little yaw damping)
+LOG_START_STD = 0.5
+LOG_MIN_STD = 0.03
+
+# Tuning manoeuvre: attitude step targets [Roll, Pitch, Yaw] from each start time,
+# then a body-rate kick to score disturbance rejection.
+STEP_SCHEDULE = [
+    (0.0, [0.0, 0.0, 0.0]),
+    (0.25, [0.3, 0.0, 0.0]),
+    (1.0, [0.0, -0.3, 0.0]),
+    (1.75, [0.0, 0.0, 0.5])
+]
+KICK_TIME_SEC = 2.5
+KICK_RATES = [4.0, -4.0, 2.0] # rad/s
+TUNE_DURATION_SEC = 3.25
+TUNE_HEIGHT_M = 3.0
+
+# Score weights (lower is better)
+AXIS_WEIGHTS = np.array([1.0, 1.0, 0.5]) # Yaw tracking matters less
+CHATTER_WEIGHT = 2.0                     # Mean |delta motor| per tick (tick-to-tick flip-flopping)
+CRASH_TILT = 1.2                         # rad
+CRASH_PENALTY = 1000.0
+
+def gains_from_vector(x):
+    """log10 [rp_kp, rp_kd, yaw_kp, yaw_kd] -> technical_data["pid_gains"] dict (no I term)."""
+    kp, kd, ykp, ykd = (round(float(v), 4) for v in 10.0 ** np.asarray(x))
+    return {"roll": [kp, 0.0, kd], "pitch": [kp, 0.0, kd], "yaw": [ykp, 0.0, ykd]}
+
+def score_gains(physics_configs, gains, max_thrust_g=1200.0, dt=1.0 / 240.0):
+    """
+    Flies the tuning manoeuvre (roll, pitch and yaw steps, then a rate kick) for
+    every (drone, gain set) pair in one BatchDynamics run.
+    Altitude is held by an exact hover feedforward so only the attitude loop is scored.
+
+    Args:
+        physics_configs: One physics_config per candidate (repeat a SKU to try several gain sets)
+        gains: One pid_gains dict per candidate
+
+    Returns:
+        (scores (N,), metrics dict of (N,) arrays)
+    """
+    dyn = BatchDynamics(physics_configs, max_thrust_g=max_thrust_g, dt=dt)
+    dyn.reset(start_pos=[0, 0, TUNE_HEIGHT_M])
+    fc = BatchFlightController.for_dynamics(dyn, gains=gains)
+    hover_throttle = hover_equilibrium(dyn)["hover_throttle"]
+    n = dyn.n
+
+    steps = int(TUNE_DURATION_SEC / dt)
+    starts = np.array([t for t, _ in STEP_SCHEDULE])
+    targets = np.array([rpy for _, rpy in STEP_SCHEDULE], dtype=float)
+    segment = np.searchsorted(starts, np.arange(steps) * dt, side="right") - 1 # Target row per tick
+    kick_tick = int(KICK_TIME_SEC / dt)
+
+    iae = np.zeros(n)
+    chatter = np.zeros(n)
+    overshoot = np.zeros(n)
+    kick_peak = np.zeros(n)
+    crashed = np.zeros(n, dtype=bool)
+    prev_motors = None
+
+    for i in range(steps):
+        rpy = dyn.get_euler()
+        tilt = np.maximum(np.abs(rpy[:, 0]), np.abs(rpy[:, 1]))
+        lost = (tilt > CRASH_TILT) | (dyn.positions[:, 2] < 0.05) | ~np.isfinite(dyn.state).all(axis=1)
+        crashed |= lost
+        active = ~crashed
+        if not active.any(): break
+
+        target = targets[segment[i]]
+        error = target - rpy
+        iae += np.where(active, np.abs(error) @ AXIS_WEIGHTS * dt, 0.0)
+        if segment[i] == 1:
+            overshoot = np.maximum(overshoot, rpy[:, 0] - target[0])
+        if i == kick_tick:
+            dyn.state[:, RATE] += KICK_RATES
+        if i >= kick_tick:
+            kick_peak = np.maximum(kick_peak, tilt)
+
+        base = altitude_hold_throttle(hover_throttle, TUNE_HEIGHT_M, dyn.positions[:, 2], dyn.velocities[:, 2], rpy)
+
+        motors = fc.compute_motors(rpy, target, base, dt)
+        if prev_motors is not None:
+            chatter += np.where(active, np.abs(motors - prev_motors).sum(axis=1) / dyn.rotor_count, 0.0)
+        prev_motors = motors
+        dyn.step(motors, active=active)
+
+    chatter /= steps
+    scores = iae + CHATTER_WEIGHT * chatter + CRASH_PENALTY * crashed
+    metrics = {
+        "attitude_iae": iae,
+        "motor_chatter": chatter,
+        "roll_overshoot_pct": 100.0 * overshoot / targets[1, 0],
+        "disturbance_peak_deg": np.degrees(kick_peak),
+        "crashed": crashed
+    }
+    return scores, metrics
+
+def autotune_batch(physics_configs, population=48, generations=8, elite_frac=0.25, seeds=None,
+                   max_thrust_g=1200.0, dt=1.0 / 240.0):
+    """
+    Population-based (cross-entropy) gain search for several SKUs at once.
+    Every generation flies population x SKUs candidates in ONE batched simulation,
+    keeps the elite fraction per SKU and refits a Gaussian in log-gain space.
+
+    Args:
+        physics_configs: One physics_config per SKU
+        population: Candidates per SKU per generation
+        generations: Search iterations
+        elite_frac: Fraction of each generation used to refit the search distribution
+        seeds: Per-SKU RNG seeds (default: 0..N-1), so results don't depend on batching
+
+    Returns:
+        List of tuning reports, one per SKU:
+        {"pid_gains", "score", "baseline_score", "improvement_pct", "metrics", "prescreen"}
+    """
+    s = len(physics_configs)
+    if s == 0: return []
+    seeds = list(range(s)) if seeds is None else seeds
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    n_elite = max(2, int(population * elite_frac))
+    lo, hi = LOG_BOUNDS[:, 0], LOG_BOUNDS[:, 1]
+
+    # Baseline: the hard-coded tune every SKU flies today
+    best_score, baseline_metrics = score_gains(physics_configs, [DEFAULT_GAINS] * s, max_thrust_g, dt)
+    baseline_score = best_score.copy()
+    best_x = np.full((s, len(PARAM_NAMES)), np.nan) # NaN = keep DEFAULT_GAINS
+    best_metrics = {k: v.copy() for k, v in baseline_metrics.items()}
+
+    mean = np.tile(LOG_START, (s, 1))
+    std = np.full((s, len(PARAM_NAMES)), LOG_START_STD)
+    repeated = [c for c in physics_configs for _ in range(population)]
+
+    for gen in range(generations):
+        noise = np.stack([rng.standard_normal((population, len(PARAM_NAMES))) for rng in rngs])
+        samples = np.clip(mean[:, None, :] + std[:, None, :] * noise, lo, hi) # (S, P, 4)
+        samples[:, 0] = mean # Always re-test the current centre
+
+        flat = samples.reshape(-1, len(PARAM_NAMES))
+        scores, metrics = score_gains(repeated, [gains_from_vector(x) for x in flat], max_thrust_g, dt)
+        scores = scores.reshape(s, population)
+
+        order = np.argsort(scores, axis=1)
+        elite = np.take_along_axis(samples, order[:, :n_elite, None], axis=1)
+        mean = elite.mean(axis=1)
+        std = np.maximum(elite.std(axis=1), LOG_MIN_STD)
+
+        top = order[:, 0]
+        top_score = scores[np.arange(s), top]
+        better = top_score < best_score
+        for k in np.flatnonzero(better):
+            idx = k * population + top[k]
+            best_score[k] = top_score[k]
+            best_x[k] = flat[idx]
+            for name, values in metrics.items():
+                best_metrics[name][k] = values[idx]
+
+    tuned = [DEFAULT_GAINS if np.isnan(x).any() else gains_from_vector(x) for x in best_x]
+    screens = prescreen_batch(physics_configs, max_thrust_g=max_thrust_g, dt=dt, pid_gains=tuned)
+
+    reports = []
+    for k in range(s):
+        improvement = 100.0 * (1.0 - best_score[k] / baseline_score[k]) if baseline_score[k] > 0 else 0.0
+        reports.append({
+            "pid_gains": tuned[k],
+            "score": round(float(best_score[k]), 4),
+            "baseline_score": round(float(baseline_score[k]), 4),
+            "improvement_pct": round(float(improvement), 1),
+            "metrics": {
+                "attitude_iae": round(float(best_metrics["attitude_iae"][k]), 4),
+                "motor_chatter": round(float(best_metrics["motor_chatter"][k]), 4),
+                "roll_overshoot_pct": round(float(best_metrics["roll_overshoot_pct"][k]), 1),
+                "disturbance_peak_deg": round(float(best_metrics["disturbance_peak_deg"][k]), 1),
+                "crashed": bool(best_metrics["crashed"][k])
+            },
+            "prescreen": {
+                "verdict": screens[k]["verdict"],
+                "gain_margin": {axis: screens[k]["axes"][axis]["gain_margin"] for axis in AXES}
+            },
+            "population": population,
+            "generations": generations
+        })
+    return reports
+
+def _tune_chunk(job):
+    """Worker entry point: one autotune_batch over a slice of the catalog."""
+    return job["indices"], autotune_batch(job["configs"], seeds=job["indices"], **job["kwargs"])
+
+def tune_catalog(catalog_path="drone_catalog.json", max_workers=None, chunk_size=4, write=True, **kwargs):
+    """
+    Autotunes every SKU in the catalog, chunks of SKUs spread over a process pool
+    (each chunk is one batched search), and stores the result per SKU in
+    technical_data["pid_gains"] (+ the search summary in technical_data["pid_tuning"]).
+
+    Args:
+        max_workers: Pool size (defaults to os.cpu_count())
+        chunk_size: SKUs per batched search
+        write: Save the tuned gains back into catalog_path
+        **kwargs: autotune_batch options (population, generations, ...)
+
+    Returns:
+        List of tuning reports tagged with sku_id, in catalog order.
+    """
+    with open(catalog_path, "r") as f:
+        catalog = json.load(f)
+
+    configs = [entry.get("technical_data", {}).get("physics_config", {}) for entry in catalog]
+    jobs = [{
+        "indices": list(range(start, min(start + chunk_size, len(configs)))),
+        "configs": configs[start:start + chunk_size],
+        "kwargs": kwargs
+    } for start in range(0, len(configs), chunk_size)]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    print(f"🎛️  Autotuning {len(configs)} SKUs ({len(jobs)} batches on {max_workers} workers)...")
+    t0 = time.perf_counter()
+
+    reports = [None] * len(configs)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_tune_chunk, job) for job in jobs]
+        for future in as_completed(futures):
+            indices, results = future.result()
+            for k, report in zip(indices, results):
+                report["sku_id"] = catalog[k].get("sku_id")
+                reports[k] = report
+                print(f"   {report['sku_id']}: score {report['baseline_score']} -> {report['score']} "
+                      f"({report['improvement_pct']}%) | {report['prescreen']['verdict']}")
+
+    print(f"✅ Autotune finished in {time.perf_counter() - t0:.1f}s")
+
+    if write:
+        for entry, report in zip(catalog, reports):
+            technical_data = entry.setdefault("technical_data", {})
+            technical_data["pid_gains"] = report["pid_gains"]
+            technical_data["pid_tuning"] = {k: v for k, v in report.items() if k not in ("pid_gains", "sku_id")}
+        with open(catalog_path, "w") as f:
+            json.dump(catalog, f, indent=2)
+        print(f"💾 Tuned gains saved to: {catalog_path}")
+
+    return reports
+
+# --- TEST HARNESS ---
+if __name__ == "__main__":
+    results = tune_catalog("drone_catalog.json", write=False)
+    for r in results:
+        print(f"   {r['sku_id']}: {r['pid_gains']}")
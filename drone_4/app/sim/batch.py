@@ -0,0 +1,362 @@
+import numpy as np
+from app.sim.curves import ThrustCurveTable, compile_curve, quadratic_curve
+from app.sim.mixer import DEFAULT_GAINS, TORQUE_RATIO, QUAD_X_MIXER, rotor_layout, effectiveness_matrix, mixer_from_geometry
+
+# --- CONFIGURATION ---
+GRAVITY = 9.81
+
+# State Vector Layout (one row per drone, 13 columns)
+# Quaternion order matches PyBullet: [x, y, z, w]
+POS = slice(0, 3)
+QUAT = slice(3, 7)
+VEL = slice(7, 10)
+RATE = slice(10, 13)
+
+def _extract_number(value, default=0.0):
+    """Tolerant float conversion for physics_config values."""
+    if isinstance(value, (int, float)): return float(value)
+    try: return float(value)
+    except (TypeError, ValueError): return default
+
+def drone_params_from_config(physics_config, max_thrust_g=1200.0):
+    """
+    Normalizes a SKU's physics_config into rigid body parameters.
+    Accepts both the make_fleet schema (wheelbase_mm) and the
+    physics_service schema (collider_size_m).
+    """
+    cfg = physics_config or {}
+    mass_kg = _extract_number(cfg.get("mass_kg"), 0.466) or 0.466
+
+    max_force_n = _extract_number(cfg.get("motor_max_force_n"))
+    if max_force_n <= 0:
+        max_force_n = (max_thrust_g / 1000.0) * 9.8
+
+    wb_mm = _extract_number(cfg.get("wheelbase_mm"))
+    if wb_mm <= 0 and cfg.get("collider_size_m"):
+        wb_mm = _extract_number(cfg["collider_size_m"][0]) * 1.5 * 1000.0
+    if wb_mm <= 0:
+        wb_mm = 225.0
+
+    # Motor offset along X/Y for a Quad X (wheelbase is the motor-to-motor diagonal)
+    arm_m = (wb_mm / 1000.0) / 2.0 / np.sqrt(2.0)
+    rotor_count = int(_extract_number(cfg.get("rotor_count"), 4)) or 4
+
+    # Solid Box Inertia (same approximation as URDFExporter._get_inertia_xml)
+    dx = dy = 2.0 * arm_m
+    dz = 0.05
+    inertia = [
+        (1/12.0) * mass_kg * (dy**2 + dz**2),
+        (1/12.0) * mass_kg * (dx**2 + dz**2),
+        (1/12.0) * mass_kg * (dx**2 + dy**2)
+    ]
+
+    return {
+        "mass_kg": mass_kg,
+        "max_thrust_n": max_force_n,
+        "arm_m": arm_m,
+        "radius_m": wb_mm / 1000.0 / 2.0,
+        "rotor_count": rotor_count,
+        "inertia": inertia
+    }
+
+def quat_to_matrix(q):
+    """Batched quaternion [x, y, z, w] -> rotation matrix (N, 3, 3)."""
+    x, y, z, w = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    R = np.empty((len(q), 3, 3))
+    R[:, 0, 0] = 1 - 2 * (y*y + z*z)
+    R[:, 0, 1] = 2 * (x*y - z*w)
+    R[:, 0, 2] = 2 * (x*z + y*w)
+    R[:, 1, 0] = 2 * (x*y + z*w)
+    R[:, 1, 1] = 1 - 2 * (x*x + z*z)
+    R[:, 1, 2] = 2 * (y*z - x*w)
+    R[:, 2, 0] = 2 * (x*z - y*w)
+    R[:, 2, 1] = 2 * (y*z + x*w)
+    R[:, 2, 2] = 1 - 2 * (x*x + y*y)
+    return R
+
+def quat_to_euler(q):
+    """Batched equivalent of p.getEulerFromQuaternion -> (N, 3) [Roll, Pitch, Yaw]."""
+    x, y, z, w = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    roll = np.arctan2(2 * (w*x + y*z), 1 - 2 * (x*x + y*y))
+    pitch = np.arcsin(np.clip(2 * (w*y - z*x), -1.0, 1.0))
+    yaw = np.arctan2(2 * (w*z + x*y), 1 - 2 * (y*y + z*z))
+    return np.stack([roll, pitch, yaw], axis=1)
+
+class BatchDynamics:
+    """
+    Vectorized 6-DOF Rigid Body Integrator.
+    Pure NumPy alternative to DroneSimulation + Aerodynamics that advances
+    N drones at once. Forces mirror Aerodynamics.update:
+    1. Propeller Thrust (F = F_max * throttle^2, or a measured thrust curve) at each rotor
+    2. Reaction Torque (Yaw)
+    3. Quadratic Drag
+    Ground contact is a simple floor at z=0 (no bounce).
+    Mixed rotor counts share one (N, M) motor layout: drones with fewer than M
+    rotors get padding rotors with zero arm, zero spin and no thrust.
+    """
+    def __init__(self, physics_configs, max_thrust_g=1200.0, dt=1.0 / 240.0):
+        params = [drone_params_from_config(c, max_thrust_g) for c in physics_configs]
+        self.n = len(params)
+        self.dt = dt
+
+        self.mass = np.array([x["mass_kg"] for x in params])
+        self.max_thrust_n = np.array([x["max_thrust_n"] for x in params])
+        self.inertia = np.array([x["inertia"] for x in params])
+
+        # Rotor Layout (Standard X for each rotor_count, Quad in URDFExporter order)
+        # Quad: 0: FL (CW), 1: FR (CCW), 2: RL (CCW), 3: RR (CW)
+        self.rotor_count = np.array([x["rotor_count"] for x in params])
+        self.radius_m = np.array([x["radius_m"] for x in params])
+        self.num_rotors = int(self.rotor_count.max())
+        self.rotor_xy = np.zeros((self.n, self.num_rotors, 2))
+        self.spin_dirs = np.zeros((self.n, self.num_rotors))
+        for k, x in enumerate(params):
+            m = x["rotor_count"]
+            self.rotor_xy[k, :m], self.spin_dirs[k, :m] = rotor_layout(m, x["radius_m"])
+        self.rotor_mask = (np.arange(self.num_rotors)[None, :] < self.rotor_count[:, None]).astype(float)
+        self.torque_ratio = TORQUE_RATIO
+        self.effectiveness = effectiveness_matrix(self.rotor_xy, self.spin_dirs, self.torque_ratio) # (N, 3, M)
+        self.mixer = mixer_from_geometry(self.rotor_xy, self.spin_dirs, self.torque_ratio) # (N, M, 3)
+
+        # Optional measured thrust curves (physics_config["thrust_curve"]), one (N, M) lookup.
+        # Drones without a curve get the F_max * throttle^2 model compiled into the same table.
+        tables = [(c or {}).get("thrust_curve") for c in physics_configs]
+        self.curves = None
+        if any(tables):
+            compiled = []
+            for table, fmax in zip(tables, self.max_thrust_n):
+                curve = compile_curve(table) if table else quadratic_curve(fmax)
+                compiled += [curve] * self.num_rotors
+            self.curves = ThrustCurveTable(compiled, shape=(self.n, self.num_rotors))
+            self.max_thrust_n = self.curves.max_thrust_n.mean(axis=1)
+
+        # Physics Coefficients (same as Aerodynamics)
+        self.drag_coeff = np.array([0.5, 0.5, 1.0]) # XY sideways, Z flat plate
+
+        # Available-thrust multiplier per drone (battery voltage sag)
+        self.thrust_scale = np.ones(self.n)
+        # Per-motor thrust multiplier (degraded / failed motors), 0 on padding rotors
+        self.motor_scale = self.rotor_mask.copy()
+        # World-frame wind (m/s) per drone, drag acts on the air-relative velocity
+        self.wind = np.zeros((self.n, 3))
+        # Body-frame offset (m) of the drag's center of pressure from the CG.
+        # Zero = drag only pushes; props / frame above the CG make a gust tilt the drone too.
+        self.drag_arm = np.zeros((self.n, 3))
+
+        # Last applied per-motor thrust (N) and current draw (A, NaN without current data)
+        self.last_thrust_n = np.zeros((self.n, self.num_rotors))
+        self.last_current_a = np.full((self.n, self.num_rotors), np.nan)
+
+        self.state = np.zeros((self.n, 13))
+        self.reset()
+
+    def set_cg_offset(self, offset_xy):
+        """
+        Shifts each drone's center of mass by offset_xy ((N, 2) or (2,), meters).
+        Only the physical torque arms move: the mixer keeps assuming a centered CG,
+        like a real flight controller would.
+        """
+        arms = self.rotor_xy - np.asarray(offset_xy, dtype=float).reshape(-1, 1, 2)
+        self.effectiveness = effectiveness_matrix(arms, self.spin_dirs, self.torque_ratio)
+
+    def reset(self, start_pos=[0, 0, 0.1]):
+        """Places every drone level at start_pos with zero velocity."""
+        self.state[:] = 0.0
+        self.state[:, POS] = start_pos
+        self.state[:, 6] = 1.0 # Identity quaternion (w=1)
+
+    @property
+    def positions(self):
+        return self.state[:, POS]
+
+    @property
+    def quaternions(self):
+        return self.state[:, QUAT]
+
+    @property
+    def velocities(self):
+        return self.state[:, VEL]
+
+    @property
+    def body_rates(self):
+        """Body-frame angular velocity (what a gyro reads) -> (N, 3)."""
+        return self.state[:, RATE]
+
+    def get_world_rates(self):
+        """Angular velocity in the world frame (what p.getBaseVelocity reports)."""
+        R = quat_to_matrix(self.state[:, QUAT])
+        return np.einsum("nij,nj->ni", R, self.state[:, RATE])
+
+    def get_euler(self):
+        """IMU reading for all drones -> (N, 3) [Roll, Pitch, Yaw]."""
+        return quat_to_euler(self.state[:, QUAT])
+
+    def step(self, motor_inputs, active=None):
+        """
+        Advances all drones by one tick.
+
+        Args:
+            motor_inputs: (N, M) array of throttle [0.0 to 1.0] per motor
+            active: Optional (N,) bool mask. Inactive drones are frozen.
+        """
+        dt = self.dt
+        s = self.state
+        throttle = np.clip(np.asarray(motor_inputs, dtype=float), 0.0, 1.0)
+
+        R = quat_to_matrix(s[:, QUAT])
+        vel = s[:, VEL]
+        rate = s[:, RATE]
+
+        # 1. Motor Thrust (body Z) & Torques
+        if self.curves is not None:
+            thrust = self.curves.thrust(throttle) # (N, M)
+        else:
+            thrust = self.max_thrust_n[:, None] * throttle**2 # (N, M)
+        thrust = thrust * (self.thrust_scale[:, None] * self.motor_scale)
+        self.last_thrust_n = thrust
+        if self.curves is not None and self.curves.has_current:
+            self.last_current_a = self.curves.current(throttle)
+        total_thrust = thrust.sum(axis=1)
+
+        # r x F with F = [0, 0, T] -> [y*T, -x*T, 0], yaw: CW prop (-1) -> CCW torque (+1)
+        torque = (self.effectiveness @ thrust[:, :, None])[:, :, 0] # (N, 3)
+
+        # 2. Drag (computed from world air-relative velocity, applied in LINK_FRAME like Aerodynamics)
+        air_vel = vel - self.wind
+        drag_body = -self.drag_coeff * air_vel * np.abs(air_vel)
+        torque = torque + np.cross(self.drag_arm, drag_body)
+
+        force_body = drag_body
+        force_body[:, 2] += total_thrust
+        force_world = np.einsum("nij,nj->ni", R, force_body)
+        force_world[:, 2] -= self.mass * GRAVITY
+
+        # 3. Integrate (Semi-Implicit Euler, like Bullet)
+        acc = force_world / self.mass[:, None]
+        new_vel = vel + acc * dt
+        new_pos = s[:, POS] + new_vel * dt
+
+        # Euler's equations in the body frame: I*w_dot = tau - w x (I*w)
+        Iw = self.inertia * rate
+        rate_dot = (torque - np.cross(rate, Iw)) / self.inertia
+        new_rate = rate + rate_dot * dt
+
+        # Quaternion kinematics: q_dot = 0.5 * q (x) [w, 0]
+        q = s[:, QUAT]
+        qx, qy, qz, qw = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+        wx, wy, wz = new_rate[:, 0], new_rate[:, 1], new_rate[:, 2]
+        q_dot = 0.5 * np.stack([
+            qw*wx + qy*wz - qz*wy,
+            qw*wy + qz*wx - qx*wz,
+            qw*wz + qx*wy - qy*wx,
+            -qx*wx - qy*wy - qz*wz
+        ], axis=1)
+        new_q = q + q_dot * dt
+        new_q /= np.linalg.norm(new_q, axis=1, keepdims=True)
+
+        # 4. Ground Contact (floor at z=0, kills motion on touchdown)
+        grounded = new_pos[:, 2] < 0.0
+        if np.any(grounded):
+            new_pos[grounded, 2] = 0.0
+            new_vel[grounded] = np.where(new_vel[grounded] < 0, 0.0, new_vel[grounded]) * [0, 0, 1]
+            new_rate[grounded] = 0.0
+
+        if active is None:
+            s[:, POS], s[:, QUAT], s[:, VEL], s[:, RATE] = new_pos, new_q, new_vel, new_rate
+        else:
+            s[active, POS] = new_pos[active]
+            s[active, QUAT] = new_q[active]
+            s[active, VEL] = new_vel[active]
+            s[active, RATE] = new_rate[active]
+
+def gain_arrays(gains, n):
+    """
+    Stacks per-drone PID gains into (N, 3) Kp, Ki, Kd arrays (cols: Roll, Pitch, Yaw).
+
+    Args:
+        gains: None, one {"roll"|"pitch"|"yaw": [Kp, Ki, Kd]} dict for all drones,
+               or a list of such dicts (None entries = DEFAULT_GAINS)
+    """
+    if gains is None or isinstance(gains, dict):
+        gains = [gains] * n
+    table = np.array([[dict(DEFAULT_GAINS, **(g or {}))[axis] for axis in ("roll", "pitch", "yaw")]
+                      for g in gains], dtype=float) # (N, 3 axes, 3 terms)
+    return table[:, :, 0], table[:, :, 1], table[:, :, 2]
+
+def altitude_hold_throttle(hover_throttle, target_z, z, vz, rpy, kp=4.0, kd=4.0):
+    """
+    Base throttle that holds altitude: PD on height as a vertical acceleration
+    demand, mapped through the thrust ~ throttle^2 model around hover and
+    compensated for tilt. Unlike the scenario P-loop it settles on target_z.
+
+    Args:
+        hover_throttle: (N,) throttle that balances weight (see stability.hover_equilibrium)
+        target_z, z, vz: Target height, height and vertical speed
+        rpy: (N, 3) attitude
+    """
+    accel = kp * (target_z - z) - kd * vz
+    lift = np.maximum(1.0 + accel / GRAVITY, 0.0) / np.maximum(np.cos(rpy[:, 0]) * np.cos(rpy[:, 1]), 0.5)
+    return np.clip(hover_throttle * np.sqrt(lift), 0.0, 1.0)
+
+class BatchFlightController:
+    """
+    Vectorized FlightController.
+    Runs N independent Roll/Pitch/Yaw PID loops and the motor mixer in one shot.
+    Gains default to FlightController's ("standard 5-inch" tune), or one set per drone.
+    """
+    def __init__(self, n, i_limit=10.0, mixer=None, rotor_mask=None, gains=None):
+        """
+        Args:
+            n: Number of drones
+            mixer: (M, 3) shared or (N, M, 3) per-drone mixer. Defaults to Quad X.
+            rotor_mask: Optional (N, M) 1/0 mask, padding rotors are commanded 0
+            gains: PID gains, see gain_arrays (shared dict or one per drone)
+        """
+        self.kp, self.ki, self.kd = gain_arrays(gains, n) # (N, 3) each
+        self.i_limit = i_limit
+
+        self.prev_error = np.zeros((n, 3))
+        self.integral = np.zeros((n, 3))
+
+        # Motor Mixing rows: one per rotor | cols: Roll, Pitch, Yaw
+        self.mixer = QUAD_X_MIXER if mixer is None else np.asarray(mixer, dtype=float)
+        self.rotor_mask = rotor_mask
+
+    @classmethod
+    def for_dynamics(cls, dyn, i_limit=10.0, gains=None):
+        """Controller matched to a BatchDynamics' rotor layouts."""
+        return cls(dyn.n, i_limit=i_limit, mixer=dyn.mixer, rotor_mask=dyn.rotor_mask, gains=gains)
+
+    def reset(self):
+        self.prev_error[:] = 0.0
+        self.integral[:] = 0.0
+
+    def compute_motors(self, current_rpy, target_rpy, target_thrust, dt, rates=None):
+        """
+        Args:
+            current_rpy: (N, 3) measured attitude
+            target_rpy: (3,) or (N, 3) target attitude in radians
+            target_thrust: scalar or (N,) base throttle
+            dt: Time step duration
+            rates: Optional (N, 3) gyro rates. When given, the D term damps the measured
+                   rate (derivative on measurement) instead of differencing the attitude
+                   error, so attitude-estimate noise never reaches the D path.
+
+        Returns:
+            (N, M) motor commands clipped to [0.0, 1.0]
+        """
+        error = np.asarray(target_rpy, dtype=float) - current_rpy
+
+        self.integral = np.clip(self.integral + error * dt, -self.i_limit, self.i_limit)
+        if rates is not None:
+            d_error = -np.asarray(rates, dtype=float)
+        else:
+            d_error = (error - self.prev_error) / dt if dt > 0 else 0.0
+        self.prev_error = error
+
+        corr = self.kp * error + self.ki * self.integral + self.kd * d_error
+
+        base = np.broadcast_to(np.asarray(target_thrust, dtype=float), (len(current_rpy),))
+        motors = base[:, None] + (self.mixer @ corr[:, :, None])[:, :, 0]
+        motors = np.clip(motors, 0.0, 1.0)
+        return motors * self.rotor_mask if self.rotor_mask is not None else motors
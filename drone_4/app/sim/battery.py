@@ -0,0 +1,180 @@
+import re
+import numpy as np
+
+# --- CONFIGURATION ---
+AIR_DENSITY = 1.225           # kg/m^3 (sea level)
+FIGURE_OF_MERIT = 0.6         # Hover efficiency of a small prop vs ideal momentum theory
+DRIVE_EFFICIENCY = 0.8        # Motor + ESC
+DEFAULT_CELL_IR_OHM = 0.006   # Per cell, typical mid-range LiPo
+CELL_CUTOFF_V = 3.3           # Under load, per cell
+USABLE_FRACTION = 0.8         # Don't plan past 80% depth of discharge (same rule as _calculate_flight_time)
+
+# LiPo open-circuit voltage per cell vs state of charge
+_OCV_SOC = np.array([0.0, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
+_OCV_V = np.array([3.27, 3.61, 3.69, 3.73, 3.77, 3.79, 3.82, 3.87, 3.93, 4.00, 4.08, 4.20])
+
+def _extract_number(text, default=0.0):
+    if isinstance(text, (int, float)): return float(text)
+    if not text: return default
+    match = re.search(r"(\d+(\.\d+)?)", str(text))
+    return float(match.group(1)) if match else default
+
+def battery_params_from_specs(specs):
+    """
+    Battery model parameters from a BOM battery's specs (scraped, so keys vary).
+
+    Returns:
+        dict with capacity_mah, cells, internal_resistance_ohm
+    """
+    specs = specs or {}
+    capacity_mah = _extract_number(specs.get("capacity_mah"), 1300.0) or 1300.0
+
+    # Cell count: "cell_count_s": 6 | "cell_count": "6S" | "configuration": "4S2P" | voltage / 3.7
+    cells = _extract_number(specs.get("cell_count_s") or specs.get("cell_count"))
+    if cells <= 0:
+        match = re.search(r"(\d+)\s*S", str(specs.get("configuration") or specs.get("cell_configuration") or ""))
+        if match: cells = float(match.group(1))
+    if cells <= 0:
+        voltage = _extract_number(specs.get("voltage_nominal_v") or specs.get("nominal_voltage_v") or specs.get("voltage_v"))
+        cells = round(voltage / 3.7) if voltage > 0 else 4
+    cells = int(max(1, cells))
+
+    ir_mohm = _extract_number(specs.get("internal_resistance_mohm"))
+    ir_ohm = ir_mohm / 1000.0 if ir_mohm > 0 else DEFAULT_CELL_IR_OHM * cells
+
+    return {"capacity_mah": capacity_mah, "cells": cells, "internal_resistance_ohm": round(ir_ohm, 4)}
+
+def estimate_motor_current(thrust_n, voltage, prop_diameter_m):
+    """
+    Current per motor from momentum theory when there is no measured current curve.
+    P_ideal = T^1.5 / sqrt(2 * rho * A), derated by figure of merit and drive efficiency.
+    """
+    area = np.pi * (np.asarray(prop_diameter_m) / 2.0) ** 2
+    thrust = np.maximum(np.asarray(thrust_n, dtype=float), 0.0)
+    power_w = thrust ** 1.5 / np.sqrt(2.0 * AIR_DENSITY * area) / (FIGURE_OF_MERIT * DRIVE_EFFICIENCY)
+    return power_w / np.maximum(voltage, 1e-3)
+
+def pack_current(motor_current_a, motor_thrust_n, voltage, prop_diameter_m):
+    """
+    Total pack current from per-motor readings, (..., M) -> (...).
+    Motors without measured current (NaN, no curve data) fall back to estimate_motor_current.
+    """
+    measured = np.asarray(motor_current_a, dtype=float)
+    voltage = np.asarray(voltage, dtype=float)[..., None]
+    estimated = estimate_motor_current(motor_thrust_n, voltage, np.asarray(prop_diameter_m)[..., None])
+    return np.sum(np.where(np.isnan(measured), estimated, measured), axis=-1)
+
+def prop_diameter_from_layout(radius_m, rotor_count=4):
+    """Largest prop that clears its neighbours on an evenly spaced X frame (10% gap), in meters."""
+    spacing = 2.0 * np.asarray(radius_m) * np.sin(np.pi / np.asarray(rotor_count))
+    return 0.9 * spacing
+
+class BatteryModel:
+    """
+    LiPo Pack Simulator.
+    Coulomb-counts the pack current, looks up open-circuit voltage from state of
+    charge and subtracts the I*R sag. Thrust scales with (V_load / V_full)^2
+    (rpm ~ voltage, thrust ~ rpm^2), so a sagging pack has less thrust available.
+    Vectorized over N drones for the batch backend.
+    """
+    def __init__(self, capacity_mah=1300.0, cells=4, internal_resistance_ohm=None, n=1):
+        """
+        Args:
+            capacity_mah: Pack capacity
+            cells: Series cell count
+            internal_resistance_ohm: Whole-pack resistance (default: DEFAULT_CELL_IR_OHM per cell)
+            n: Number of drones
+        """
+        self.n = n
+        self.capacity_mah = np.broadcast_to(np.asarray(capacity_mah, dtype=float), (n,)).copy()
+        self.cells = np.broadcast_to(np.asarray(cells, dtype=float), (n,)).copy()
+        if internal_resistance_ohm is None:
+            internal_resistance_ohm = DEFAULT_CELL_IR_OHM * self.cells
+        self.resistance = np.broadcast_to(np.asarray(internal_resistance_ohm, dtype=float), (n,)).copy()
+
+        self.v_full = self.cells * _OCV_V[-1]
+        self.used_mah = np.zeros(n)
+        self.current_a = np.zeros(n)
+        self.voltage = self.v_full.copy()
+        self.min_voltage = self.v_full.copy()
+        self.amp_seconds = np.zeros(n)
+        self.elapsed = 0.0
+        # ~1 s moving average of current, the "steady" draw once the profile settles
+        self.smoothing_sec = 1.0
+        self.smoothed_current_a = np.zeros(n)
+
+    @classmethod
+    def from_params(cls, params, n=1):
+        """params: dict from battery_params_from_specs (or physics_config["battery"])."""
+        return cls(params.get("capacity_mah", 1300.0), params.get("cells", 4),
+                   params.get("internal_resistance_ohm"), n=n)
+
+    @classmethod
+    def from_configs(cls, params_list):
+        """One pack per drone from a list of battery param dicts."""
+        return cls(
+            [p.get("capacity_mah", 1300.0) for p in params_list],
+            [p.get("cells", 4) for p in params_list],
+            [p.get("internal_resistance_ohm") or DEFAULT_CELL_IR_OHM * p.get("cells", 4) for p in params_list],
+            n=len(params_list)
+        )
+
+    @property
+    def soc(self):
+        return np.clip(1.0 - self.used_mah / self.capacity_mah, 0.0, 1.0)
+
+    def open_circuit_voltage(self):
+        return self.cells * np.interp(self.soc, _OCV_SOC, _OCV_V)
+
+    def step(self, current_a, dt, active=None):
+        """
+        Draws current_a (total pack current, scalar or (N,)) for dt seconds.
+
+        Returns:
+            (N,) loaded pack voltage
+        """
+        current = np.broadcast_to(np.asarray(current_a, dtype=float), (self.n,))
+        if active is not None:
+            current = np.where(active, current, 0.0)
+        self.current_a = current
+        self.used_mah += current * dt / 3.6 # A*s -> mAh
+        self.amp_seconds += current * dt
+        self.elapsed += dt
+        alpha = min(1.0, dt / self.smoothing_sec)
+        self.smoothed_current_a += (current - self.smoothed_current_a) * alpha
+
+        self.voltage = np.maximum(self.open_circuit_voltage() - current * self.resistance, 0.0)
+        self.min_voltage = np.minimum(self.min_voltage, self.voltage)
+        return self.voltage
+
+    def thrust_scale(self):
+        """(N,) available-thrust multiplier from the current loaded voltage."""
+        return (self.voltage / self.v_full) ** 2
+
+    @property
+    def depleted(self):
+        """(N,) True once the loaded cell voltage is below cutoff."""
+        return self.voltage < CELL_CUTOFF_V * self.cells
+
+    def report(self, k=0, steady_current_a=None):
+        """
+        Endurance summary for one drone.
+
+        Args:
+            steady_current_a: Representative cruise/hover current. Defaults to the
+                              current averaged over the last ~smoothing_sec of the run.
+        """
+        avg_current = self.amp_seconds[k] / self.elapsed if self.elapsed > 0 else 0.0
+        plan_current = steady_current_a if steady_current_a is not None else self.smoothed_current_a[k]
+        usable_mah = self.capacity_mah[k] * USABLE_FRACTION
+        endurance_min = (usable_mah / 1000.0) / plan_current * 60.0 if plan_current > 0 else 0.0
+        return {
+            "capacity_mah": round(float(self.capacity_mah[k]), 0),
+            "cells": int(self.cells[k]),
+            "consumed_mah": round(float(self.used_mah[k]), 2),
+            "avg_current_a": round(float(avg_current), 2),
+            "steady_current_a": round(float(plan_current), 2),
+            "min_voltage_v": round(float(self.min_voltage[k]), 2),
+            "end_voltage_v": round(float(self.voltage[k]), 2),
+            "projected_endurance_min": round(float(endurance_min), 1)
+        }
@@ -0,0 +1,119 @@
+import re
+import numpy as np
+
+# Dense samples between 0% and 100% throttle (0.1% steps)
+CURVE_RESOLUTION = 1001
+
+def _table_points(table):
+    """
+    Normalizes a thrust table into sorted (throttle 0-1, thrust g, amps or NaN) arrays.
+    Accepts both data_service._parse_thrust_table output
+    ({"throttle_pct": [...], "thrust_g": [...], "amps": [...]}) and the
+    refine_arsenal "thrust_data" format ({"50_pct_g": 1200, "100_pct_g": 3400}).
+    """
+    if "thrust_g" in table:
+        throttle = np.asarray(table.get("throttle_pct", []), dtype=float) / 100.0
+        thrust = np.asarray(table["thrust_g"], dtype=float)
+        amps = np.asarray(table.get("amps") or [np.nan] * len(thrust), dtype=float)
+    else:
+        points = []
+        for key, value in table.items():
+            match = re.match(r"(\d+(\.\d+)?)_pct_g$", str(key))
+            if match:
+                try: points.append((float(match.group(1)) / 100.0, float(value)))
+                except (TypeError, ValueError): continue
+        throttle = np.array([t for t, _ in points])
+        thrust = np.array([g for _, g in points])
+        amps = np.full(len(points), np.nan)
+
+    if len(throttle) == 0 or len(throttle) != len(thrust):
+        raise ValueError("Thrust table has no usable throttle/thrust points")
+
+    # Tables are often scraped with throttle as 0-100 and duplicated rows
+    order = np.argsort(throttle, kind="stable")
+    throttle, thrust, amps = throttle[order], thrust[order], amps[order]
+    throttle, first = np.unique(throttle, return_index=True)
+    return np.clip(throttle, 0.0, 1.0), thrust[first], amps[first]
+
+def compile_curve(table, resolution=CURVE_RESOLUTION):
+    """
+    Precompiles one thrust table into dense lookup arrays on a uniform throttle grid.
+    Outside the measured range the curve follows thrust ~ throttle^2 (the
+    Aerodynamics default model) anchored on the nearest measured point.
+
+    Returns:
+        (thrust_n, amps) arrays of length resolution. amps is NaN when the table has no current data.
+    """
+    throttle, thrust_g, amps = _table_points(table)
+    grid = np.linspace(0.0, 1.0, resolution)
+
+    # Anchor 0% at zero thrust, extrapolate 100% quadratically if the test stopped short
+    if throttle[0] > 0:
+        throttle, thrust_g, amps = np.r_[0.0, throttle], np.r_[0.0, thrust_g], np.r_[np.nan if np.isnan(amps[0]) else 0.0, amps]
+    if throttle[-1] < 1.0:
+        scale = 1.0 / throttle[-1] ** 2 if throttle[-1] > 0 else 1.0
+        throttle, thrust_g, amps = np.r_[throttle, 1.0], np.r_[thrust_g, thrust_g[-1] * scale], np.r_[amps, amps[-1] * scale]
+
+    thrust_n = np.interp(grid, throttle, thrust_g) * 9.8 / 1000.0 # Same g->N factor as Aerodynamics
+    amps_grid = np.interp(grid, throttle, amps) if not np.isnan(amps).any() else np.full(resolution, np.nan)
+    return thrust_n, amps_grid
+
+def quadratic_curve(max_thrust_n, resolution=CURVE_RESOLUTION):
+    """The Aerodynamics default model (F_max * throttle^2) as a compiled curve, no current data."""
+    grid = np.linspace(0.0, 1.0, resolution)
+    return max_thrust_n * grid ** 2, np.full(resolution, np.nan)
+
+class ThrustCurveTable:
+    """
+    Compiled per-motor thrust/current lookup.
+    Holds a (..., R) stack of dense tables so every motor of every drone is
+    evaluated with one vectorized gather + lerp per step.
+    """
+    def __init__(self, curves, shape=None, resolution=CURVE_RESOLUTION):
+        """
+        Args:
+            curves: One thrust table (shared) or a list with one table per motor.
+                    Entries may also be already compiled (thrust_n, amps) tuples.
+            shape: Motor layout of the lookup, e.g. (4,) or (N, 4). Defaults to (len(curves),)
+            resolution: Samples per curve
+        """
+        if isinstance(curves, dict): curves = [curves]
+        compiled = [c if isinstance(c, tuple) else compile_curve(c, resolution) for c in curves]
+
+        if shape is None: shape = (len(compiled),)
+        count = int(np.prod(shape))
+        if len(compiled) == 1:
+            compiled = compiled * count
+        if len(compiled) != count:
+            raise ValueError(f"Got {len(compiled)} thrust curves for {count} motors")
+
+        self.shape = tuple(shape)
+        self.resolution = resolution
+        self.thrust_lut = np.array([c[0] for c in compiled]).reshape(*self.shape, resolution)
+        self.amps_lut = np.array([c[1] for c in compiled]).reshape(*self.shape, resolution)
+        self.has_current = not np.isnan(self.amps_lut).any()
+
+        # Flat views + per-motor row offsets: a lookup is then one gather on a 1-D array
+        self._thrust_flat = self.thrust_lut.reshape(-1)
+        self._amps_flat = self.amps_lut.reshape(-1)
+        self._offsets = (np.arange(count) * resolution).reshape(self.shape)
+
+    @property
+    def max_thrust_n(self):
+        """Thrust at 100% throttle, per motor."""
+        return self.thrust_lut[..., -1]
+
+    def _lookup(self, flat, throttle):
+        u = np.minimum(np.maximum(throttle, 0.0), 1.0) * (self.resolution - 1) # (np.clip is slower on tiny arrays)
+        i0 = np.minimum(u.astype(int), self.resolution - 2)
+        idx = self._offsets + i0
+        lo = flat[idx]
+        return lo + (flat[idx + 1] - lo) * (u - i0)
+
+    def thrust(self, throttle):
+        """Thrust in Newtons for a throttle array shaped like the table."""
+        return self._lookup(self._thrust_flat, throttle)
+
+    def current(self, throttle):
+        """Current draw in Amps (NaN if the tables carry no current data)."""
+        return self._lookup(self._amps_flat, throttle)
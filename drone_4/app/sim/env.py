@@ -9,30 +9,38 @@ class DroneSimulation:
     The Physics Sandbox.
     Wraps PyBullet to provide a clean interface for loading drones and running steps.
     """
-    def __init__(self, gui=False):
+    def __init__(self, gui=False, client=None):
+        """
+        Args:
+            gui: Open the 3D window instead of a headless client
+            client: Existing physics client id to reuse. Every PyBullet call is
+                    routed to self.client, so many worlds can share one process.
+        """
         # connect(p.GUI) opens the 3D window, p.DIRECT is headless (faster)
-        self.client = p.connect(p.GUI if gui else p.DIRECT)
+        self.owns_client = client is None
+        self.client = p.connect(p.GUI if gui else p.DIRECT) if client is None else client
         
         # Add default assets (like the ground plane)
-        p.setAdditionalSearchPath(pybullet_data.getDataPath())
+        p.setAdditionalSearchPath(pybullet_data.getDataPath(), physicsClientId=self.client)
         
         self.drone_id = None
         self.dt = 1.0 / 240.0 # PyBullet default timestep
         
     def setup_world(self):
         """Sets gravity and loads the floor."""
-        p.resetSimulation()
-        p.setGravity(0, 0, -9.81)
+        p.resetSimulation(physicsClientId=self.client)
+        p.setGravity(0, 0, -9.81, physicsClientId=self.client)
         
         # Load the checkerboard floor
-        self.plane_id = p.loadURDF("plane.urdf")
+        self.plane_id = p.loadURDF("plane.urdf", physicsClientId=self.client)
         
         # Set nice debug camera angle
         p.resetDebugVisualizerCamera(
             cameraDistance=1.5,
             cameraYaw=45,
             cameraPitch=-30,
-            cameraTargetPosition=[0, 0, 0]
+            cameraTargetPosition=[0, 0, 0],
+            physicsClientId=self.client
         )
 
     def load_drone(self, urdf_path, start_pos=[0, 0, 0.1]):
@@ -42,44 +50,61 @@ class DroneSimulation:
         if not os.path.exists(urdf_path):
             raise FileNotFoundError(f"URDF not found at: {urdf_path}")
         
-        start_orientation = p.getQuaternionFromEuler([0, 0, 0])
+        start_orientation = p.getQuaternionFromEuler([0, 0, 0], physicsClientId=self.client)
         
         # Load the Robot
         # flags=p.URDF_USE_INERTIA_FROM_FILE is critical! 
         # Otherwise PyBullet re-calculates inertia based on the visual mesh volume, which is wrong.
+        # URDF_ENABLE_CACHED_GRAPHICS_SHAPES reuses parsed visual meshes when the same drone is reloaded.
         self.drone_id = p.loadURDF(
             urdf_path, 
             start_pos, 
             start_orientation,
-            flags=p.URDF_USE_INERTIA_FROM_FILE
+            flags=p.URDF_USE_INERTIA_FROM_FILE | p.URDF_ENABLE_CACHED_GRAPHICS_SHAPES,
+            physicsClientId=self.client
         )
         
         # Force visual colors (sometimes STL import loses color info)
-        p.changeVisualShape(self.drone_id, -1, rgbaColor=[0.2, 0.2, 0.2, 1]) # Body Dark Grey
+        p.changeVisualShape(self.drone_id, -1, rgbaColor=[0.2, 0.2, 0.2, 1], physicsClientId=self.client) # Body Dark Grey
         
         # Scan joints to identify propellers
         self.prop_joints = []
-        num_joints = p.getNumJoints(self.drone_id)
+        self.prop_positions = [] # (x, y) of each prop joint in the base frame, for the mixer
+        num_joints = p.getNumJoints(self.drone_id, physicsClientId=self.client)
         
         print(f"   > Loaded Drone ID: {self.drone_id}. Joints found: {num_joints}")
         
         for i in range(num_joints):
-            info = p.getJointInfo(self.drone_id, i)
+            info = p.getJointInfo(self.drone_id, i, physicsClientId=self.client)
             joint_name = info[1].decode('utf-8')
             print(f"     - Joint {i}: {joint_name}")
             
             # If it's a propeller joint, store the index for later control
             if "prop" in joint_name or "joint_" in joint_name:
                 self.prop_joints.append(i)
+                self.prop_positions.append(info[14][:2]) # parentFramePos
                 # Color props Cyan
-                p.changeVisualShape(self.drone_id, i, rgbaColor=[0, 0.8, 0.8, 1])
+                p.changeVisualShape(self.drone_id, i, rgbaColor=[0, 0.8, 0.8, 1], physicsClientId=self.client)
+
+    def save_state(self):
+        """Snapshots the whole world in memory (p.saveState). Returns a state id."""
+        return p.saveState(physicsClientId=self.client)
+
+    def restore_state(self, state_id):
+        """Rewinds the world to a snapshot taken with save_state."""
+        p.restoreState(stateId=state_id, physicsClientId=self.client)
+
+    def remove_state(self, state_id):
+        p.removeState(state_id, physicsClientId=self.client)
 
     def step(self):
         """Advances the simulation by one tick."""
-        p.stepSimulation()
+        p.stepSimulation(physicsClientId=self.client)
 
     def close(self):
-        p.disconnect()
+        """Disconnects the client, unless it was borrowed from the caller."""
+        if self.owns_client:
+            p.disconnect(physicsClientId=self.client)
 
 # --- TEST HARNESS ---
 if __name__ == "__main__":
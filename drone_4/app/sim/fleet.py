@@ -0,0 +1,234 @@
+import os
+import csv
+import json
+import pybullet as p
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.sim.scenarios import FlightTestRunner
+from app.sim.stability import prescreen_batch
+
+# Headless client owned by the current worker process (see _init_worker)
+_WORKER_CLIENT = None
+
+# Columns of the fleet results table (one row per SKU x scenario)
+RESULT_COLUMNS = [
+    "sku_id", "scenario", "backend", "status",
+    "hover_throttle_pct", "estimated_twr", "min_height_m", "warnings", "video_path", "error"
+]
+
+def _max_thrust_g(physics_config, default=1200.0):
+    """physics_config stores Newtons per motor, FlightTestRunner wants grams."""
+    force_n = (physics_config or {}).get("motor_max_force_n")
+    try: return (float(force_n) / 9.8) * 1000.0 if force_n else default
+    except (TypeError, ValueError): return default
+
+def _init_worker():
+    """Pool initializer: connects the worker's single DIRECT client."""
+    global _WORKER_CLIENT
+    _WORKER_CLIENT = p.connect(p.DIRECT)
+
+def _run_job(job):
+    """
+    Worker entry point: runs ONE scenario for ONE drone.
+    Every job reuses the worker's DIRECT client (setup_world resets it), so
+    there is no connect/disconnect per job.
+    """
+    row = {col: None for col in RESULT_COLUMNS}
+    row.update({"sku_id": job["sku_id"], "scenario": job["scenario"], "backend": job["backend"]})
+
+    runner = FlightTestRunner(
+        job.get("urdf_path"),
+        max_thrust_g=job.get("max_thrust_g", 1200.0),
+        gui=False,
+        backend=job["backend"],
+        physics_config=job.get("physics_config"),
+        client=_WORKER_CLIENT,
+        pid_gains=job.get("pid_gains")
+    )
+
+    result = None
+    try:
+        if job["scenario"] == "hover":
+            result = runner.run_hover_test(duration_sec=job.get("duration_sec", 5.0),
+                                           video_filename=job.get("video_path"))
+        elif job["scenario"] == "acrobatic":
+            result = runner.run_acrobatic_show(duration_sec=job.get("duration_sec", 15.0),
+                                               video_filename=job.get("video_path"), script=job.get("script"))
+        else:
+            raise ValueError(f"Unknown scenario '{job['scenario']}'")
+
+        for key in ("status", "hover_throttle_pct", "estimated_twr", "min_height_m", "video_path"):
+            if key in result: row[key] = result[key]
+        row["warnings"] = "; ".join(result.get("warnings", []))
+    except Exception as e:
+        row["status"] = "FAIL"
+        row["error"] = str(e)
+    finally:
+        # Borrowed client: close() only detaches, the worker keeps the connection
+        sim = result.get("sim_instance") if result else None
+        if sim is not None and job["backend"] == "pybullet":
+            sim.close()
+
+    return row
+
+class FleetRunner:
+    """
+    Scenario Farm.
+    Spreads FlightTestRunner jobs (SKU x scenario) over a process pool with one
+    headless PyBullet client per worker, and collects the verdicts into one table.
+    """
+    def __init__(self, scenarios=("hover",), max_workers=None, duration_sec=None, prescreen=False, video_dir=None):
+        """
+        Args:
+            scenarios: Any of "hover", "acrobatic"
+            max_workers: Pool size (defaults to os.cpu_count())
+            duration_sec: Override the per-scenario default duration
+            prescreen: Run the analytic stability pre-screen first and skip the jobs its
+                       decisive verdicts settle (needs a physics_config per drone, opt-in)
+            video_dir: Record a headless review video of every PyBullet job into
+                       <video_dir>/<sku_id>_<scenario>.mp4 (None = no video)
+        """
+        self.scenarios = list(scenarios)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.duration_sec = duration_sec
+        self.prescreen = prescreen
+        self.video_dir = video_dir
+
+    def _prescreen_rows(self, drones):
+        """
+        Settles the clear cases without a simulator.
+        Only decisive reports (verdicts the hover test agrees with) skip jobs:
+        drones that cannot hover skip every scenario, FLYABLE drones skip the hover test.
+        MARGINAL drones (undamped / linearly unstable loops included) are simulated.
+
+        Returns:
+            (rows, remaining_jobs): rows keyed by (sku_id, scenario)
+        """
+        screened = [d for d in drones if d.get("physics_config")]
+        reports = prescreen_batch([d["physics_config"] for d in screened],
+                                  pid_gains=[d.get("pid_gains") for d in screened])
+        verdicts = {d["sku_id"]: r for d, r in zip(screened, reports)}
+
+        rows, jobs = {}, []
+        for job in self._expand(drones):
+            report = verdicts.get(job["sku_id"])
+            decided = report is not None and report["decisive"] and (
+                report["verdict"] == "UNFLYABLE" or
+                (report["verdict"] == "FLYABLE" and job["scenario"] == "hover")
+            )
+            if not decided:
+                jobs.append(job)
+                continue
+
+            row = {col: None for col in RESULT_COLUMNS}
+            row.update({
+                "sku_id": job["sku_id"], "scenario": job["scenario"], "backend": "prescreen",
+                "status": "FAIL" if report["verdict"] == "UNFLYABLE" else "PASS",
+                "hover_throttle_pct": report["hover_throttle_pct"],
+                "estimated_twr": report["twr"],
+                "warnings": "; ".join(report["reasons"])
+            })
+            rows[(job["sku_id"], job["scenario"])] = row
+        return rows, jobs
+
+    def _expand(self, drones):
+        """One job per drone per scenario."""
+        jobs = []
+        for drone in drones:
+            for scenario in self.scenarios:
+                job = dict(drone, scenario=scenario)
+                if self.duration_sec: job["duration_sec"] = self.duration_sec
+                if self.video_dir and drone.get("backend") == "pybullet":
+                    job["video_path"] = os.path.abspath(os.path.join(self.video_dir, f"{drone['sku_id']}_{scenario}.mp4"))
+                jobs.append(job)
+        return jobs
+
+    def run(self, drones):
+        """
+        Args:
+            drones: List of dicts with sku_id, backend, and urdf_path and/or physics_config
+                    (optional "script": stunt segments for the acrobatic scenario)
+
+        Returns:
+            List of result rows (RESULT_COLUMNS), in submission order.
+            Rows settled by the pre-screen have backend "prescreen".
+        """
+        all_jobs = self._expand(drones)
+        decided = {}
+        jobs = all_jobs
+        if self.prescreen:
+            decided, jobs = self._prescreen_rows(drones)
+            print(f"🧮 Pre-screen settled {len(decided)}/{len(all_jobs)} jobs analytically.")
+
+        print(f"🏭 Fleet Runner: {len(jobs)} jobs on {self.max_workers} workers...")
+        if self.video_dir:
+            os.makedirs(self.video_dir, exist_ok=True)
+
+        rows = [None] * len(jobs)
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(_run_job, job): idx for idx, job in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                idx = futures[future]
+                try:
+                    rows[idx] = future.result()
+                except Exception as e:
+                    # Worker crashed hard (e.g. segfault inside PyBullet)
+                    job = jobs[idx]
+                    rows[idx] = {col: None for col in RESULT_COLUMNS}
+                    rows[idx].update({"sku_id": job["sku_id"], "scenario": job["scenario"],
+                                      "backend": job["backend"], "status": "FAIL", "error": str(e)})
+                row = rows[idx]
+                print(f"   [{done}/{len(jobs)}] {row['sku_id']} {row['scenario']}: {row['status']}")
+
+        # Back to submission order (sku x scenario)
+        simulated = {(r["sku_id"], r["scenario"]): r for r in rows}
+        return [decided.get(key) or simulated[key] for key in ((j["sku_id"], j["scenario"]) for j in all_jobs)]
+
+    def run_catalog(self, catalog_path="drone_catalog.json", urdf_dir=None):
+        """
+        Runs every SKU in the catalog.
+        SKUs with an exported URDF at <urdf_dir>/<sku_id>/drone.urdf fly in PyBullet,
+        the rest fall back to the batch backend driven by their physics_config.
+        """
+        with open(catalog_path, "r") as f:
+            catalog = json.load(f)
+
+        drones = []
+        for entry in catalog:
+            sku = entry.get("sku_id")
+            technical_data = entry.get("technical_data", {})
+            physics_config = technical_data.get("physics_config", {})
+            urdf_path = os.path.join(urdf_dir, sku, "drone.urdf") if urdf_dir else None
+            has_urdf = bool(urdf_path) and os.path.exists(urdf_path)
+            drones.append({
+                "sku_id": sku,
+                "backend": "pybullet" if has_urdf else "batch",
+                "urdf_path": urdf_path if has_urdf else None,
+                "physics_config": physics_config,
+                "pid_gains": technical_data.get("pid_gains"), # Tuned by app/sim/autotune.py, if any
+                "max_thrust_g": _max_thrust_g(physics_config)
+            })
+        return self.run(drones)
+
+    def run_urdfs(self, urdf_paths, max_thrust_g=1200.0):
+        """Runs a list of URDFExporter outputs in PyBullet (sku_id = parent folder name)."""
+        drones = [{
+            "sku_id": os.path.basename(os.path.dirname(os.path.abspath(path))),
+            "backend": "pybullet",
+            "urdf_path": os.path.abspath(path),
+            "max_thrust_g": max_thrust_g
+        } for path in urdf_paths]
+        return self.run(drones)
+
+def save_results_csv(rows, path="fleet_results.csv"):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Saved {len(rows)} results to: {path}")
+    return path
+
+# --- TEST HARNESS ---
+if __name__ == "__main__":
+    farm = FleetRunner(scenarios=("hover", "acrobatic"), prescreen=True)
+    results = farm.run_catalog("drone_catalog.json", urdf_dir="static/urdf_fleet")
+    save_results_csv(results)
@@ -0,0 +1,96 @@
+import numpy as np
+
+# --- CONFIGURATION ---
+TORQUE_RATIO = 0.02 # Yaw reaction torque per Newton of thrust (same as Aerodynamics)
+
+# Attitude PID gains per axis [Kp, Ki, Kd] that go with these mixers.
+# Tuned roughly for a standard 5" Freestyle Drone in PyBullet. SKUs tuned by
+# app/sim/autotune.py carry their own set in technical_data["pid_gains"].
+DEFAULT_GAINS = {
+    "roll": [0.5, 0.0, 0.3],
+    "pitch": [0.5, 0.0, 0.3],
+    "yaw": [1.5, 0.0, 0.0]
+}
+
+def rotor_layout(rotor_count=4, radius_m=0.225 / 2.0):
+    """
+    Standard multirotor X layout.
+    Quad keeps the URDFExporter order (FL, FR, RL, RR). Hex/Octo rotors sit
+    every 360/M degrees starting half a step left of the nose, going CCW.
+
+    Args:
+        rotor_count: Number of rotors (even)
+        radius_m: Hub-to-motor distance (half the wheelbase)
+
+    Returns:
+        (rotor_xy (M, 2), spin_dirs (M,))
+    """
+    if rotor_count == 4:
+        a = radius_m / np.sqrt(2.0)
+        rotor_xy = a * np.array([[1, 1], [1, -1], [-1, 1], [-1, -1]], dtype=float)
+    else:
+        angles = np.pi / rotor_count + 2.0 * np.pi * np.arange(rotor_count) / rotor_count
+        rotor_xy = radius_m * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    return rotor_xy, spin_dirs_from_positions(rotor_xy)
+
+def spin_dirs_from_positions(rotor_xy):
+    """
+    Alternating spin directions around the ring (-1 = CW, +1 = CCW), so
+    neighbouring props cancel yaw. Reproduces the Quad X convention
+    FL (CW), FR (CCW), RL (CCW), RR (CW).
+    """
+    rotor_xy = np.asarray(rotor_xy, dtype=float)
+    order = np.argsort(np.arctan2(rotor_xy[:, 1], rotor_xy[:, 0]), kind="stable")
+    spin_dirs = np.empty(len(rotor_xy))
+    spin_dirs[order] = np.where(np.arange(len(rotor_xy)) % 2 == 0, -1.0, 1.0)
+    return spin_dirs
+
+def effectiveness_matrix(rotor_xy, spin_dirs, torque_ratio=TORQUE_RATIO):
+    """
+    Body torque [Roll, Pitch, Yaw] per Newton of thrust at each rotor.
+    r x F with F = [0, 0, T] -> [y*T, -x*T], yaw = -spin * ratio * T.
+
+    Returns:
+        (..., 3, M) array (batched over any leading dims)
+    """
+    rotor_xy = np.asarray(rotor_xy, dtype=float)
+    spin_dirs = np.asarray(spin_dirs, dtype=float)
+    return np.stack([rotor_xy[..., 1], -rotor_xy[..., 0], -spin_dirs * torque_ratio], axis=-2)
+
+def mixer_from_geometry(rotor_xy, spin_dirs, torque_ratio=TORQUE_RATIO):
+    """
+    Motor mixer derived from rotor geometry: the pseudo-inverse of the
+    effectiveness matrix, each axis column scaled so its largest entry is 1
+    (the authority of the classic +/-1 Quad X mixer, so PID gains carry over).
+    Padding rotors (zero position and spin) get all-zero rows.
+
+    Returns:
+        (..., M, 3) array. motors = base_throttle + mixer @ [roll, pitch, yaw] correction
+    """
+    mixer = np.linalg.pinv(effectiveness_matrix(rotor_xy, spin_dirs, torque_ratio))
+    peak = np.max(np.abs(mixer), axis=-2, keepdims=True)
+    return mixer / np.where(peak > 0, peak, 1.0)
+
+def quad_command_to_rotors(motors, mixer):
+    """
+    Re-targets a raw Quad X motor command (FL, FR, RL, RR) onto another layout:
+    keeps the mean throttle and the roll/pitch/yaw it implies. A command that
+    already has one entry per rotor (e.g. any quad) is returned unchanged.
+
+    Args:
+        motors: 4 quad throttles
+        mixer: (M, 3) or (N, M, 3) target mixer
+
+    Returns:
+        (M,) or (N, M) throttles clipped to [0.0, 1.0]
+    """
+    motors = np.asarray(motors, dtype=float)
+    if mixer.shape[-2] == len(motors):
+        return np.broadcast_to(motors, mixer.shape[:-1])
+    base = motors.mean()
+    corr = np.linalg.lstsq(QUAD_X_MIXER, motors - base, rcond=None)[0]
+    active = np.any(mixer != 0, axis=-1) # Padding rotors stay off
+    return np.where(active, np.clip(base + mixer @ corr, 0.0, 1.0), 0.0)
+
+# Default Quad X mixer (rows: FL, FR, RL, RR | cols: Roll, Pitch, Yaw)
+QUAD_X_MIXER = mixer_from_geometry(*rotor_layout(4))
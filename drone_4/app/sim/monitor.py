@@ -0,0 +1,136 @@
+import numpy as np
+
+# Monitor Outcomes (per drone)
+RUNNING = 0
+CONVERGED = 1
+DIVERGED = 2
+
+# Rollover criterion of the hover scenarios (|roll| or |pitch|, rad). The attitude
+# envelope defaults to it, so an early exit never calls a drone the full run would keep.
+CRASH_TILT = 1.5
+
+class SteadyStateMonitor:
+    """
+    Early-Termination Detector for hover tests.
+    Watches a sliding window of height, throttle and attitude and calls the run:
+    1. CONVERGED: on the target height, height and throttle variance + attitude envelope inside tolerance
+    2. DIVERGED: tilt outside the recoverable envelope, or attitude energy
+       growing window over window (an oscillation that will end in a rollover)
+    Vectorized over N drones so the same detector serves PyBullet (N=1) and the batch backend.
+    """
+    def __init__(self, n=1, dt=1.0 / 240.0, window_sec=0.5, min_time_sec=1.5, target_height=None, target_tol=0.05,
+                 height_tol=0.02, throttle_tol=0.01, attitude_tol=0.02,
+                 attitude_envelope=CRASH_TILT, energy_growth=2.0, growth_windows=3, energy_floor=0.05):
+        """
+        Args:
+            n: Number of drones
+            dt: Physics tick
+            window_sec: Length of the sliding window
+            min_time_sec: Never converge before this (warmup + climb)
+            target_height: Height (m) the run holds; None = any steady height counts as settled
+            target_tol: Max |mean height - target_height| (m) over the window
+            height_tol: Max std of height (m) over the window
+            throttle_tol: Max std of base throttle over the window
+            attitude_tol: Max |roll|/|pitch| (rad) over the window
+            attitude_envelope: |roll|/|pitch| (rad) past which the drone is considered lost (the crash tilt)
+            energy_growth: Window-over-window growth factor of attitude energy that counts as divergence
+            growth_windows: Consecutive growing windows needed
+            energy_floor: Ignore growth below this attitude energy ((rad/s)^2)
+        """
+        self.n = n
+        self.dt = dt
+        self.window = max(2, int(round(window_sec / dt)))
+        self.check_every = max(1, self.window // 4)
+        self.min_time_sec = min_time_sec
+        self.target_height = target_height
+        self.target_tol = target_tol
+
+        self.height_tol = height_tol
+        self.throttle_tol = throttle_tol
+        self.attitude_tol = attitude_tol
+        self.attitude_envelope = attitude_envelope
+        self.energy_growth = energy_growth
+        self.growth_windows = growth_windows
+        self.energy_floor = energy_floor
+
+        # Ring buffers (N, W). The per-tick update only writes here; all the
+        # statistics run every check_every ticks so the physics loop stays cheap.
+        self.height = np.zeros((n, self.window))
+        self.throttle = np.zeros((n, self.window))
+        self.rp = np.zeros((n, self.window, 2)) # Roll, Pitch (yaw wraps and doesn't matter for hover)
+        self.filled = 0
+        self._head = 0
+        self._tick = 0
+
+        self.last_energy = np.full(n, np.nan)
+        self.growth_streak = np.zeros(n, dtype=int)
+        self.rising = np.zeros(n, dtype=bool)
+
+        self.status = np.full(n, RUNNING)
+        self.reason = [None] * n
+
+    def update(self, sim_t, height, throttle, rpy):
+        """
+        Feeds one tick.
+
+        Args:
+            height: scalar or (N,) altitude
+            throttle: scalar or (N,) base throttle command
+            rpy: (3,) or (N, 3) attitude
+
+        Returns:
+            (N,) status array (RUNNING / CONVERGED / DIVERGED). Decided drones keep their status.
+        """
+        k = self._head
+        self.height[:, k] = height
+        self.throttle[:, k] = throttle
+        self.rp[:, k] = np.asarray(rpy)[..., :2]
+        self._head = (k + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+        self._tick += 1
+
+        if self._tick % self.check_every == 0:
+            self._check(sim_t)
+        return self.status
+
+    def _check(self, sim_t):
+        tilt = np.max(np.abs(self.rp[:, :self.filled]), axis=(1, 2))
+
+        # 1. Attitude Envelope
+        lost = (self.status == RUNNING) & (tilt > self.attitude_envelope)
+        self._decide(lost, DIVERGED, f"Tilt beyond {self.attitude_envelope:.2f} rad at t={sim_t:.2f}")
+
+        # 2. Attitude Energy Growth (peak tilt rate^2 per non-overlapping window)
+        # At a window boundary the ring head is back at 0, so the buffer is in time order.
+        if self._tick % self.window == 0:
+            rates = np.diff(self.rp, axis=1) / self.dt
+            energy = np.max(np.sum(rates ** 2, axis=2), axis=1)
+            # Growth below the floor can't end the run, but it does block convergence
+            self.rising = energy > self.energy_growth * self.last_energy
+            grew = self.rising & (energy > self.energy_floor)
+            self.growth_streak = np.where(grew, self.growth_streak + 1, 0)
+            self.last_energy = energy
+            growing = (self.status == RUNNING) & (self.growth_streak >= self.growth_windows)
+            self._decide(growing, DIVERGED, f"Attitude energy growing for {self.growth_windows} windows at t={sim_t:.2f}")
+
+        # 3. Convergence (windowed variance)
+        if self.filled == self.window and sim_t >= self.min_time_sec:
+            on_target = np.ones(self.n, dtype=bool) if self.target_height is None else \
+                np.abs(np.mean(self.height, axis=1) - self.target_height) < self.target_tol
+            settled = (
+                on_target &
+                (np.std(self.height, axis=1) < self.height_tol) &
+                (np.std(self.throttle, axis=1) < self.throttle_tol) &
+                (tilt < self.attitude_tol) &
+                ~self.rising
+            )
+            self._decide((self.status == RUNNING) & settled, CONVERGED, f"Settled at t={sim_t:.2f}")
+
+    def _decide(self, mask, outcome, msg):
+        for k in np.flatnonzero(mask):
+            self.status[k] = outcome
+            self.reason[k] = msg
+
+    @property
+    def done(self):
+        return self.status != RUNNING
@@ -1,5 +1,6 @@
 import numpy as np
 import pybullet as p
+from app.sim.mixer import DEFAULT_GAINS, QUAD_X_MIXER, mixer_from_geometry, spin_dirs_from_positions
 
 class PID:
     """
@@ -40,28 +41,46 @@ class PID:
 class FlightController:
     """
     Simulates a Flight Controller (like Betaflight).
-    Mixes Roll/Pitch/Yaw PID outputs into motor signals.
+    Mixes Roll/Pitch/Yaw PID outputs into motor signals through a mixer
+    matrix, so the same controller drives quads, hexes and octos.
     """
-    def __init__(self):
-        # Tuned roughly for a standard 5" Freestyle Drone in PyBullet
-        # Note: In a real simulation optimization loop, the AI would tune these!
-        self.pid_roll = PID(kp=0.5, ki=0.0, kd=0.3)
-        self.pid_pitch = PID(kp=0.5, ki=0.0, kd=0.3)
-        self.pid_yaw = PID(kp=1.5, ki=0.0, kd=0.0)
+    def __init__(self, mixer=None, gains=None):
+        """
+        Args:
+            mixer: (M, 3) motor mixer, see mixer.mixer_from_geometry. Defaults to Quad X.
+            gains: {"roll"|"pitch"|"yaw": [Kp, Ki, Kd]}, e.g. an SKU's tuned
+                   technical_data["pid_gains"]. Missing axes use DEFAULT_GAINS.
+        """
+        gains = dict(DEFAULT_GAINS, **(gains or {}))
+        self.pid_roll = PID(*gains["roll"])
+        self.pid_pitch = PID(*gains["pitch"])
+        self.pid_yaw = PID(*gains["yaw"])
+
+        self.mixer = QUAD_X_MIXER if mixer is None else np.asarray(mixer, dtype=float)
         
         self.last_time = 0.0
 
-    def compute_motors(self, drone_id, target_rpy, target_thrust, dt):
+    @classmethod
+    def for_sim(cls, sim, gains=None):
+        """Controller with a mixer derived from the loaded URDF's prop positions."""
+        rotor_xy = np.asarray(sim.prop_positions, dtype=float)
+        return cls(mixer_from_geometry(rotor_xy, spin_dirs_from_positions(rotor_xy)), gains=gains)
+
+    def compute_motors(self, drone_id, target_rpy, target_thrust, dt, client=0):
         """
         Args:
             drone_id: PyBullet Body ID
             target_rpy: [Roll, Pitch, Yaw] in radians (Target Angle)
             target_thrust: Float 0.0 to 1.0 (Base throttle)
             dt: Time step duration
+            client: PyBullet physics client id that owns drone_id
+
+        Returns:
+            (M,) motor commands clipped to [0.0, 1.0]
         """
         # 1. Get Current State (IMU Sensor Simulation)
-        pos, quat = p.getBasePositionAndOrientation(drone_id)
-        current_rpy = p.getEulerFromQuaternion(quat)
+        pos, quat = p.getBasePositionAndOrientation(drone_id, physicsClientId=client)
+        current_rpy = p.getEulerFromQuaternion(quat, physicsClientId=client)
         
         # 2. Calculate Errors
         # Error = Target - Current
@@ -70,36 +89,18 @@ class FlightController:
         err_yaw = target_rpy[2] - current_rpy[2]
         
         # 3. Run PID Loops
-        # Note: We output 'correction' values. 
-        # Positive Roll Correction -> Speed up Left motors, Slow down Right.
+        # Note: We output 'correction' values (desired torque direction per axis).
         corr_roll = self.pid_roll.update(err_roll, dt)
         corr_pitch = self.pid_pitch.update(err_pitch, dt)
         corr_yaw = self.pid_yaw.update(err_yaw, dt)
         
-        # 4. Motor Mixing (Quad X Configuration)
-        # FL (0): CW  | FR (1): CCW
-        # RL (2): CCW | RR (3): CW
-        
-        # Standard Mixer Rules:
-        # FL = Thrust + Roll + Pitch - Yaw
-        # FR = Thrust - Roll + Pitch + Yaw
-        # RL = Thrust + Roll - Pitch + Yaw
-        # RR = Thrust - Roll - Pitch - Yaw
-        
-        m0 = target_thrust + corr_roll + corr_pitch - corr_yaw # FL
-        m1 = target_thrust - corr_roll + corr_pitch + corr_yaw # FR
-        m2 = target_thrust + corr_roll - corr_pitch + corr_yaw # RL
-        m3 = target_thrust - corr_roll - corr_pitch - corr_yaw # RR
+        # 4. Motor Mixing (one matrix op for any rotor count)
+        # Quad X: FL = T + R - P + Y | FR = T - R - P - Y
+        #         RL = T + R + P - Y | RR = T - R + P + Y
+        motors = target_thrust + self.mixer @ np.array([corr_roll, corr_pitch, corr_yaw])
         
         # Clip to valid range [0.0, 1.0]
-        motors = [
-            np.clip(m0, 0.0, 1.0),
-            np.clip(m1, 0.0, 1.0),
-            np.clip(m2, 0.0, 1.0),
-            np.clip(m3, 0.0, 1.0)
-        ]
-        
-        return motors
+        return np.clip(motors, 0.0, 1.0)
 
 # --- TEST HARNESS ---
 if __name__ == "__main__":
@@ -134,16 +135,17 @@ if __name__ == "__main__":
                 sim.drone_id, 
                 target_rpy=target_rpy, 
                 target_thrust=base_throttle, 
-                dt=sim.dt
+                dt=sim.dt,
+                client=sim.client
             )
             
             # Apply Physics
-            aero.update(sim.drone_id, sim.prop_joints, motors)
+            aero.update(sim.drone_id, sim.prop_joints, motors, client=sim.client)
             sim.step()
             
             # Camera Follow
-            pos, _ = p.getBasePositionAndOrientation(sim.drone_id)
-            p.resetDebugVisualizerCamera(1.0, 45, -20, pos)
+            pos, _ = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)
+            p.resetDebugVisualizerCamera(1.0, 45, -20, pos, physicsClientId=sim.client)
             
             time.sleep(1./240.)
             
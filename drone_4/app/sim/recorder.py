@@ -0,0 +1,181 @@
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import zlib
+import numpy as np
+import pybullet as p
+
+try:
+    import imageio_ffmpeg
+    HAS_IMAGEIO_FFMPEG = True
+except ImportError:
+    HAS_IMAGEIO_FFMPEG = False
+
+# --- CONFIGURATION ---
+DEFAULT_FPS = 30
+DEFAULT_RESOLUTION = (480, 360)
+QUEUE_FRAMES = 64 # Frames buffered between the physics loop and the encoder thread
+
+# Third-person chase camera (matches the GUI follow camera)
+CAMERA_DISTANCE = 1.5
+CAMERA_YAW = 45
+CAMERA_PITCH = -20
+CAMERA_FOV = 60
+
+def _ffmpeg_binary():
+    """System ffmpeg, else the one bundled with imageio-ffmpeg, else None."""
+    binary = shutil.which("ffmpeg")
+    if binary is None and HAS_IMAGEIO_FFMPEG:
+        binary = imageio_ffmpeg.get_ffmpeg_exe()
+    return binary
+
+def write_png(path, rgb):
+    """Minimal RGB8 PNG writer (zlib only), used when no ffmpeg is available."""
+    height, width, _ = rgb.shape
+    raw = b"".join(b"\x00" + rgb[row].tobytes() for row in range(height)) # Filter type 0 per scanline
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+
+class HeadlessRecorder:
+    """
+    Offscreen video capture for DIRECT-mode (no display) simulations.
+    Frames come from PyBullet's CPU TinyRenderer at a decimated rate and are
+    encoded on a background thread, so the physics loop never waits on disk.
+
+    Encodes MP4 through ffmpeg when it is available; otherwise writes a PNG
+    sequence into a "<video>_frames" folder next to the requested path.
+    """
+    def __init__(self, video_path, client, sim_dt=1.0 / 240.0, fps=DEFAULT_FPS, resolution=DEFAULT_RESOLUTION,
+                 camera_distance=CAMERA_DISTANCE, camera_yaw=CAMERA_YAW, camera_pitch=CAMERA_PITCH):
+        """
+        Args:
+            video_path: Output .mp4 path
+            client: PyBullet physics client to render
+            sim_dt: Physics timestep (a frame is grabbed every round(1 / (fps * sim_dt)) ticks)
+            fps: Video frame rate
+            resolution: (width, height) in pixels
+        """
+        self.client = client
+        self.fps = fps
+        self.width, self.height = int(resolution[0]), int(resolution[1])
+        self.decimation = max(1, int(round(1.0 / (fps * sim_dt))))
+        self.camera = (camera_distance, camera_yaw, camera_pitch)
+        self.projection = p.computeProjectionMatrixFOV(CAMERA_FOV, self.width / self.height, 0.05, 50.0,
+                                                       physicsClientId=client)
+
+        self.ticks = 0
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.error = None
+
+        self._queue = queue.Queue(maxsize=QUEUE_FRAMES)
+        self._encoder = None
+        ffmpeg = _ffmpeg_binary()
+        if ffmpeg:
+            self.video_path = video_path
+            self._encoder = subprocess.Popen(
+                [ffmpeg, "-y", "-loglevel", "error",
+                 "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{self.width}x{self.height}", "-r", str(fps),
+                 "-i", "-", "-an", "-vcodec", "libx264", "-pix_fmt", "yuv420p", video_path],
+                stdin=subprocess.PIPE)
+        else:
+            print("⚠️  WARNING: 'ffmpeg' not found. Writing a PNG frame sequence instead of MP4.")
+            self.video_path = os.path.splitext(video_path)[0] + "_frames"
+            os.makedirs(self.video_path, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self._thread.start()
+
+    def capture(self, target_pos):
+        """
+        Call once per physics tick. Renders a frame (following target_pos) only
+        on decimated ticks and hands it to the encoder thread.
+        """
+        grab = self.ticks % self.decimation == 0
+        self.ticks += 1
+        if not grab:
+            return False
+
+        distance, yaw, pitch = self.camera
+        view = p.computeViewMatrixFromYawPitchRoll(target_pos, distance, yaw, pitch, 0, 2, physicsClientId=self.client)
+        _, _, rgba, _, _ = p.getCameraImage(self.width, self.height, view, self.projection,
+                                            renderer=p.ER_TINY_RENDERER, physicsClientId=self.client)
+        rgb = np.reshape(np.asarray(rgba, dtype=np.uint8), (self.height, self.width, 4))[:, :, :3]
+
+        try:
+            self._queue.put(rgb.copy(), timeout=1.0)
+            self.frames_captured += 1
+        except queue.Full:
+            self.frames_dropped += 1 # Encoder stalled: keep the physics loop moving
+        return True
+
+    def _encode_loop(self):
+        """Background thread: drains the frame queue into ffmpeg or PNG files."""
+        index = 0
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue # Keep draining so capture() never blocks
+            try:
+                if self._encoder is not None:
+                    self._encoder.stdin.write(frame.tobytes())
+                else:
+                    write_png(os.path.join(self.video_path, f"frame_{index:05d}.png"), frame)
+                index += 1
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+
+    def close(self):
+        """
+        Flushes the queue, finishes the file and stops the encoder thread.
+
+        Returns:
+            Path of the written video (or frame folder), None if encoding failed
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self._encoder is not None:
+            try:
+                self._encoder.stdin.close()
+            except OSError:
+                pass
+            if self._encoder.wait() != 0 and self.error is None:
+                self.error = f"ffmpeg exited with code {self._encoder.returncode}"
+
+        if self.error:
+            print(f"❌ Video Encode Error: {self.error}")
+            return None
+        print(f"🎞️  Saved {self.frames_captured} frames ({self.frames_dropped} dropped) to: {self.video_path}")
+        return self.video_path
+
+# --- TEST HARNESS ---
+if __name__ == "__main__":
+    import time
+    from app.sim.env import DroneSimulation
+
+    urdf_file = os.path.abspath("static/urdf_test/drone.urdf")
+    sim = DroneSimulation(gui=False)
+    sim.setup_world()
+    sim.load_drone(urdf_file, start_pos=[0, 0, 1.0])
+
+    recorder = HeadlessRecorder("headless_test.mp4", sim.client, sim_dt=sim.dt, fps=30, resolution=(320, 240))
+    t0 = time.perf_counter()
+    for i in range(480):
+        pos, _ = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)
+        recorder.capture(pos)
+        sim.step()
+    path = recorder.close()
+    print(f"⏱️  2s of sim recorded in {time.perf_counter() - t0:.2f}s wall -> {path}")
+    sim.close()
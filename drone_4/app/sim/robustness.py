@@ -0,0 +1,287 @@
+import os
+import csv
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.sim.batch import BatchDynamics, BatchFlightController, altitude_hold_throttle
+from app.sim.stability import hover_equilibrium
+
+# --- CONFIGURATION ---
+# Perturbation magnitudes, each run draws uniformly inside these (or Gaussian for noise)
+DEFAULT_PERTURBATIONS = {
+    "wind_ms": 6.0,             # Peak horizontal gust speed, random direction
+    "gust_window_sec": (0.5, 1.5), # Gust start time range (relative to the fork)
+    "gust_duration_sec": 1.0,
+    "mass_pct": 15.0,           # +/- payload / build variation
+    "cg_offset_m": 0.01,        # +/- per axis
+    "motor_degradation": 0.25,  # One random motor loses up to this fraction of thrust
+    "imu_noise_rad": 0.002,     # Std of the attitude estimate error
+    "imu_noise_tau_sec": 0.05,  # Correlation time of that error (estimator bandwidth)
+    "drag_center_m": 0.04       # Center of pressure above the CG (props / frame), lets gusts tilt the drone
+}
+
+# Pass criteria
+MAX_TILT_DEG = 35.0
+MAX_ALT_DEVIATION_M = 1.0
+CRASH_TILT = 1.2 # rad
+
+HOVER_HEIGHT_M = 2.0
+WARMUP_SEC = 2.0
+PERCENTILES = (50, 90, 99)
+
+# Per-run result columns (streamed to CSV, never held as telemetry)
+RUN_COLUMNS = [
+    "run", "passed", "crashed", "max_tilt_deg", "max_alt_deviation_m", "horizontal_drift_m",
+    "attitude_rms_deg", "wind_ms", "mass_factor", "cg_x_m", "cg_y_m", "weak_motor", "motor_efficiency",
+    "imu_noise_rad"
+]
+METRICS = ("max_tilt_deg", "max_alt_deviation_m", "horizontal_drift_m", "attitude_rms_deg")
+
+def warm_hover_state(physics_config, max_thrust_g=1200.0, pid_gains=None, dt=1.0 / 240.0):
+    """
+    Flies the nominal drone into a settled hover once.
+    Every sweep batch forks from this state instead of repeating takeoff.
+
+    Returns:
+        dict with the 13-float rigid body state and the PID memory
+    """
+    dyn = BatchDynamics([physics_config], max_thrust_g=max_thrust_g, dt=dt)
+    dyn.reset(start_pos=[0, 0, HOVER_HEIGHT_M])
+    fc = BatchFlightController.for_dynamics(dyn, gains=[pid_gains])
+    hover_throttle = hover_equilibrium(dyn)["hover_throttle"]
+
+    for _ in range(int(WARMUP_SEC / dt)):
+        rpy = dyn.get_euler()
+        base = altitude_hold_throttle(hover_throttle, HOVER_HEIGHT_M, dyn.positions[:, 2], dyn.velocities[:, 2], rpy)
+        dyn.step(fc.compute_motors(rpy, [0, 0, 0], base, dt, rates=dyn.body_rates))
+
+    return {"state": dyn.state[0].copy(), "prev_error": fc.prev_error[0].copy(), "integral": fc.integral[0].copy()}
+
+def sample_perturbations(rng, k, num_rotors, spec=None):
+    """Draws k perturbation sets. Returns a dict of (k,) / (k, 2) arrays."""
+    spec = dict(DEFAULT_PERTURBATIONS, **(spec or {}))
+    heading = rng.uniform(0.0, 2.0 * np.pi, k)
+    speed = rng.uniform(0.0, spec["wind_ms"], k)
+    return {
+        "wind": np.stack([speed * np.cos(heading), speed * np.sin(heading), np.zeros(k)], axis=1),
+        "wind_ms": speed,
+        "gust_start": rng.uniform(*spec["gust_window_sec"], k),
+        "mass_factor": 1.0 + rng.uniform(-1.0, 1.0, k) * spec["mass_pct"] / 100.0,
+        "cg_offset": rng.uniform(-1.0, 1.0, (k, 2)) * spec["cg_offset_m"],
+        "weak_motor": rng.integers(0, num_rotors, k),
+        "motor_efficiency": 1.0 - rng.uniform(0.0, spec["motor_degradation"], k),
+        "imu_noise_rad": np.full(k, spec["imu_noise_rad"]),
+        "imu_noise_tau": spec["imu_noise_tau_sec"],
+        "gust_duration": spec["gust_duration_sec"],
+        "drag_center": spec["drag_center_m"]
+    }
+
+def run_sweep_batch(physics_config, warm, runs, seed, batch_index, duration_sec=4.0, max_thrust_g=1200.0,
+                    pid_gains=None, perturbations=None, dt=1.0 / 240.0):
+    """
+    One vectorized batch of perturbed runs forked from a warm hover state.
+    Seeded per batch (seed, batch_index), so any run can be replayed on its own.
+
+    Returns:
+        List of per-run result rows (RUN_COLUMNS)
+    """
+    rng = np.random.default_rng([seed, batch_index])
+    dyn = BatchDynamics([physics_config] * runs, max_thrust_g=max_thrust_g, dt=dt)
+    fc = BatchFlightController.for_dynamics(dyn, gains=pid_gains)
+    hover_throttle = hover_equilibrium(dyn)["hover_throttle"] # Nominal: the controller doesn't know the perturbation
+
+    # Fork every run from the warm hover
+    dyn.state[:] = warm["state"]
+    fc.prev_error[:] = warm["prev_error"]
+    fc.integral[:] = warm["integral"]
+    start = dyn.state[:, :3].copy()
+
+    pert = sample_perturbations(rng, runs, dyn.num_rotors, perturbations)
+    dyn.mass *= pert["mass_factor"]
+    dyn.inertia *= pert["mass_factor"][:, None]
+    dyn.set_cg_offset(pert["cg_offset"])
+    dyn.drag_arm[:, 2] = pert["drag_center"]
+    dyn.motor_scale[np.arange(runs), pert["weak_motor"]] *= pert["motor_efficiency"]
+    gust_end = pert["gust_start"] + pert["gust_duration"]
+
+    crashed = np.zeros(runs, dtype=bool)
+    max_tilt = np.zeros(runs)
+    max_alt_dev = np.zeros(runs)
+    err_sq = np.zeros(runs)
+    ticks = np.zeros(runs)
+
+    # Attitude estimate error: first-order (AR(1)) process with std imu_noise_rad,
+    # like the output of a complementary filter rather than raw white noise
+    noise_decay = np.exp(-dt / pert["imu_noise_tau"])
+    noise_gain = pert["imu_noise_rad"][:, None] * np.sqrt(1.0 - noise_decay ** 2)
+    noise = rng.normal(0.0, 1.0, (runs, 3)) * pert["imu_noise_rad"][:, None]
+
+    sim_t = 0.0
+    for _ in range(int(duration_sec / dt)):
+        rpy = dyn.get_euler()
+        tilt = np.maximum(np.abs(rpy[:, 0]), np.abs(rpy[:, 1]))
+        crashed |= (tilt > CRASH_TILT) | (dyn.positions[:, 2] < 0.05) | ~np.isfinite(dyn.state).all(axis=1)
+        active = ~crashed
+        if not active.any(): break
+
+        max_tilt = np.where(active, np.maximum(max_tilt, tilt), max_tilt)
+        max_alt_dev = np.where(active, np.maximum(max_alt_dev, np.abs(dyn.positions[:, 2] - start[:, 2])), max_alt_dev)
+        err_sq += np.where(active, rpy[:, 0] ** 2 + rpy[:, 1] ** 2, 0.0)
+        ticks += active
+
+        gusting = (sim_t >= pert["gust_start"]) & (sim_t < gust_end)
+        dyn.wind = np.where(gusting[:, None], pert["wind"], 0.0)
+
+        # The controller only sees a noisy attitude estimate. The estimator error sits
+        # below the D path: D damps the gyro rate, differencing the estimate would
+        # amplify the noise by ~1/dt into motor saturation
+        noise = noise_decay * noise + noise_gain * rng.normal(0.0, 1.0, (runs, 3))
+        measured = rpy + noise
+        base = altitude_hold_throttle(hover_throttle, HOVER_HEIGHT_M, dyn.positions[:, 2], dyn.velocities[:, 2], measured)
+        dyn.step(fc.compute_motors(measured, [0, 0, 0], base, dt, rates=dyn.body_rates), active=active)
+        sim_t += dt
+
+    drift = np.linalg.norm(dyn.positions[:, :2] - start[:, :2], axis=1)
+    tilt_deg = np.degrees(max_tilt)
+    passed = ~crashed & (tilt_deg < MAX_TILT_DEG) & (max_alt_dev < MAX_ALT_DEVIATION_M)
+    rms_deg = np.degrees(np.sqrt(err_sq / np.maximum(ticks, 1)))
+
+    first_run = batch_index * runs
+    return [{
+        "run": first_run + k,
+        "passed": bool(passed[k]),
+        "crashed": bool(crashed[k]),
+        "max_tilt_deg": round(float(tilt_deg[k]), 2),
+        "max_alt_deviation_m": round(float(max_alt_dev[k]), 4),
+        "horizontal_drift_m": round(float(drift[k]), 4) if np.isfinite(drift[k]) else None,
+        "attitude_rms_deg": round(float(rms_deg[k]), 3),
+        "wind_ms": round(float(pert["wind_ms"][k]), 2),
+        "mass_factor": round(float(pert["mass_factor"][k]), 3),
+        "cg_x_m": round(float(pert["cg_offset"][k, 0]), 4),
+        "cg_y_m": round(float(pert["cg_offset"][k, 1]), 4),
+        "weak_motor": int(pert["weak_motor"][k]),
+        "motor_efficiency": round(float(pert["motor_efficiency"][k]), 3),
+        "imu_noise_rad": float(pert["imu_noise_rad"][k])
+    } for k in range(runs)]
+
+def _sweep_job(job):
+    """Worker entry point: one seeded batch."""
+    return run_sweep_batch(**job)
+
+def iter_sweep(physics_config, runs=1000, batch_size=256, seed=0, max_workers=1, **kwargs):
+    """
+    Streams per-run result rows batch by batch (in completion order with a pool).
+    Only one batch of simulator state is alive per worker at any time.
+
+    Args:
+        runs: Total seeded variations
+        batch_size: Runs per vectorized batch
+        max_workers: >1 spreads batches over a process pool
+        **kwargs: run_sweep_batch options (duration_sec, pid_gains, perturbations, max_thrust_g)
+    """
+    warm = warm_hover_state(physics_config, kwargs.get("max_thrust_g", 1200.0), kwargs.get("pid_gains"))
+    jobs = []
+    for b, first in enumerate(range(0, runs, batch_size)):
+        jobs.append(dict(kwargs, physics_config=physics_config, warm=warm, runs=min(batch_size, runs - first),
+                         seed=seed, batch_index=b))
+    # All batches but the last are full, so run ids stay batch_index * batch_size + k
+
+    if max_workers <= 1:
+        for job in jobs:
+            yield from run_sweep_batch(**job)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_sweep_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def robustness_sweep(physics_config, runs=1000, batch_size=256, seed=0, max_workers=None, output_path=None,
+                     worst=5, **kwargs):
+    """
+    Monte Carlo robustness sweep for one SKU: wind gusts (through the drag path),
+    +/- mass, CG offsets, one degraded motor and IMU noise, forked from a warm hover.
+
+    Args:
+        output_path: Optional CSV that receives every run row as it completes
+        worst: How many worst runs (by max tilt) to keep with their perturbations
+        **kwargs: run_sweep_batch options (duration_sec, pid_gains, perturbations, max_thrust_g)
+
+    Returns:
+        {"runs", "pass_rate", "crash_rate", "percentiles": {metric: {p50, p90, p99}}, "worst_runs": [...]}
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+
+    # Per-run scalars only: 10k runs x a few metrics is well under a MB
+    metrics = {name: np.full(runs, np.nan, dtype=np.float32) for name in METRICS}
+    passed = crashed = done = 0
+    worst_runs = []
+
+    writer, handle = None, None
+    if output_path:
+        handle = open(output_path, "w", newline="")
+        writer = csv.DictWriter(handle, fieldnames=RUN_COLUMNS)
+        writer.writeheader()
+
+    try:
+        for row in iter_sweep(physics_config, runs, batch_size, seed, max_workers, **kwargs):
+            for name in METRICS:
+                if row[name] is not None: metrics[name][row["run"]] = row[name]
+            passed += row["passed"]
+            crashed += row["crashed"]
+            done += 1
+            if writer: writer.writerow(row)
+
+            worst_runs.append(row)
+            if len(worst_runs) > worst * 4:
+                worst_runs = sorted(worst_runs, key=lambda r: (r["crashed"], r["max_tilt_deg"]), reverse=True)[:worst]
+            if done % batch_size == 0:
+                print(f"   [{done}/{runs}] pass rate so far {100.0 * passed / done:.1f}%")
+    finally:
+        if handle: handle.close()
+
+    worst_runs = sorted(worst_runs, key=lambda r: (r["crashed"], r["max_tilt_deg"]), reverse=True)[:worst]
+    summary = {
+        "runs": done,
+        "pass_rate": round(passed / done, 4) if done else 0.0,
+        "crash_rate": round(crashed / done, 4) if done else 0.0,
+        "percentiles": {
+            name: {f"p{q}": round(float(np.nanpercentile(values, q)), 4) for q in PERCENTILES}
+            for name, values in metrics.items() if np.isfinite(values).any()
+        },
+        "worst_runs": worst_runs,
+        "seed": seed,
+        "elapsed_s": round(time.perf_counter() - t0, 2)
+    }
+    print(f"🎲 Sweep: {done} runs | Pass {summary['pass_rate'] * 100:.1f}% | Crash {summary['crash_rate'] * 100:.1f}% "
+          f"| {summary['elapsed_s']}s")
+    return summary
+
+def sweep_catalog(catalog_path="drone_catalog.json", runs=1000, **kwargs):
+    """Runs robustness_sweep for every SKU (with its tuned pid_gains, if any)."""
+    with open(catalog_path, "r") as f:
+        catalog = json.load(f)
+
+    results = []
+    for entry in catalog:
+        technical_data = entry.get("technical_data", {})
+        print(f"🌪️  Robustness sweep: {entry.get('sku_id')} ({runs} runs)")
+        summary = robustness_sweep(technical_data.get("physics_config", {}), runs=runs,
+                                   pid_gains=technical_data.get("pid_gains"), **kwargs)
+        summary["sku_id"] = entry.get("sku_id")
+        results.append(summary)
+    return results
+
+# --- TEST HARNESS ---
+if __name__ == "__main__":
+    with open("drone_catalog.json", "r") as f:
+        entry = json.load(f)[0]
+    config = entry["technical_data"]["physics_config"]
+
+    report = robustness_sweep(config, runs=2000, output_path="sweep_runs.csv")
+    print(json.dumps({k: v for k, v in report.items() if k != "worst_runs"}, indent=2))
+    for run in report["worst_runs"]:
+        print(f"   Worst: run {run['run']} tilt {run['max_tilt_deg']}° wind {run['wind_ms']}m/s "
+              f"mass x{run['mass_factor']} motor {run['weak_motor']}@{run['motor_efficiency']}")
@@ -1,48 +1,197 @@
 import time
+import copy
 import numpy as np
 import pybullet as p
 import os
+import json
 from app.sim.env import DroneSimulation
 from app.sim.aero import Aerodynamics
 from app.sim.pid import FlightController
+from app.sim.batch import BatchDynamics, BatchFlightController, drone_params_from_config
+from app.sim.battery import BatteryModel, pack_current, prop_diameter_from_layout
+from app.sim.telemetry import TelemetryRecorder
+from app.sim.recorder import HeadlessRecorder, DEFAULT_FPS, DEFAULT_RESOLUTION
+from app.sim.mixer import quad_command_to_rotors, spin_dirs_from_positions
+from app.sim.timeline import CompiledTimeline, AIR_SHOW
+from app.sim.monitor import SteadyStateMonitor, DIVERGED, CRASH_TILT
+
+BACKENDS = ("pybullet", "batch")
+
+# Hover altitude hold: height error -> capped climb rate -> PI on vertical speed.
+# The integral learns the hover throttle, so the drone settles on target_height
+# (a P-only loop on height parks it (hover - 0.05) / kp below target)
+ALT_IDLE_THROTTLE = 0.05  # Warmup throttle, and the floor the integral builds on
+ALT_KP = 3.0              # Commanded climb rate (m/s) per m of height error
+ALT_MAX_CLIMB = 2.0       # m/s
+ALT_VEL_KP = 0.25         # Throttle per m/s of climb-rate error
+ALT_VEL_KI = 1.0
+
+def _altitude_hold(error_z, vz, integral, dt):
+    """
+    One tick of the hover altitude loop (scalars or (N,) arrays).
+
+    Returns:
+        (base_throttle before clipping, updated integral)
+    """
+    rate_error = np.clip(ALT_KP * error_z, -ALT_MAX_CLIMB, ALT_MAX_CLIMB) - vz
+    integral = np.clip(integral + ALT_VEL_KI * rate_error * dt, 0.0, 1.0 - ALT_IDLE_THROTTLE)
+    return ALT_IDLE_THROTTLE + integral + ALT_VEL_KP * rate_error, integral
+
+def _hover_verdict(avg_hover_th, crashed):
+    """Shared PASS/WARNING/FAIL logic for hover tests."""
+    status = "PASS"
+    warnings = []
+    if crashed: status = "FAIL"
+    elif avg_hover_th > 0.75:
+        status = "FAIL"
+        warnings.append("Unflyable: Hover throttle > 75%")
+    elif avg_hover_th > 0.50:
+        status = "WARNING"
+        warnings.append("Heavy: Hover throttle > 50%")
+    return status, warnings
 
 class FlightTestRunner:
     """
     Automated Test Pilot.
     Runs specific flight scenarios and captures telemetry + video.
     """
-    def __init__(self, urdf_path, max_thrust_g=1200.0, gui=False):
+    def __init__(self, urdf_path, max_thrust_g=1200.0, gui=False, backend="pybullet", physics_config=None, client=None,
+                 telemetry_decimation=1, battery=None, pid_gains=None, realtime=None, video_fps=DEFAULT_FPS,
+                 video_resolution=DEFAULT_RESOLUTION):
+        """
+        Args:
+            urdf_path: Drone URDF (only used by the "pybullet" backend)
+            max_thrust_g: Max thrust per motor in grams
+            gui: Open the PyBullet window (pybullet backend only)
+            backend: "pybullet" (full sim) or "batch" (vectorized NumPy integrator)
+            physics_config: SKU physics_config, drives mass/thrust/geometry in "batch"
+                            (its "thrust_curve", if any, is used by both backends)
+            client: Existing PyBullet client id to run in (None = connect a new one)
+            telemetry_decimation: Keep one telemetry sample every N physics ticks
+            battery: Battery params (capacity_mah, cells, internal_resistance_ohm) for the
+                     hover test's energy/sag model. Defaults to physics_config["battery"];
+                     with neither, the hover test runs on an ideal supply.
+            pid_gains: Attitude PID gains (technical_data["pid_gains"], see autotune.py).
+                       None = the default 5" tune.
+            realtime: Sleep one tick per step so the GUI plays at real speed. Defaults to gui.
+            video_fps: Frame rate of headless (DIRECT) recordings
+            video_resolution: (width, height) of headless recordings
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Expected one of {BACKENDS}")
+
         self.urdf_path = urdf_path
         self.max_thrust_g = max_thrust_g
         self.gui = gui
-        
-        # Telemetry Log
+        self.backend = backend
+        self.physics_config = physics_config or {}
+        self.client = client
+        self.telemetry_decimation = telemetry_decimation
+        self.battery = battery or self.physics_config.get("battery")
+        self.pid_gains = pid_gains
+        self.realtime = gui if realtime is None else realtime
+        self.video_fps = video_fps
+        self.video_resolution = video_resolution
+        params = drone_params_from_config(self.physics_config, max_thrust_g)
+        self.prop_diameter_m = float(prop_diameter_from_layout(params["radius_m"], params["rotor_count"]))
+
+        # Telemetry of the most recent run (fresh recorder per scenario)
+        self.telemetry = None
         self.log = {
             "time": [],
             "height": [],
             "throttle_avg": [],
             "events": []
         }
-    def run_acrobatic_show(self, duration_sec=15.0, video_filename="stunt_show.mp4"):
+
+    def _make_aero(self, sim):
+        """
+        Aerodynamics for the loaded drone: one motor per prop joint in the URDF, spin
+        directions from the prop positions, and its measured thrust curve when the config has one.
+        """
+        return Aerodynamics(max_thrust_g=self.max_thrust_g,
+                            num_motors=len(sim.prop_joints),
+                            thrust_curves=self.physics_config.get("thrust_curve"),
+                            spin_dirs=spin_dirs_from_positions(sim.prop_positions))
+
+    def _drain_battery(self, battery, aero, dt):
+        """
+        Draws this tick's motor current from the pack and sags the available thrust.
+        Returns True on the tick the pack first hits its voltage cutoff.
+        """
+        was_depleted = bool(battery.depleted[0])
+        battery.step(pack_current(aero.last_current_a, aero.last_thrust_n, battery.voltage, self.prop_diameter_m), dt)
+        aero.thrust_scale = float(battery.thrust_scale()[0])
+        return bool(battery.depleted[0]) and not was_depleted
+
+    def _start_video(self, sim, video_filename):
+        """
+        Opt-in: nothing is recorded unless the caller passed a video_filename.
+        GUI runs record the window (STATE_LOGGING_VIDEO_MP4). Headless runs grab
+        TinyRenderer frames at video_fps and encode them on a background thread.
+
+        Returns:
+            (state_log_id, HeadlessRecorder), either can be None
+        """
+        if not video_filename:
+            return None, None
+        print(f"🎥 Recording to: {video_filename}")
+        if self.gui:
+            return p.startStateLogging(p.STATE_LOGGING_VIDEO_MP4, video_filename, physicsClientId=sim.client), None
+        return None, HeadlessRecorder(video_filename, sim.client, sim_dt=sim.dt, fps=self.video_fps,
+                                      resolution=self.video_resolution)
+
+    def _stop_video(self, sim, video_filename, video_log_id, recorder):
+        """Finishes the recording. Returns the written video path (None if nothing was recorded)."""
+        if video_log_id is not None:
+            p.stopStateLogging(video_log_id, physicsClientId=sim.client)
+            return video_filename
+        if recorder is not None:
+            return recorder.close()
+        return None
+
+    def _record(self, sim, sim_t, pos, quat, rpy, motors, base_throttle):
+        """Writes one tick of full state into the run's TelemetryRecorder."""
+        if not self.telemetry.wants_sample():
+            self.telemetry.tick()
+            return
+        lin_vel, ang_vel = p.getBaseVelocity(sim.drone_id, physicsClientId=sim.client)
+        self.telemetry.record(sim_t, pos, quat, rpy, lin_vel, ang_vel, motors, base_throttle)
+    def run_acrobatic_show(self, duration_sec=15.0, video_filename=None, script=None):
         """
         Scenario 2: The Air Show.
         Hover -> Forward -> Barrel Roll -> Backward -> Loop-de-Loop.
+
+        Args:
+            video_filename: Record the run to this path (None = no video).
+                            Headless runs render every frame on the CPU, so only pass it for review videos.
+            script: Scenario segments (see app/sim/timeline.py) or a CompiledTimeline.
+                    Defaults to AIR_SHOW.
         """
         print(f"🎪 Starting ACROBATIC SHOW ({duration_sec}s)...")
+
+        if self.backend == "batch":
+            report = batch_acrobatic_show([self.physics_config], duration_sec, self.max_thrust_g,
+                                          decimation=self.telemetry_decimation, pid_gains=[self.pid_gains],
+                                          script=script)[0]
+            self.telemetry = report["telemetry"]
+            report["video_path"] = None
+            return report
         
-        sim = DroneSimulation(gui=self.gui)
+        sim = DroneSimulation(gui=self.gui, client=self.client)
         sim.setup_world()
         
         # Spawn high enough to do a loop without hitting the floor
         sim.load_drone(self.urdf_path, start_pos=[0, 0, 1.5])
         
-        video_log_id = None
-        if self.gui and video_filename:
-            print(f"🎥 Recording Stunts to: {video_filename}")
-            video_log_id = p.startStateLogging(p.STATE_LOGGING_VIDEO_MP4, video_filename)
+        video_log_id, recorder = self._start_video(sim, video_filename)
         
-        aero = Aerodynamics(max_thrust_g=self.max_thrust_g)
-        fc = FlightController()
+        aero = self._make_aero(sim)
+        fc = FlightController.for_sim(sim, gains=self.pid_gains)
+        self.telemetry = TelemetryRecorder(duration_sec, dt=sim.dt, decimation=self.telemetry_decimation,
+                                           num_motors=len(sim.prop_joints))
+        timeline = script if isinstance(script, CompiledTimeline) else \
+            CompiledTimeline(script or AIR_SHOW, duration_sec, dt=sim.dt)
         
         sim_t = 0
         steps = int(duration_sec * 240)
@@ -56,149 +205,132 @@ class FlightTestRunner:
         try:
             for i in range(steps):
                 # 1. Telemetry
-                pos, quat = p.getBasePositionAndOrientation(sim.drone_id)
+                pos, quat = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)
                 current_z = pos[2]
-                rpy = p.getEulerFromQuaternion(quat) # [Roll, Pitch, Yaw]
+                rpy = p.getEulerFromQuaternion(quat, physicsClientId=sim.client) # [Roll, Pitch, Yaw]
                 
-                # Default Control Mode: STABILIZED (PID)
-                mode = "PID"
-                target_rpy = [0, 0, 0]
                 error_z = target_z - current_z
                 # Base throttle logic for altitude hold
                 base_throttle = 0.05 + (kp_alt * error_z)
                 base_throttle = np.clip(base_throttle, 0.0, 1.0)
 
                 # --- THE STUNT SCRIPT ---
-                
-                # A. Fly Forward (T=2s to T=4s)
-                if 2.0 < sim_t < 4.0:
-                    if abs(sim_t - 2.0) < 0.01: print("   > T=2.0s: Pitch Forward (Advance)")
-                    target_rpy = [0, -0.3, 0] # Pitch down 0.3 rad (~17 deg)
-                    base_throttle += 0.05 # Add power to maintain altitude while tilted
-
-                # B. Brake & Hover (T=4s to T=5s)
-                elif 4.0 < sim_t < 5.0:
-                    target_rpy = [0, 0.2, 0] # Pitch back slightly to brake
-
-                # C. Barrel Roll (T=5s to T=5.8s) - MANUAL OVERRIDE
-                elif 5.0 < sim_t < 5.8:
-                    if abs(sim_t - 5.0) < 0.01: print("   > T=5.0s: 🌪️ BARREL ROLL!")
-                    mode = "MANUAL"
-                    # Full Left Roll: Left motors low, Right motors high
-                    # Plus extra throttle to not drop
-                    # FL(0), FR(1), RL(2), RR(3)
-                    # To Roll Right: Speed up Left (0,2), Slow Right (1,3)
-                    override_motors = [0.1, 0.9, 0.1, 0.9] 
-
-                # D. Stabilize (T=5.8s to T=7s)
-                elif 5.8 < sim_t < 7.0:
-                    pass # Default PID Hover
-
-                # E. Fly Backward (T=7s to T=9s)
-                elif 7.0 < sim_t < 9.0:
-                    if abs(sim_t - 7.0) < 0.01: print("   > T=7.0s: Fly Backward (Retreat)")
-                    target_rpy = [0, 0.3, 0] # Pitch up/back
-                    base_throttle += 0.05
-
-                # F. Loop-de-Loop (T=10s to T=11s) - MANUAL OVERRIDE
-                elif 10.0 < sim_t < 11.0:
-                    if abs(sim_t - 10.0) < 0.01: print("   > T=10.0s: ➰ LOOP-DE-LOOP!")
-                    mode = "MANUAL"
-                    # To Loop (Pitch Back hard):
-                    # Front motors (0,1) HIGH, Rear motors (2,3) LOW
-                    override_motors = [1.0, 1.0, 0.0, 0.0] 
-
-                # G. Recover (T=11s+)
-                else:
-                    target_z = 1.5 # Ensure we go back to height
+                mode, target_rpy, throttle_boost, override_motors, note = timeline.command(i)
+                if note: print(note)
+                base_throttle += throttle_boost
 
                 # --- CONTROL MIXER ---
                 if mode == "PID":
-                    motors = fc.compute_motors(sim.drone_id, target_rpy, base_throttle, sim.dt)
+                    motors = fc.compute_motors(sim.drone_id, target_rpy, base_throttle, sim.dt, client=sim.client)
                 else:
-                    motors = override_motors # Raw "Acro" input
+                    motors = quad_command_to_rotors(override_motors, fc.mixer) # Raw "Acro" input
+
+                self._record(sim, sim_t, pos, quat, rpy, motors, base_throttle)
 
                 # Physics Update
-                aero.update(sim.drone_id, sim.prop_joints, motors)
+                aero.update(sim.drone_id, sim.prop_joints, motors, client=sim.client)
                 sim.step()
                 sim_t += sim.dt
                 
                 # Camera Tracking (Third Person)
+                if recorder is not None:
+                    recorder.capture(pos)
                 if self.gui:
                     # Offset camera behind the drone
-                    p.resetDebugVisualizerCamera(1.5, -45, -20, pos)
+                    p.resetDebugVisualizerCamera(1.5, -45, -20, pos, physicsClientId=sim.client)
+                if self.realtime:
                     time.sleep(1./240.)
 
         except Exception as e:
             print(f"❌ Sim Error: {e}")
         finally:
-            if video_log_id is not None:
-                p.stopStateLogging(video_log_id)
+            video_path = self._stop_video(sim, video_filename, video_log_id, recorder)
         
         # Return sim for inspection
-        return {"status": "COMPLETE", "video_path": video_filename, "sim_instance": sim}
-    def run_hover_test(self, duration_sec=5.0, target_height=1.0, video_filename="flight_record.mp4"):
+        return {"status": "COMPLETE", "video_path": video_path, "telemetry": self.telemetry, "sim_instance": sim}
+    def run_hover_test(self, duration_sec=5.0, target_height=1.0, video_filename=None,
+                       early_exit=True, monitor_config=None):
         """
         Scenario 1: Stability Check.
         Returns the simulation object so the window can be kept open.
+
+        Args:
+            video_filename: Record the run to this path (None = no video, see run_acrobatic_show)
+            early_exit: Stop as soon as the hover has settled or is clearly diverging
+            monitor_config: Optional SteadyStateMonitor kwargs (windows, tolerances)
         """
         print(f"🧪 Starting HOVER Test ({duration_sec}s target {target_height}m)...")
+
+        if self.backend == "batch":
+            config = dict(self.physics_config, battery=self.battery) if self.battery else self.physics_config
+            report = batch_hover_test([config], duration_sec, target_height, self.max_thrust_g,
+                                      decimation=self.telemetry_decimation, early_exit=early_exit,
+                                      monitor_config=monitor_config, pid_gains=[self.pid_gains])[0]
+            self.telemetry = report["telemetry"]
+            self.log = report["flight_log"]
+            report["video_path"] = None
+            print(f"📊 Report: Status={report['status']} | Hover Throttle={report['hover_throttle_pct']:.1f}%")
+            return report
         
-        sim = DroneSimulation(gui=self.gui)
+        sim = DroneSimulation(gui=self.gui, client=self.client)
         sim.setup_world()
         
         # --- FIX 1: SAFER SPAWN HEIGHT ---
         # Spawning at 1.0m ensures absolutely no collision with ground on init.
         sim.load_drone(self.urdf_path, start_pos=[0, 0, 1.0])
         
-        # --- FIX 2: VIDEO RECORDING ---
-        video_log_id = None
-        if self.gui and video_filename:
-            print(f"🎥 Recording Simulation to: {video_filename}")
-            video_log_id = p.startStateLogging(p.STATE_LOGGING_VIDEO_MP4, video_filename)
+        # --- FIX 2: VIDEO RECORDING (GUI window or headless TinyRenderer) ---
+        video_log_id, recorder = self._start_video(sim, video_filename)
         
-        aero = Aerodynamics(max_thrust_g=self.max_thrust_g)
-        fc = FlightController()
+        aero = self._make_aero(sim)
+        fc = FlightController.for_sim(sim, gains=self.pid_gains)
+        self.telemetry = TelemetryRecorder(duration_sec, dt=sim.dt, decimation=self.telemetry_decimation,
+                                           num_motors=len(sim.prop_joints))
         
         # Flight State Machine: 0=Warmup, 1=Climb, 2=Hover
         state = 0
         hover_throttles = []
         
-        # PID Constants
-        kp_alt = 0.5
+        # Altitude hold (see _altitude_hold)
+        alt_integral = 0.0
         base_throttle = 0.0
         
         sim_t = 0
         steps = int(duration_sec * 240)
         
         crashed = False
+        monitor = SteadyStateMonitor(dt=sim.dt, target_height=target_height, **(monitor_config or {})) \
+            if early_exit else None
+        early_reason = None
+        battery = BatteryModel.from_params(self.battery) if self.battery else None
         
         try:
             for i in range(steps):
                 # 1. State Logic
-                pos, quat = p.getBasePositionAndOrientation(sim.drone_id)
+                pos, quat = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)
                 current_z = pos[2]
                 
                 # Check for Rollover Crash
-                rpy = p.getEulerFromQuaternion(quat)
-                if abs(rpy[0]) > 1.5 or abs(rpy[1]) > 1.5: 
+                rpy = p.getEulerFromQuaternion(quat, physicsClientId=sim.client)
+                if abs(rpy[0]) > CRASH_TILT or abs(rpy[1]) > CRASH_TILT: 
                     msg = f"CRASH: Rollover at t={sim_t:.2f}"
-                    self.log['events'].append(msg)
+                    self.telemetry.event(msg)
                     print(f"💥 {msg}")
                     crashed = True
                     break
 
                 # Altitude Logic
                 error_z = target_height - current_z
+                vz = p.getBaseVelocity(sim.drone_id, physicsClientId=sim.client)[0][2]
                 
                 if state == 0: # Warmup (0.5s)
-                    base_throttle = 0.05
+                    base_throttle = ALT_IDLE_THROTTLE
                     if sim_t > 0.5: state = 1
                 elif state == 1: # Climbing
-                    base_throttle = 0.05 + (kp_alt * error_z)
+                    base_throttle, alt_integral = _altitude_hold(error_z, vz, alt_integral, sim.dt)
                     if abs(error_z) < 0.1: state = 2
                 elif state == 2: # Hovering
-                    base_throttle = 0.05 + (kp_alt * error_z)
+                    base_throttle, alt_integral = _altitude_hold(error_z, vz, alt_integral, sim.dt)
                     hover_throttles.append(base_throttle)
 
                 base_throttle = np.clip(base_throttle, 0.0, 1.0)
@@ -208,60 +340,464 @@ class FlightTestRunner:
                     sim.drone_id, 
                     target_rpy=[0, 0, 0], 
                     target_thrust=base_throttle, 
-                    dt=sim.dt
+                    dt=sim.dt,
+                    client=sim.client
                 )
+
+                # Logging (state at sim_t + the command applied over this tick)
+                self._record(sim, sim_t, pos, quat, rpy, motors, base_throttle)
+                
+                # Early Termination (settled or clearly diverging)
+                if monitor is not None:
+                    outcome = monitor.update(sim_t, current_z, base_throttle, rpy)[0]
+                    if outcome != 0:
+                        early_reason = monitor.reason[0]
+                        if outcome == DIVERGED:
+                            msg = f"DIVERGED: {early_reason}"
+                            crashed = True
+                        else:
+                            msg = f"EARLY EXIT: {early_reason}"
+                        self.telemetry.event(msg)
+                        print(f"⏹️  {msg}")
+                        break
                 
                 # 3. Physics Step
-                aero.update(sim.drone_id, sim.prop_joints, motors)
+                aero.update(sim.drone_id, sim.prop_joints, motors, client=sim.client)
+                if battery is not None and self._drain_battery(battery, aero, sim.dt):
+                    msg = f"BATTERY: Cutoff voltage at t={sim_t:.2f}"
+                    self.telemetry.event(msg)
+                    print(f"🪫 {msg}")
                 sim.step()
                 sim_t += sim.dt
                 
-                # Logging
-                self.log['time'].append(sim_t)
-                self.log['height'].append(current_z)
-                self.log['throttle_avg'].append(np.mean(motors))
-                
                 # Visual Camera Follow
+                if recorder is not None:
+                    recorder.capture(pos)
                 if self.gui:
-                    p.resetDebugVisualizerCamera(1.5, 45, -20, pos)
+                    p.resetDebugVisualizerCamera(1.5, 45, -20, pos, physicsClientId=sim.client)
+                if self.realtime:
                     time.sleep(1./240.)
 
         except Exception as e:
             print(f"❌ Sim Error: {e}")
             crashed = True
         finally:
-            if video_log_id is not None:
-                p.stopStateLogging(video_log_id)
+            video_path = self._stop_video(sim, video_filename, video_log_id, recorder)
             
             # --- CRITICAL FIX: DO NOT CLOSE SIM HERE ---
             # We return the 'sim' object to the caller so they can inspect it.
             
         # Analysis
+        self.log = self.telemetry.to_log()
         avg_hover_th = np.mean(hover_throttles) if hover_throttles else 0.0
         twr_est = 1.0 / avg_hover_th if avg_hover_th > 0 else 0
         
-        status = "PASS"
-        warnings = []
-        if crashed: status = "FAIL"
-        elif avg_hover_th > 0.50: 
-            status = "WARNING"
-            warnings.append("Heavy: Hover throttle > 50%")
-        elif avg_hover_th > 0.75:
-            status = "FAIL"
-            warnings.append("Unflyable: Hover throttle > 75%")
+        status, warnings = _hover_verdict(avg_hover_th, crashed)
             
         print(f"📊 Report: Status={status} | Hover Throttle={avg_hover_th*100:.1f}%")
+        battery_report = battery.report() if battery is not None else None
+        if battery_report:
+            print(f"🔋 Battery: {battery_report['consumed_mah']}mAh used | "
+                  f"Min {battery_report['min_voltage_v']}V | Endurance ~{battery_report['projected_endurance_min']}min")
         
         return {
             "status": status,
             "hover_throttle_pct": round(avg_hover_th * 100, 1),
             "estimated_twr": round(twr_est, 2),
             "warnings": warnings,
-            "video_path": video_filename,
+            "video_path": video_path,
             "flight_log": self.log,
+            "telemetry": self.telemetry,
+            "terminated_early": early_reason,
+            "sim_time_s": round(sim_t, 3),
+            "battery": battery_report,
             "sim_instance": sim # Return the live simulation object
         }
 
+    # --- HOVER CHECKPOINT & FORK ---
+    def capture_hover_checkpoint(self, target_height=1.0, max_settle_sec=10.0, settle_sec=1.0, band_m=0.1):
+        """
+        Flies warmup + climb once, then snapshots the world as soon as the drone
+        holds a stable hover: level, with height inside a band_m band for settle_sec.
+        Variants forked from the snapshot skip URDF load, warmup and climb.
+
+        Returns:
+            dict checkpoint for run_variant (holds the live sim + a p.saveState id)
+        """
+        if self.backend != "pybullet":
+            raise ValueError("Hover checkpoints need the 'pybullet' backend")
+
+        print(f"📸 Capturing HOVER Checkpoint (target {target_height}m)...")
+        sim = DroneSimulation(gui=self.gui, client=self.client)
+        sim.setup_world()
+        sim.load_drone(self.urdf_path, start_pos=[0, 0, target_height])
+
+        aero = self._make_aero(sim)
+        fc = FlightController.for_sim(sim, gains=self.pid_gains)
+        kp_alt = 0.5
+
+        sim_t = 0.0
+        window_start, z_lo, z_hi = None, None, None
+        for i in range(int(max_settle_sec * 240)):
+            pos, quat = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)
+            rpy = p.getEulerFromQuaternion(quat, physicsClientId=sim.client)
+
+            if abs(rpy[0]) > CRASH_TILT or abs(rpy[1]) > CRASH_TILT:
+                raise RuntimeError(f"CRASH: Rollover at t={sim_t:.2f} before reaching hover")
+
+            # Altitude loop is P-only: the drone bobs around a height below target_height,
+            # so "stable" means the bobbing has died down, not that the target was reached
+            level = abs(rpy[0]) < 0.05 and abs(rpy[1]) < 0.05
+            if sim_t <= 0.5 or not level:
+                window_start = None
+            elif window_start is None or max(z_hi, pos[2]) - min(z_lo, pos[2]) > band_m:
+                window_start, z_lo, z_hi = sim_t, pos[2], pos[2]
+            else:
+                z_lo, z_hi = min(z_lo, pos[2]), max(z_hi, pos[2])
+
+            if window_start is not None and sim_t - window_start >= settle_sec:
+                state_id = sim.save_state()
+                print(f"   ✅ Hover captured at t={sim_t:.2f}s (z={pos[2]:.2f}m)")
+                return {
+                    "sim": sim,
+                    "state_id": state_id,
+                    "fc": copy.deepcopy(fc), # PID memory is not part of p.saveState
+                    "sim_t": sim_t,
+                    "target_height": target_height,
+                    "kp_alt": kp_alt
+                }
+
+            base_throttle = 0.05 if sim_t <= 0.5 else 0.05 + kp_alt * (target_height - pos[2])
+            base_throttle = np.clip(base_throttle, 0.0, 1.0)
+            motors = fc.compute_motors(sim.drone_id, [0, 0, 0], base_throttle, sim.dt, client=sim.client)
+            aero.update(sim.drone_id, sim.prop_joints, motors, client=sim.client)
+            sim.step()
+            sim_t += sim.dt
+
+        raise RuntimeError(f"Drone never reached a stable hover within {max_settle_sec}s")
+
+    def run_variant(self, checkpoint, variant, duration_sec=3.0):
+        """
+        Forks one scenario variant from a hover checkpoint (p.restoreState).
+
+        Args:
+            checkpoint: Output of capture_hover_checkpoint
+            variant: dict with a "type" and its parameters (times are relative to the fork):
+                {"type": "hold"}
+                {"type": "gust", "force_n": [fx, fy, fz], "start": 0.5, "end": 1.0}
+                {"type": "step", "target_rpy": [r, p, y], "start": 0.5}
+                {"type": "motor_failure", "motor": 0, "start": 0.5, "efficiency": 0.0}
+                {"type": "stunt", "motors": [m0, m1, m2, m3], "start": 0.5, "end": 0.9}
+            duration_sec: Length of the forked run
+        """
+        sim = checkpoint["sim"]
+        sim.restore_state(checkpoint["state_id"])
+        fc = copy.deepcopy(checkpoint["fc"])
+        aero = self._make_aero(sim)
+        kp_alt = checkpoint["kp_alt"]
+        target_height = checkpoint["target_height"]
+
+        kind = variant.get("type", "hold")
+        start = variant.get("start", 0.5)
+        end = variant.get("end", duration_sec)
+        name = variant.get("name", kind)
+
+        self.telemetry = TelemetryRecorder(duration_sec, dt=sim.dt, decimation=self.telemetry_decimation,
+                                           num_motors=len(sim.prop_joints))
+        t = 0.0
+        crashed = False
+        z0 = None
+        max_tilt = 0.0
+        max_alt_dev = 0.0
+
+        for i in range(int(duration_sec * 240)):
+            pos, quat = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)
+            rpy = p.getEulerFromQuaternion(quat, physicsClientId=sim.client)
+            if z0 is None: z0 = pos[2]
+
+            if abs(rpy[0]) > CRASH_TILT or abs(rpy[1]) > CRASH_TILT:
+                if not (kind == "stunt" and start <= t < end + 0.5):
+                    self.telemetry.event(f"CRASH: Rollover at t={t:.2f}")
+                    crashed = True
+                    break
+
+            in_window = start <= t < end
+            target_rpy = [0, 0, 0]
+            base_throttle = np.clip(0.05 + kp_alt * (target_height - pos[2]), 0.0, 1.0)
+
+            if kind == "step" and t >= start:
+                target_rpy = variant.get("target_rpy", [0.2, 0, 0])
+
+            if kind == "stunt" and in_window:
+                # Default: barrel roll (quad motor order, re-targeted for other layouts)
+                motors = list(quad_command_to_rotors(variant.get("motors", [0.1, 0.9, 0.1, 0.9]), fc.mixer))
+            else:
+                motors = fc.compute_motors(sim.drone_id, target_rpy, base_throttle, sim.dt, client=sim.client)
+
+            if kind == "motor_failure" and t >= start:
+                motors = list(motors)
+                motors[variant.get("motor", 0)] *= variant.get("efficiency", 0.0)
+
+            self._record(sim, t, pos, quat, rpy, motors, base_throttle)
+
+            aero.update(sim.drone_id, sim.prop_joints, motors, client=sim.client)
+            if kind == "gust" and in_window:
+                p.applyExternalForce(sim.drone_id, -1, forceObj=variant.get("force_n", [2.0, 0, 0]),
+                                     posObj=pos, flags=p.WORLD_FRAME, physicsClientId=sim.client)
+            sim.step()
+            t += sim.dt
+
+            if not (kind == "stunt" and in_window):
+                max_tilt = max(max_tilt, abs(rpy[0]), abs(rpy[1]))
+            max_alt_dev = max(max_alt_dev, abs(pos[2] - z0))
+
+        final_z = p.getBasePositionAndOrientation(sim.drone_id, physicsClientId=sim.client)[0][2]
+        status = "FAIL" if crashed or final_z < 0.05 else "PASS"
+        print(f"   🔀 Variant '{name}': {status} | Max Tilt={np.degrees(max_tilt):.1f}° | Max Alt Dev={max_alt_dev:.2f}m")
+
+        return {
+            "variant": name,
+            "status": status,
+            "max_tilt_deg": round(float(np.degrees(max_tilt)), 1),
+            "max_alt_deviation_m": round(max_alt_dev, 3),
+            "final_height_m": round(final_z, 3),
+            "flight_log": self.telemetry.to_log(),
+            "telemetry": self.telemetry
+        }
+
+    def run_variants(self, variants, duration_sec=3.0, target_height=1.0):
+        """Captures one hover checkpoint and forks every variant from it."""
+        checkpoint = self.capture_hover_checkpoint(target_height=target_height)
+        try:
+            return [self.run_variant(checkpoint, v, duration_sec) for v in variants]
+        finally:
+            checkpoint["sim"].remove_state(checkpoint["state_id"])
+            checkpoint["sim"].close()
+
+# --- BATCH BACKEND (Vectorized NumPy Integrator) ---
+def batch_hover_test(physics_configs, duration_sec=5.0, target_height=1.0, max_thrust_g=1200.0, decimation=1,
+                     early_exit=True, monitor_config=None, pid_gains=None):
+    """
+    Scenario 1 for N drones at once on the BatchDynamics backend.
+    Same flight state machine and verdict logic as FlightTestRunner.run_hover_test.
+    With early_exit, settled/diverged drones are frozen and the run ends once all are decided.
+    Configs with a "battery" entry fly on a sagging pack (the others on an ideal supply).
+
+    Args:
+        physics_configs: List of SKU physics_config dicts (one drone each)
+        early_exit: Per-drone SteadyStateMonitor termination
+        monitor_config: Optional SteadyStateMonitor kwargs
+        pid_gains: Optional list of per-drone PID gain dicts (None entries = default tune)
+
+    Returns:
+        List of hover reports (same fields as run_hover_test), one per config.
+    """
+    sim = BatchDynamics(physics_configs, max_thrust_g=max_thrust_g)
+    sim.reset(start_pos=[0, 0, 1.0])
+    fc = BatchFlightController.for_dynamics(sim, gains=pid_gains)
+    n = sim.n
+
+    # Flight State Machine: 0=Warmup, 1=Climb, 2=Hover
+    state = np.zeros(n, dtype=int)
+    hover_sum = np.zeros(n)
+    hover_count = np.zeros(n)
+    crashed = np.zeros(n, dtype=bool)
+
+    alt_integral = np.zeros(n) # Altitude hold (see _altitude_hold)
+    sim_t = 0.0
+    steps = int(duration_sec * 240)
+
+    telemetry = TelemetryRecorder(duration_sec, dt=sim.dt, decimation=decimation, num_motors=sim.num_rotors,
+                                  n_drones=n)
+    monitor = SteadyStateMonitor(n=n, dt=sim.dt, target_height=target_height, **(monitor_config or {})) \
+        if early_exit else None
+    finished = np.zeros(n, dtype=bool)
+    end_time = np.full(n, np.nan)
+
+    # Battery Model (only drones whose config carries battery params)
+    battery_params = [(c or {}).get("battery") for c in physics_configs]
+    has_battery = np.array([bool(b) for b in battery_params])
+    battery = BatteryModel.from_configs([b or {} for b in battery_params]) if has_battery.any() else None
+    prop_diameter_m = prop_diameter_from_layout(sim.radius_m, sim.rotor_count)
+    depleted = np.zeros(n, dtype=bool)
+
+    for i in range(steps):
+        current_z = sim.positions[:, 2].copy()
+        rpy = sim.get_euler()
+
+        # Check for Rollover Crash (or numerical blow-up)
+        rollover = (np.abs(rpy[:, 0]) > CRASH_TILT) | (np.abs(rpy[:, 1]) > CRASH_TILT)
+        rollover |= ~np.isfinite(sim.state).all(axis=1)
+        new_crash = rollover & ~crashed
+        for k in np.flatnonzero(new_crash):
+            telemetry.event(f"CRASH: Rollover at t={sim_t:.2f}", drone=k)
+        crashed |= new_crash
+        end_time[new_crash] = sim_t
+        active = ~crashed & ~finished
+        if not active.any(): break
+
+        # Altitude Logic
+        error_z = target_height - current_z
+        hold, integral = _altitude_hold(error_z, sim.velocities[:, 2], alt_integral, sim.dt)
+        alt_integral = np.where(state == 0, alt_integral, integral)
+        base_throttle = np.where(state == 0, ALT_IDLE_THROTTLE, hold)
+
+        hovering = (state == 2) & active
+        hover_sum += np.where(hovering, base_throttle, 0.0)
+        hover_count += hovering
+
+        next_state = state.copy()
+        next_state[(state == 0) & (sim_t > 0.5)] = 1
+        next_state[(state == 1) & (np.abs(error_z) < 0.1)] = 2
+        state = next_state
+
+        base_throttle = np.clip(base_throttle, 0.0, 1.0)
+
+        # Flight Controller + Physics
+        motors = fc.compute_motors(rpy, [0, 0, 0], base_throttle, sim.dt)
+        if telemetry.wants_sample():
+            telemetry.record(sim_t, sim.positions, sim.quaternions, rpy, sim.velocities,
+                             sim.get_world_rates(), motors, base_throttle, active=active)
+        else:
+            telemetry.tick()
+
+        # Early Termination (decided drones are frozen from here on)
+        if monitor is not None:
+            outcome = monitor.update(sim_t, current_z, base_throttle, rpy)
+            newly = active & (outcome != 0)
+            for k in np.flatnonzero(newly):
+                if outcome[k] == DIVERGED:
+                    telemetry.event(f"DIVERGED: {monitor.reason[k]}", drone=k)
+                    crashed[k] = True
+                else:
+                    telemetry.event(f"EARLY EXIT: {monitor.reason[k]}", drone=k)
+                finished[k] = True
+            active &= ~newly
+            end_time[newly] = sim_t
+
+        sim.step(motors, active=active)
+        if battery is not None:
+            draining = active & has_battery
+            battery.step(pack_current(sim.last_current_a, sim.last_thrust_n, battery.voltage, prop_diameter_m),
+                         sim.dt, active=draining)
+            sim.thrust_scale = np.where(has_battery, battery.thrust_scale(), 1.0)
+            for k in np.flatnonzero(draining & battery.depleted & ~depleted):
+                telemetry.event(f"BATTERY: Cutoff voltage at t={sim_t:.2f}", drone=k)
+            depleted |= draining & battery.depleted
+        sim_t += sim.dt
+
+    # Analysis
+    avg_hover = np.divide(hover_sum, hover_count, out=np.zeros(n), where=hover_count > 0)
+    reports = []
+    for k in range(n):
+        avg_hover_th = float(avg_hover[k])
+        twr_est = 1.0 / avg_hover_th if avg_hover_th > 0 else 0
+        status, warnings = _hover_verdict(avg_hover_th, bool(crashed[k]))
+        reports.append({
+            "status": status,
+            "hover_throttle_pct": round(avg_hover_th * 100, 1),
+            "estimated_twr": round(twr_est, 2),
+            "warnings": warnings,
+            "flight_log": telemetry.to_log(k), # A crashed drone's log stops at the crash tick
+            "telemetry": telemetry,
+            "terminated_early": monitor.reason[k] if monitor is not None else None,
+            "sim_time_s": round(float(end_time[k]) if np.isfinite(end_time[k]) else sim_t, 3),
+            "battery": battery.report(k) if has_battery[k] else None,
+            "drone_index": k,
+            "sim_instance": sim
+        })
+    return reports
+
+def batch_acrobatic_show(physics_configs, duration_sec=15.0, max_thrust_g=1200.0, decimation=1, pid_gains=None,
+                         script=None):
+    """
+    Scenario 2 for N drones at once on the BatchDynamics backend.
+    Flies the same compiled timeline as run_acrobatic_show and adds
+    screening metrics (min / final height) so floor strikes are visible.
+
+    Args:
+        script: One script for every drone, a list with one script per drone,
+                or a CompiledTimeline (see app/sim/timeline.py). Defaults to AIR_SHOW.
+    """
+    sim = BatchDynamics(physics_configs, max_thrust_g=max_thrust_g)
+    sim.reset(start_pos=[0, 0, 1.5])
+    fc = BatchFlightController.for_dynamics(sim, gains=pid_gains)
+    timeline = script if isinstance(script, CompiledTimeline) else \
+        CompiledTimeline(script or AIR_SHOW, duration_sec, dt=sim.dt)
+    if timeline.n not in (1, sim.n):
+        raise ValueError(f"Got {timeline.n} scripts for {sim.n} drones")
+    rotor_commands = timeline.rotor_commands(sim.mixer) # (segments, N, M), re-targeted once
+    drones = np.arange(sim.n)
+
+    kp_alt = 0.6
+    target_z = 1.5
+    sim_t = 0.0
+    steps = int(duration_sec * 240)
+    min_z = sim.positions[:, 2].copy()
+    telemetry = TelemetryRecorder(duration_sec, dt=sim.dt, decimation=decimation, num_motors=sim.num_rotors,
+                                  n_drones=sim.n)
+
+    for i in range(steps):
+        current_z = sim.positions[:, 2]
+        rpy = sim.get_euler()
+
+        seg = np.broadcast_to(timeline.segment_at(i), (sim.n,))
+        manual = timeline.manual[seg]
+        base_throttle = np.clip(0.05 + (kp_alt * (target_z - current_z)), 0.0, 1.0)
+        base_throttle = base_throttle + timeline.throttle_boost[seg]
+
+        # PID memory is frozen during MANUAL segments, like the scalar runner which skips the PID there
+        prev_error, integral = fc.prev_error, fc.integral
+        motors = fc.compute_motors(rpy, timeline.target_rpy[seg], base_throttle, sim.dt)
+        if manual.any():
+            motors = np.where(manual[:, None], rotor_commands[seg, drones], motors)
+            fc.prev_error = np.where(manual[:, None], prev_error, fc.prev_error)
+            fc.integral = np.where(manual[:, None], integral, fc.integral)
+
+        if telemetry.wants_sample():
+            telemetry.record(sim_t, sim.positions, sim.quaternions, rpy, sim.velocities,
+                             sim.get_world_rates(), motors, base_throttle)
+        else:
+            telemetry.tick()
+        sim.step(motors)
+        sim_t += sim.dt
+        np.minimum(min_z, sim.positions[:, 2], out=min_z)
+
+    final_z = sim.positions[:, 2]
+    return [{
+        "status": "COMPLETE",
+        "min_height_m": round(float(min_z[k]), 3),
+        "final_height_m": round(float(final_z[k]), 3),
+        "telemetry": telemetry,
+        "drone_index": k,
+        "sim_instance": sim
+    } for k in range(sim.n)]
+
+def screen_catalog(catalog_path="drone_catalog.json", scenario="hover", **kwargs):
+    """
+    Runs one scenario for every SKU in the catalog in a single batch.
+    Returns the scenario reports tagged with sku_id (sim_instance stripped).
+    """
+    with open(catalog_path, "r") as f:
+        catalog = json.load(f)
+
+    configs = [entry.get("technical_data", {}).get("physics_config", {}) for entry in catalog]
+    kwargs.setdefault("pid_gains", [entry.get("technical_data", {}).get("pid_gains") for entry in catalog])
+    print(f"🏁 Batch Screening {len(configs)} SKUs ({scenario})...")
+
+    if scenario == "hover":
+        reports = batch_hover_test(configs, **kwargs)
+    elif scenario == "acrobatic":
+        reports = batch_acrobatic_show(configs, **kwargs)
+    else:
+        raise ValueError(f"Unknown scenario '{scenario}'")
+
+    for entry, report in zip(catalog, reports):
+        report.pop("sim_instance", None)
+        report.pop("telemetry", None)
+        report["sku_id"] = entry.get("sku_id")
+    return reports
+
 # --- TEST HARNESS ---
 if __name__ == "__main__":
     import os
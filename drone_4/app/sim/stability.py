@@ -0,0 +1,260 @@
+import numpy as np
+from app.sim.batch import GRAVITY, BatchDynamics, BatchFlightController, _extract_number
+
+# --- CONFIGURATION ---
+AXES = ("roll", "pitch", "yaw")
+
+# Verdict thresholds
+MIN_TWR_FLYABLE = 1.5        # Below this the hover test is worth running for real
+MAX_HOVER_THROTTLE_OK = 0.6  # Headroom left for attitude corrections
+MIN_GAIN_MARGIN_OK = 2.0     # x2 loop gain (~6 dB) before the attitude loop goes unstable
+# Eigenvalues this close to the unit circle count as neutrally stable (a P-only loop
+# on a double integrator sits exactly on it: undamped, but not diverging)
+RADIUS_TOL = 1e-6
+# Axes whose neutrally stable P-only loop is noted but doesn't block FLYABLE: the level
+# hover test never commands yaw, and rotor drag damps it in flight (DEFAULT_GAINS yaw is P-only)
+UNDAMPED_OK_AXES = ("yaw",)
+
+# Loop-gain search range for the margin bisection
+_GAIN_LO, _GAIN_HI, _GAIN_STEPS = 1e-3, 1e3, 30
+
+def hover_equilibrium(dyn, max_thrust_g=1200.0):
+    """
+    Analytic hover point for every drone in a BatchDynamics.
+    Thrust model is F = F_max * throttle^2 per motor (same as Aerodynamics),
+    or the drone's compiled thrust curve when it has one.
+
+    Returns:
+        dict of (N,) arrays: twr, hover_throttle, hover_thrust_n and thrust_slope (per motor)
+    """
+    weight_n = dyn.mass * GRAVITY
+    num_motors = dyn.rotor_count
+    twr = num_motors * dyn.max_thrust_n / weight_n
+    hover_thrust_n = weight_n / num_motors
+    # Can't hover -> throttle saturates at 1.0
+    hover_throttle = np.sqrt(np.clip(hover_thrust_n / dyn.max_thrust_n, 0.0, 1.0))
+    # d(thrust)/d(throttle) per motor at the hover point
+    thrust_slope = 2.0 * dyn.max_thrust_n * hover_throttle
+
+    if dyn.curves is not None:
+        # Measured curves: invert the (monotonic) mean motor curve instead
+        grid = np.linspace(0.0, 1.0, dyn.curves.resolution)
+        mask = dyn.rotor_mask[:, :, None]
+        mean_lut = (dyn.curves.thrust_lut * mask).sum(axis=1) / mask.sum(axis=1) # (N, R), padding rotors excluded
+        slope_lut = np.gradient(mean_lut, grid, axis=1)
+        for k in range(dyn.n):
+            hover_throttle[k] = np.interp(hover_thrust_n[k], np.maximum.accumulate(mean_lut[k]), grid)
+            thrust_slope[k] = np.interp(hover_throttle[k], grid, slope_lut[k])
+
+    return {"twr": twr, "hover_throttle": hover_throttle, "hover_thrust_n": hover_thrust_n,
+            "thrust_slope": thrust_slope}
+
+def control_effectiveness(dyn, fc, thrust_slope):
+    """
+    Linearized angular acceleration per unit PID correction, around hover.
+    d(thrust)/d(throttle) at hover (see hover_equilibrium), pushed through the mixer and the
+    rotor geometry, divided by inertia. Standard X layouts are symmetric so the
+    axes decouple and only the diagonal is kept.
+
+    Returns:
+        (N, 3) array [roll, pitch, yaw] in rad/s^2 per unit correction.
+        Negative = the mixer pushes the wrong way on that axis.
+    """
+    mix = np.broadcast_to(fc.mixer, (dyn.n,) + fc.mixer.shape[-2:]) # (N, M, 3)
+
+    # Same torque arms as BatchDynamics.step: tau = [y*T, -x*T, -spin*ratio*T]
+    gain = dyn.effectiveness @ mix # (N, 3, 3)
+    tau = np.diagonal(gain, axis1=1, axis2=2) * thrust_slope[:, None]
+    return tau / dyn.inertia
+
+def _closed_loop_matrices(b, kp, ki, kd, dt):
+    """
+    One-tick transition matrices of PID + rigid axis, discretized the way the
+    sim runs it (PID reads the angle, then semi-implicit Euler).
+    State: [angle, rate, prev_error] (+ [integral] when ki != 0).
+
+    Args:
+        b: (K,) control effectiveness per axis instance
+        kp, ki, kd: Scalars or (K,) arrays (one axis' gains)
+    """
+    k = len(b)
+    kp, ki, kd = (np.broadcast_to(np.asarray(g, dtype=float), (k,)) for g in (kp, ki, kd))
+    # PID correction with target 0: c = c_a*angle + c_p*prev + ki*integral'
+    c_a = -(kp + ki * dt + kd / dt)
+    c_p = -kd / dt
+
+    size = 4 if np.any(ki != 0) else 3
+    A = np.zeros((k, size, size))
+    A[:, 0, 0] = 1.0 + dt * dt * b * c_a
+    A[:, 0, 1] = dt
+    A[:, 0, 2] = dt * dt * b * c_p
+    A[:, 1, 0] = dt * b * c_a
+    A[:, 1, 1] = 1.0
+    A[:, 1, 2] = dt * b * c_p
+    A[:, 2, 0] = -1.0 # prev_error <- error = -angle
+    if size == 4:
+        A[:, 0, 3] = dt * dt * b * ki
+        A[:, 1, 3] = dt * b * ki
+        # Rows without an I term get a dead integral state (eigenvalue 0, not 1)
+        A[:, 3, 0] = np.where(ki != 0, -dt, 0.0)
+        A[:, 3, 3] = np.where(ki != 0, 1.0, 0.0)
+    return A
+
+def _spectral_radius(b, kp, ki, kd, dt):
+    A = _closed_loop_matrices(b, kp, ki, kd, dt)
+    return np.max(np.abs(np.linalg.eigvals(A)), axis=1)
+
+def _is_bounded(radius):
+    """Not diverging: inside the unit circle, or on it within RADIUS_TOL."""
+    return radius <= 1.0 + RADIUS_TOL
+
+def _gain_margin(b, kp, ki, kd, dt):
+    """
+    Largest factor the loop gain can be scaled by before the discrete loop starts
+    diverging (log-space bisection, vectorized over all designs).
+    0.0 when the loop diverges even at tiny gain (e.g. reversed mixer sign).
+    """
+    lo = np.full(len(b), np.log(_GAIN_LO))
+    hi = np.full(len(b), np.log(_GAIN_HI))
+
+    stable_lo = _is_bounded(_spectral_radius(b * _GAIN_LO, kp, ki, kd, dt))
+    stable_hi = _is_bounded(_spectral_radius(b * _GAIN_HI, kp, ki, kd, dt))
+
+    for _ in range(_GAIN_STEPS):
+        mid = 0.5 * (lo + hi)
+        ok = _is_bounded(_spectral_radius(b * np.exp(mid), kp, ki, kd, dt))
+        lo = np.where(ok, mid, lo)
+        hi = np.where(ok, hi, mid)
+
+    margin = np.exp(lo)
+    margin = np.where(stable_hi, _GAIN_HI, margin)
+    return np.where(stable_lo, margin, 0.0)
+
+def prescreen_batch(physics_configs, max_thrust_g=1200.0, dt=1.0 / 240.0, pid_gains=None):
+    """
+    Analytic hover + linearized attitude stability for many designs at once.
+    No physics engine involved: one batched eigenvalue solve per bisection step.
+
+    Args:
+        physics_configs: List of physics_config dicts (make_fleet or physics_service schema)
+        max_thrust_g: Fallback per-motor thrust when a config has no motor_max_force_n
+        dt: Control/physics tick the loop runs at (must match the sim)
+        pid_gains: Optional attitude gains, one dict for all or one per design
+                   (technical_data["pid_gains"] layout). Defaults to DEFAULT_GAINS.
+
+    Returns:
+        List of report dicts (see prescreen_design)
+    """
+    if not physics_configs: return []
+
+    dyn = BatchDynamics(physics_configs, max_thrust_g=max_thrust_g, dt=dt)
+    fc = BatchFlightController.for_dynamics(dyn, gains=pid_gains)
+    hover = hover_equilibrium(dyn)
+    b = control_effectiveness(dyn, fc, hover["thrust_slope"])
+
+    radius = np.zeros((dyn.n, 3))
+    margin = np.zeros((dyn.n, 3))
+    for axis in range(3):
+        gains = (fc.kp[:, axis], fc.ki[:, axis], fc.kd[:, axis], dt)
+        radius[:, axis] = _spectral_radius(b[:, axis], *gains)
+        margin[:, axis] = _gain_margin(b[:, axis], *gains)
+
+    reports = []
+    for k in range(dyn.n):
+        cfg = physics_configs[k] or {}
+        # physics_service configs carry their own TWR; BatchDynamics falls back to a default
+        # mass / thrust when the BOM left them out, which must not turn into a flyable build
+        cfg_twr = (cfg.get("dynamics") or {}).get("twr")
+        twr = _extract_number(cfg_twr) if cfg_twr is not None else float(hover["twr"][k])
+        hover_th = float(hover["hover_throttle"][k])
+        reasons, warnings, notes = [], [], []
+
+        # Hard failures: no gain tuning or flight script gets around these
+        if _extract_number(cfg.get("mass_kg")) <= 0:
+            reasons.append("No mass in physics_config (incomplete BOM)")
+        if twr <= 1.0:
+            reasons.append(f"Cannot hover (TWR {twr:.2f})")
+        for axis, name in enumerate(AXES):
+            if b[k, axis] <= 0:
+                reasons.append(f"{name.capitalize()} mixer sign is reversed")
+
+        # Linear-model findings: the level hover test never excites these modes,
+        # so they flag the design for simulation instead of rejecting it
+        for axis, name in enumerate(AXES):
+            if b[k, axis] <= 0: continue
+            if fc.kd[k, axis] == 0 and fc.ki[k, axis] == 0:
+                msg = f"{name.capitalize()} loop is P-only (undamped, spectral radius {radius[k, axis]:.4f})"
+                if name in UNDAMPED_OK_AXES and _is_bounded(radius[k, axis]):
+                    notes.append(msg)
+                else:
+                    warnings.append(msg)
+            elif not _is_bounded(radius[k, axis]):
+                warnings.append(f"{name.capitalize()} loop unstable at {1/dt:.0f}Hz in the linear model "
+                                f"(gain margin x{margin[k, axis]:.2f})")
+
+        if reasons:
+            verdict = "UNFLYABLE"
+        elif not warnings and twr >= MIN_TWR_FLYABLE and hover_th <= MAX_HOVER_THROTTLE_OK \
+                and np.all(margin[k] >= MIN_GAIN_MARGIN_OK):
+            verdict = "FLYABLE"
+        else:
+            verdict = "MARGINAL"
+            reasons.extend(warnings)
+            reasons.append("Close to a limit, run the full simulation")
+
+        reports.append({
+            "verdict": verdict,
+            "reasons": reasons,
+            "notes": notes,
+            # Only "cannot hover" / missing-mass failures and clean FLYABLE builds match the hover test's verdict
+            "decisive": verdict == "FLYABLE" or (verdict == "UNFLYABLE" and (twr <= 1.0 or not cfg.get("mass_kg"))),
+            "twr": round(twr, 2),
+            "hover_throttle_pct": round(hover_th * 100, 1),
+            "axes": {
+                name: {
+                    "control_effectiveness": round(float(b[k, axis]), 2),
+                    "spectral_radius": round(float(radius[k, axis]), 4),
+                    "gain_margin": round(float(margin[k, axis]), 3),
+                    "gain_margin_db": round(float(20 * np.log10(margin[k, axis])), 1) if margin[k, axis] > 0 else None
+                } for axis, name in enumerate(AXES)
+            }
+        })
+    return reports
+
+def prescreen_design(physics_config, max_thrust_g=1200.0, dt=1.0 / 240.0, pid_gains=None):
+    """
+    Fast "will it hover?" check for one design, meant to gate the PyBullet hover test.
+
+    Returns:
+        {
+          "verdict": "FLYABLE" | "MARGINAL" | "UNFLYABLE",
+          "reasons": [...],
+          "notes": [...] findings that don't affect the verdict (undamped yaw),
+          "decisive": True when the verdict can stand in for the hover test,
+          "twr", "hover_throttle_pct",
+          "axes": {roll|pitch|yaw: {control_effectiveness, spectral_radius, gain_margin, gain_margin_db}}
+        }
+    UNFLYABLE is reserved for hard failures (can't hover, no mass, reversed mixer); undamped
+    (P-only) roll / pitch or linearly unstable attitude loops come back MARGINAL.
+    TWR comes from the config's "dynamics" block when it has one (physics_service schema).
+    Only non-decisive designs need the full simulation.
+    """
+    return prescreen_batch([physics_config], max_thrust_g=max_thrust_g, dt=dt, pid_gains=pid_gains)[0]
+
+# --- TEST HARNESS ---
+if __name__ == "__main__":
+    import json
+    import time
+
+    with open("drone_catalog.json", "r") as f:
+        catalog = json.load(f)
+    configs = [e.get("technical_data", {}).get("physics_config", {}) for e in catalog]
+
+    t0 = time.perf_counter()
+    reports = prescreen_batch(configs)
+    elapsed = time.perf_counter() - t0
+
+    print(f"🧮 Pre-screened {len(reports)} designs in {elapsed * 1e3:.1f} ms")
+    for entry, rep in zip(catalog, reports):
+        margins = " ".join(f"{n}=x{rep['axes'][n]['gain_margin']}" for n in AXES)
+        print(f"   {entry.get('sku_id')}: {rep['verdict']} | TWR {rep['twr']} | Hover {rep['hover_throttle_pct']}% | {margins}")
@@ -0,0 +1,183 @@
+import math
+import numpy as np
+
+# Optional: Parquet export
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Bump when channels are added/renamed so downstream notebooks can branch on it
+TELEMETRY_SCHEMA_VERSION = 1
+
+def _channels(num_motors):
+    """Ordered channel layout: (name, column names)."""
+    return [
+        ("pos", ["pos_x", "pos_y", "pos_z"]),
+        ("quat", ["quat_x", "quat_y", "quat_z", "quat_w"]),
+        ("rpy", ["roll", "pitch", "yaw"]),
+        ("lin_vel", ["vel_x", "vel_y", "vel_z"]),
+        ("ang_vel", ["ang_vel_x", "ang_vel_y", "ang_vel_z"]), # World frame (as PyBullet reports it)
+        ("motors", [f"motor_{i}" for i in range(num_motors)]),
+        ("throttle_cmd", ["throttle_cmd"])
+    ]
+
+def _body_rates(quat, ang_vel):
+    """Rotates world-frame angular velocity into the body frame (p, q, r). Batched over rows."""
+    x, y, z, w = quat[..., 0], quat[..., 1], quat[..., 2], quat[..., 3]
+    # R^T * omega, with R built from the [x, y, z, w] quaternion
+    r00 = 1 - 2 * (y*y + z*z); r01 = 2 * (x*y - z*w); r02 = 2 * (x*z + y*w)
+    r10 = 2 * (x*y + z*w); r11 = 1 - 2 * (x*x + z*z); r12 = 2 * (y*z - x*w)
+    r20 = 2 * (x*z - y*w); r21 = 2 * (y*z + x*w); r22 = 1 - 2 * (x*x + y*y)
+    wx, wy, wz = ang_vel[..., 0], ang_vel[..., 1], ang_vel[..., 2]
+    return np.stack([
+        r00*wx + r10*wy + r20*wz,
+        r01*wx + r11*wy + r21*wz,
+        r02*wx + r12*wy + r22*wz
+    ], axis=-1)
+
+class TelemetryRecorder:
+    """
+    Columnar Flight Recorder.
+    Preallocates one NumPy buffer per channel, sized to the scenario length,
+    so the physics loop only does row writes (no list appends, no reductions).
+    Works for one drone (PyBullet runner) or N drones (batch backend).
+    """
+    def __init__(self, duration_sec, dt=1.0 / 240.0, decimation=1, num_motors=4, n_drones=1):
+        """
+        Args:
+            duration_sec: Scenario length, sets the buffer size
+            dt: Physics tick
+            decimation: Keep one sample every N ticks
+            num_motors: Width of the per-motor command channel
+            n_drones: Number of drones recorded side by side
+        """
+        self.dt = dt
+        self.decimation = max(1, int(decimation))
+        self.num_motors = num_motors
+        self.n_drones = n_drones
+
+        steps = int(duration_sec / dt) if dt > 0 else 0
+        self.capacity = max(1, math.ceil(steps / self.decimation))
+
+        self.time = np.zeros(self.capacity)
+        self.buffers = {
+            name: np.zeros((self.capacity, n_drones, len(cols)))
+            for name, cols in _channels(num_motors)
+        }
+        # Valid rows per drone (crashed drones stop early)
+        self.length = np.zeros(n_drones, dtype=int)
+        self.count = 0
+        self.events = [[] for _ in range(n_drones)]
+        self._tick = 0
+
+    def wants_sample(self):
+        """True when the current tick is kept after decimation (lets callers skip extra queries)."""
+        return self._tick % self.decimation == 0 and self.count < self.capacity
+
+    def record(self, sim_t, pos, quat, rpy, lin_vel, ang_vel, motors, throttle_cmd, active=None):
+        """
+        Stores one tick. Must be called every physics tick (decimation is handled here).
+        Arrays can be (width,) for one drone or (n_drones, width).
+
+        Args:
+            active: Optional (n_drones,) mask. Inactive drones stop extending their log.
+        """
+        if self.wants_sample():
+            k = self.count
+            self.time[k] = sim_t
+            b = self.buffers
+            b["pos"][k] = pos
+            b["quat"][k] = quat
+            b["rpy"][k] = rpy
+            b["lin_vel"][k] = lin_vel
+            b["ang_vel"][k] = ang_vel
+            b["motors"][k] = motors
+            b["throttle_cmd"][k] = np.reshape(throttle_cmd, (-1, 1))
+            if active is None:
+                self.length[:] = k + 1
+            else:
+                self.length[active] = k + 1
+            self.count += 1
+        self._tick += 1
+
+    def tick(self):
+        """Advances the decimation counter without storing (see wants_sample)."""
+        self._tick += 1
+
+    def event(self, msg, drone=0):
+        self.events[drone].append(msg)
+
+    def to_arrays(self, drone=0):
+        """Trimmed per-drone arrays, including derived body rates."""
+        n = int(self.length[drone])
+        out = {"time": self.time[:n].copy()}
+        for name, buf in self.buffers.items():
+            out[name] = buf[:n, drone].copy()
+        out["body_rates"] = _body_rates(out["quat"], out["ang_vel"])
+        return out
+
+    def to_log(self, drone=0):
+        """Legacy FlightTestRunner.log format (time / height / throttle_avg / events)."""
+        n = int(self.length[drone])
+        return {
+            "time": self.time[:n].tolist(),
+            "height": self.buffers["pos"][:n, drone, 2].tolist(),
+            "throttle_avg": self.buffers["motors"][:n, drone].mean(axis=1).tolist(),
+            "events": list(self.events[drone])
+        }
+
+    def columns(self):
+        """Flat column schema (stable order) used by every exporter."""
+        cols = ["time"]
+        for _, names in _channels(self.num_motors):
+            cols += names
+        return cols + ["body_rate_p", "body_rate_q", "body_rate_r"]
+
+    def _table(self, drone):
+        arrays = self.to_arrays(drone)
+        return np.column_stack([arrays["time"]] + [arrays[name] for name, _ in _channels(self.num_motors)] + [arrays["body_rates"]])
+
+    def save_npz(self, path, drone=None):
+        """
+        Writes a compressed .npz: 'data' (rows x columns), 'columns', 'drone',
+        'schema_version', 'decimation', 'dt'. drone=None stacks every drone.
+        """
+        drones = range(self.n_drones) if drone is None else [drone]
+        tables = [self._table(k) for k in drones]
+        ids = np.concatenate([np.full(len(t), k) for k, t in zip(drones, tables)]) if tables else np.zeros(0)
+        np.savez_compressed(
+            path,
+            data=np.vstack(tables) if tables else np.zeros((0, len(self.columns()))),
+            columns=np.array(self.columns()),
+            drone=ids.astype(int),
+            schema_version=TELEMETRY_SCHEMA_VERSION,
+            decimation=self.decimation,
+            dt=self.dt
+        )
+        print(f"   💾 Telemetry saved: {path}")
+        return path
+
+    def save_parquet(self, path, drone=None):
+        """Same schema as save_npz, in long format with a 'drone' column."""
+        if not HAS_PARQUET:
+            print("⚠️  WARNING: 'pyarrow' not installed. Parquet export skipped.")
+            return None
+
+        drones = range(self.n_drones) if drone is None else [drone]
+        cols = self.columns()
+        tables = [self._table(k) for k in drones]
+        data = np.vstack(tables) if tables else np.zeros((0, len(cols)))
+        ids = np.concatenate([np.full(len(t), k) for k, t in zip(drones, tables)]) if tables else np.zeros(0)
+
+        table = pa.table({"drone": ids.astype(np.int32), **{c: data[:, i] for i, c in enumerate(cols)}})
+        table = table.replace_schema_metadata({
+            "schema_version": str(TELEMETRY_SCHEMA_VERSION),
+            "decimation": str(self.decimation),
+            "dt": str(self.dt)
+        })
+        pq.write_table(table, path)
+        print(f"   💾 Telemetry saved: {path}")
+        return path
@@ -0,0 +1,181 @@
+import numpy as np
+from app.sim.mixer import quad_command_to_rotors
+
+# --- CONFIGURATION ---
+# A scenario script is a list of segments (plain dicts, JSON friendly):
+#   {"name": "advance", "start": 2.0, "end": 4.0,   # Active while start < t < end
+#    "mode": "PID",                                 # "PID" (stabilized) or "MANUAL" (raw "Acro" override)
+#    "target_rpy": [0, -0.3, 0],                    # PID attitude target (rad)
+#    "throttle_boost": 0.05,                        # Added to the altitude-hold throttle
+#    "motors": [0.1, 0.9, 0.1, 0.9],                # MANUAL quad command FL, FR, RL, RR (re-targeted for hex/octo)
+#    "note": "   > T=2.0s: ..."}                    # Printed on the segment's first tick
+# Time not covered by any segment is a stabilized hover. Earlier segments win on overlap.
+DEFAULT_SEGMENT = {"name": "hover", "mode": "PID", "target_rpy": [0, 0, 0], "throttle_boost": 0.0,
+                   "motors": [0, 0, 0, 0], "note": None}
+
+# Hover -> Forward -> Barrel Roll -> Backward -> Loop-de-Loop
+AIR_SHOW = [
+    # Pitch down 0.3 rad (~17 deg) + power to maintain altitude while tilted
+    {"name": "advance", "start": 2.0, "end": 4.0, "target_rpy": [0, -0.3, 0], "throttle_boost": 0.05,
+     "note": "   > T=2.0s: Pitch Forward (Advance)"},
+    # Pitch back slightly to brake
+    {"name": "brake", "start": 4.0, "end": 5.0, "target_rpy": [0, 0.2, 0]},
+    # Full Left Roll: Left motors low, Right motors high
+    {"name": "barrel_roll", "start": 5.0, "end": 5.8, "mode": "MANUAL", "motors": [0.1, 0.9, 0.1, 0.9],
+     "note": "   > T=5.0s: 🌪️ BARREL ROLL!"},
+    {"name": "stabilize", "start": 5.8, "end": 7.0},
+    # Pitch up/back
+    {"name": "retreat", "start": 7.0, "end": 9.0, "target_rpy": [0, 0.3, 0], "throttle_boost": 0.05,
+     "note": "   > T=7.0s: Fly Backward (Retreat)"},
+    # To Loop (Pitch Back hard): Front motors HIGH, Rear motors LOW
+    {"name": "loop", "start": 10.0, "end": 11.0, "mode": "MANUAL", "motors": [1.0, 1.0, 0.0, 0.0],
+     "note": "   > T=10.0s: ➰ LOOP-DE-LOOP!"}
+]
+
+# Manoeuvre library for sequence(): segment templates with a default duration (s)
+MANEUVERS = {
+    "hover": {"duration": 1.0},
+    "climb": {"duration": 1.0, "throttle_boost": 0.1},
+    "descend": {"duration": 1.0, "throttle_boost": -0.03},
+    "punch_out": {"duration": 0.5, "throttle_boost": 0.3},
+    "advance": {"duration": 2.0, "target_rpy": [0, -0.3, 0], "throttle_boost": 0.05},
+    "retreat": {"duration": 2.0, "target_rpy": [0, 0.3, 0], "throttle_boost": 0.05},
+    "brake": {"duration": 1.0, "target_rpy": [0, 0.2, 0]},
+    "strafe_left": {"duration": 1.5, "target_rpy": [-0.3, 0, 0], "throttle_boost": 0.05},
+    "strafe_right": {"duration": 1.5, "target_rpy": [0.3, 0, 0], "throttle_boost": 0.05},
+    "yaw_left": {"duration": 1.5, "target_rpy": [0, 0, 1.57]},
+    "yaw_right": {"duration": 1.5, "target_rpy": [0, 0, -1.57]},
+    "barrel_roll": {"duration": 0.8, "mode": "MANUAL", "motors": [0.1, 0.9, 0.1, 0.9]},
+    "barrel_roll_right": {"duration": 0.8, "mode": "MANUAL", "motors": [0.9, 0.1, 0.9, 0.1]},
+    "loop": {"duration": 1.0, "mode": "MANUAL", "motors": [1.0, 1.0, 0.0, 0.0]},
+    "front_flip": {"duration": 1.0, "mode": "MANUAL", "motors": [0.0, 0.0, 1.0, 1.0]},
+    "stabilize": {"duration": 1.2}
+}
+
+def sequence(steps, start=0.0):
+    """
+    Builds a script by chaining library manoeuvres back to back.
+
+    Args:
+        steps: Manoeuvre names, (name, duration) tuples, or segment dicts
+               ({"maneuver": name, ...overrides} or a full custom segment with "duration")
+        start: Time of the first segment
+
+    Returns:
+        List of segments with absolute start/end
+    """
+    segments, t = [], start
+    for step in steps:
+        if isinstance(step, str):
+            step = {"maneuver": step}
+        elif isinstance(step, (tuple, list)):
+            step = {"maneuver": step[0], "duration": step[1]}
+        template = MANEUVERS[step["maneuver"]] if "maneuver" in step else {}
+        segment = dict(template, **{k: v for k, v in step.items() if k != "maneuver"})
+        segment.setdefault("name", step.get("maneuver", "custom"))
+        duration = segment.pop("duration")
+        segment["start"], segment["end"] = t, t + duration
+        segments.append(segment)
+        t += duration
+    return segments
+
+def _command_key(seg):
+    """Identity of what a segment commands (everything but its timing)."""
+    return (seg["name"], seg["mode"], tuple(seg["target_rpy"]), seg["throttle_boost"], tuple(seg["motors"]),
+            seg.get("note"))
+
+class CompiledTimeline:
+    """
+    A scenario script (or one script per drone) compiled into per-tick lookup
+    tables, so picking the active segment is one array index per step.
+    """
+    def __init__(self, scripts, duration_sec, dt=1.0 / 240.0):
+        """
+        Args:
+            scripts: One script (list of segments), or a list of scripts (one per drone)
+            duration_sec: Length of the run
+            dt: Physics timestep
+        """
+        if scripts and isinstance(scripts[0], dict):
+            scripts = [scripts]
+        self.n = len(scripts)
+        self.dt = dt
+        self.steps = int(duration_sec / dt)
+
+        # Segment 0 is the shared default hover. Segments that command the same thing
+        # (whatever their timing) share one entry, so stacking scripts stays small.
+        segments, index = [dict(DEFAULT_SEGMENT)], {}
+        index[_command_key(segments[0])] = 0
+        self.table = np.zeros((self.n, self.steps + 1), dtype=np.int32) # +1: default past the end
+        # Tick times accumulated the way the runners advance sim_t (sim_t += dt)
+        t = np.concatenate([[0.0], np.cumsum(np.full(max(self.steps - 1, 0), dt))])
+        for k, script in enumerate(scripts):
+            # Reverse fill so earlier segments win where they overlap
+            for seg in reversed(script):
+                seg = dict(DEFAULT_SEGMENT, **seg)
+                key = _command_key(seg)
+                if key not in index:
+                    index[key] = len(segments)
+                    segments.append(seg)
+                self.table[k, :-1][(t > seg["start"]) & (t < seg["end"])] = index[key]
+
+        self.segments = segments
+        self.names = [seg["name"] for seg in segments]
+        self.notes = [seg.get("note") for seg in segments]
+        self.manual = np.array([seg["mode"] == "MANUAL" for seg in segments])
+        self.target_rpy = np.array([seg["target_rpy"] for seg in segments], dtype=float)
+        self.throttle_boost = np.array([seg["throttle_boost"] for seg in segments], dtype=float)
+        self.motors = [np.asarray(seg["motors"], dtype=float) for seg in segments]
+
+        # First tick of each segment run (for one-shot announcements)
+        self.entered = np.ones_like(self.table, dtype=bool)
+        self.entered[:, 1:] = self.table[:, 1:] != self.table[:, :-1]
+
+    def segment_at(self, tick):
+        """(N,) active segment index per drone at a physics tick."""
+        return self.table[:, min(tick, self.steps)]
+
+    def command(self, tick, drone=0):
+        """
+        Scalar lookup for the single-drone runner.
+
+        Returns:
+            tuple: (mode, target_rpy, throttle_boost, override_motors, announcement)
+        """
+        idx = self.table[drone, min(tick, self.steps)]
+        note = self.notes[idx] if self.entered[drone, min(tick, self.steps)] else None
+        if self.manual[idx]:
+            return "MANUAL", self.target_rpy[idx], self.throttle_boost[idx], self.motors[idx], note
+        return "PID", self.target_rpy[idx], self.throttle_boost[idx], None, note
+
+    def rotor_commands(self, mixer):
+        """
+        Re-targets every segment's MANUAL command onto the drones' rotor layouts once.
+
+        Args:
+            mixer: (N, M, 3) per-drone mixers (BatchDynamics.mixer)
+
+        Returns:
+            (S, N, M) throttles (zeros for PID segments)
+        """
+        out = np.zeros((len(self.segments),) + mixer.shape[:-1])
+        for idx in np.flatnonzero(self.manual):
+            out[idx] = quad_command_to_rotors(self.motors[idx], mixer)
+        return out
+
+# --- TEST HARNESS ---
+if __name__ == "__main__":
+    import time
+
+    show = CompiledTimeline(AIR_SHOW, duration_sec=15.0)
+    for tick in range(show.steps):
+        mode, target_rpy, boost, motors, note = show.command(tick)
+        if note: print(note)
+
+    library = sequence(["hover", "advance", "brake", "barrel_roll", "stabilize", ("loop", 1.2), "stabilize"], start=1.0)
+    scripts = [AIR_SHOW, library] * 500
+    t0 = time.perf_counter()
+    batch = CompiledTimeline(scripts, duration_sec=15.0)
+    print(f"⚙️  Compiled {batch.n} scripts ({len(batch.segments)} segments) in {time.perf_counter() - t0:.3f}s")
+    print(f"   Segments at t=5.5s: {batch.names[batch.segment_at(int(5.5 * 240))[0]]}, "
+          f"{batch.names[batch.segment_at(int(5.5 * 240))[1]]}")
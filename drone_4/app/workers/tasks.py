@@ -16,18 +16,21 @@ from app.services.ai_service import (
     optimize_specs
 )
 from app.services.fusion_service import fuse_component_data
-from app.services.physics_service import run_physics_simulation
+from app.services.physics_service import run_physics_simulation, generate_physics_config
 from app.services.cad_service import generate_assets
 from app.services.geometry_sim_service import run_geometric_simulation
 from app.services.schematic_service import generate_wiring_diagram
 from app.services.cost_service import generate_procurement_manifest
+from app.sim.stability import prescreen_design
+from app.services.browser_pool import run_with_browser_pool
 
 logger = get_task_logger(__name__)
 
 # --- HELPER: ASYNC BRIDGE ---
 def run_async(coro):
     """Helper to run async service calls inside sync Celery workers"""
-    return asyncio.run(coro)
+    # Each call gets a fresh event loop: release the loop's pooled browsers with it
+    return asyncio.run(run_with_browser_pool(coro))
 
 @shared_task(bind=True)
 def start_drone_build(self, user_prompt: str, user_answers: list = None):
@@ -108,6 +111,13 @@ def validate_and_finalize_build(bom_results, project_context):
     # --- STEP 1: NUMERICAL PHYSICS (The "Will it Fly?" Check) ---
     physics_report = run_physics_simulation(current_bom)
     twr = physics_report.get('twr', 0)
+
+    # Analytic hover + attitude stability pre-screen: logged and stored with the build for review
+    # (FleetRunner(prescreen=True) re-runs it from the physics_config to skip simulations)
+    # physics_service keys on 'category', sourced parts carry 'part_type'
+    physics_bom = [dict(item, category=item.get('category') or item.get('part_type', '')) for item in current_bom]
+    prescreen = prescreen_design(generate_physics_config(physics_bom))
+    logger.info(f"🧮 Pre-screen: {prescreen['verdict']} | Hover {prescreen['hover_throttle_pct']}% | {'; '.join(prescreen['reasons'])}")
     
     # Optimization Gate: TWR < 1.4 triggers AI Fix (max 3 retries)
     if twr < 1.4 and iteration <= 3:
@@ -186,6 +196,7 @@ def validate_and_finalize_build(bom_results, project_context):
         },
         "simulation": {
             "numerical": physics_report,
+            "prescreen": prescreen,
             "geometric": geo_report
         },
         "fabrication": assets,
@@ -11,6 +11,7 @@ from datetime import datetime
 from app.services.ai_service import call_llm_for_json, generate_assembly_blueprint, generate_assembly_instructions
 from app.services.physics_service import generate_physics_config
 from app.services.digital_twin_service import generate_scene_graph
+from app.sim.stability import prescreen_design
 from app.prompts import MASTER_DESIGNER_INSTRUCTION
 
 # --- NEW IMPORTS FOR ISAAC SIM ---
@@ -215,6 +216,16 @@ async def design_fleet():
         
         print(f"   ✅ Physics Verified: TWR {twr:.2f} (Weight: {physics['meta']['total_weight_g']}g)")
 
+        # Analytic hover/stability check (microseconds, no simulator)
+        prescreen = prescreen_design(physics)
+        print(f"   🧮 Pre-screen: {prescreen['verdict']} (Hover {prescreen['hover_throttle_pct']}%)")
+        for reason in prescreen['reasons']:
+            print(f"      - {reason}")
+
+        if prescreen['twr'] <= 1.0:
+            print("      ❌ Build Rejected: cannot hover.")
+            continue
+
         # Generate Extras
         dummy_mission = {"mission_name": "AI Design", "primary_goal": "Industrial"}
         scene_graph = generate_scene_graph(dummy_mission, ai_bom)
@@ -234,6 +245,7 @@ async def design_fleet():
             "technical_data": {
                 "blueprint": blueprint, # Save blueprint so Asset Generator can use it
                 "physics_config": physics,
+                "prescreen": prescreen, # For review only: FleetRunner(prescreen=True) recomputes it from physics_config
                 "scene_graph": scene_graph
             }
         }
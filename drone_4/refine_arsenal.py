@@ -3,13 +3,17 @@ import asyncio
 import json
 import os
 import re
-from playwright.async_api import async_playwright
 import google.generativeai as genai
 from app.config import settings
+from app.services.browser_pool import get_browser_pool, run_with_browser_pool
+from app.services.scrape_cache import get_scrape_cache
 
 # --- CONFIG ---
 ARSENAL_FILE = "drone_arsenal.json"
 
+# investigate_url() marker: offline run, the page was never captured (keep the component)
+NOT_CACHED = "not_cached"
+
 if settings.GOOGLE_API_KEY:
     genai.configure(api_key=settings.GOOGLE_API_KEY)
 
@@ -101,73 +105,102 @@ async def audit_component(model, comp):
     res = await model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
     return clean_json(res.text)
 
+async def capture_page(url):
+    """
+    Renders a product page the way the extractor reads it: lets the vision model
+    click through to the spec tab, then grabs the screenshot, HTML and text.
+
+    Returns:
+        (text, html, screenshot_bytes)
+    """
+    import PIL.Image
+    from io import BytesIO
+
+    # Borrow a page from the shared browser pool (1920x1080 desktop viewport preset).
+    # "visual" keeps images + CSS for the screenshots, drops media, fonts and trackers.
+    pool = get_browser_pool()
+    async with pool.page("visual") as page:
+        await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+        await pool.wait_for_idle(page)
+
+        # 1. VISUAL NAVIGATION (Click "Specs" tabs)
+        screenshot_bytes = await page.screenshot(type="jpeg", quality=60)
+        vision_model = genai.GenerativeModel('gemini-2.5-pro')
+        nav_resp = await vision_model.generate_content_async([
+            UI_NAVIGATOR_PROMPT,
+            PIL.Image.open(BytesIO(screenshot_bytes))
+        ], generation_config={"response_mime_type": "application/json"})
+
+        nav = clean_json(nav_resp.text)
+
+        if nav.get('action') == 'CLICK' and nav.get('confidence', 0) > 0.8:
+            try:
+                await page.get_by_text(nav['target_text'], exact=False).first.click(timeout=3000)
+                await pool.wait_for_idle(page, timeout_ms=3000)
+                # Take new screenshot after click
+                screenshot_bytes = await page.screenshot(type="jpeg", quality=60)
+            except: pass
+
+        # 2. TEXT EXTRACTION
+        content = await page.evaluate("""() => {
+            const selectors = ['.product-description', '#description', '.tabs', '.woocommerce-Tabs-panel', 'table'];
+            for (let s of selectors) {
+                const el = document.querySelector(s);
+                if (el) return el.innerText;
+            }
+            return document.body.innerText;
+        }""")
+        return content, await page.content(), screenshot_bytes
+
 async def investigate_url(comp, missing_keys):
+    """
+    Extracts the missing keys from the component's product page.
+    Page captures go through the scrape cache (see ScrapeCache.put_capture): fresh ones
+    are reused, and SCRAPE_CACHE_MODE=offline replays them without touching the network,
+    so prompt changes can be iterated on for free.
+
+    Returns:
+        Extractor JSON, None on failure, NOT_CACHED when offline and the page was never captured
+    """
     url = comp.get('source_url')
     if not url: return None
 
     print(f"      🕵️  Refining: {comp['model_name'][:30]}...")
-    
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page(viewport={"width": 1920, "height": 1080})
-        
-        try:
-            await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-            await asyncio.sleep(2)
 
-            # 1. VISUAL NAVIGATION (Click "Specs" tabs)
-            screenshot_bytes = await page.screenshot(type="jpeg", quality=60)
-            
-            # Helper to create Image object for Gemini
-            import PIL.Image
-            from io import BytesIO
-            screenshot_img = PIL.Image.open(BytesIO(screenshot_bytes))
-
-            vision_model = genai.GenerativeModel('gemini-2.5-pro')
-            nav_resp = await vision_model.generate_content_async([
-                UI_NAVIGATOR_PROMPT,
-                screenshot_img
-            ], generation_config={"response_mime_type": "application/json"})
-            
-            nav = clean_json(nav_resp.text)
-            
-            if nav.get('action') == 'CLICK' and nav.get('confidence', 0) > 0.8:
-                try:
-                    await page.get_by_text(nav['target_text'], exact=False).first.click(timeout=3000)
-                    await asyncio.sleep(1)
-                    # Take new screenshot after click
-                    screenshot_bytes = await page.screenshot(type="jpeg", quality=60)
-                    screenshot_img = PIL.Image.open(BytesIO(screenshot_bytes))
-                except: pass
-
-            # 2. TEXT EXTRACTION
-            content = await page.evaluate("""() => {
-                const selectors = ['.product-description', '#description', '.tabs', '.woocommerce-Tabs-panel', 'table'];
-                for (let s of selectors) {
-                    const el = document.querySelector(s);
-                    if (el) return el.innerText;
-                }
-                return document.body.innerText;
-            }""")
-            
-            clean_text = content.replace("\n", " ")[:15000]
-
-            # 3. MULTIMODAL EXTRACTION (Text + Image)
-            extract_resp = await vision_model.generate_content_async(
-                [
-                    EXTRACTOR_PROMPT.format(missing_keys=missing_keys, page_text=clean_text),
-                    screenshot_img # Pass the image for chart reading
-                ],
-                generation_config={"response_mime_type": "application/json"}
-            )
-            
-            return clean_json(extract_resp.text)
+    try:
+        # 1. CAPTURE (cache first)
+        cache = get_scrape_cache()
+        entry = cache.get_capture(url) if cache else None
+        if entry is not None and (cache.offline or cache.is_fresh(entry)):
+            cache.stats["hits"] += 1
+            print(f"      ♻️  Cache hit: {url}")
+            content, screenshot_bytes = entry["text"], cache.load_screenshot(entry)
+        elif cache and cache.offline:
+            print(f"      📴 Offline: not cached, skipping {url}")
+            return NOT_CACHED
+        else:
+            if cache: cache.stats["misses"] += 1
+            content, html, screenshot_bytes = await capture_page(url)
+            if cache: cache.put_capture(url, content, html, screenshot_bytes)
+
+        clean_text = (content or "").replace("\n", " ")[:15000]
+
+        # 2. MULTIMODAL EXTRACTION (Text + Image)
+        import PIL.Image
+        from io import BytesIO
+        parts = [EXTRACTOR_PROMPT.format(missing_keys=missing_keys, page_text=clean_text)]
+        if screenshot_bytes:
+            parts.append(PIL.Image.open(BytesIO(screenshot_bytes))) # Pass the image for chart reading
+
+        vision_model = genai.GenerativeModel('gemini-2.5-pro')
+        extract_resp = await vision_model.generate_content_async(
+            parts, generation_config={"response_mime_type": "application/json"})
+
+        return clean_json(extract_resp.text)
 
-        except Exception as e:
-            print(f"      ❌ Scrape Error: {e}")
-            return None
-        finally:
-            await browser.close()
+    except Exception as e:
+        print(f"      ❌ Scrape Error: {e}")
+        return None
 
 async def run_refinery():
     print("🔬 OPENFORGE REFINERY: Improving Data Integrity...")
@@ -187,6 +220,8 @@ async def run_refinery():
         if audit.get('status') == 'FAIL':
             missing = audit.get('missing_keys', [])
             investigation = await investigate_url(comp, missing)
+            if investigation == NOT_CACHED:
+                continue
             found_data = investigation.get('found_data') if investigation else None
             
             if investigation and isinstance(found_data, dict) and found_data:
@@ -211,4 +246,4 @@ async def run_refinery():
     print(f"\n✅ Refinery Complete. Arsenal size: {len(data['components'])}")
 
 if __name__ == "__main__":
-    asyncio.run(run_refinery())
\ No newline at end of file
+    asyncio.run(run_with_browser_pool(run_refinery()))
\ No newline at end of file
@@ -6,6 +6,7 @@ import random
 from datetime import datetime
 from app.services.ai_service import call_llm_for_json
 from app.services.fusion_service import fuse_component_data
+from app.services.browser_pool import run_with_browser_pool
 from app.services.texture_service import extract_visual_dna
 from app.prompts import (
     RANCHER_PERSONA_INSTRUCTION, 
@@ -290,4 +291,4 @@ async def run_seeder():
     print("\n✅ Seeding Complete. Arsenal & Audit Logs Updated.")
 
 if __name__ == "__main__":
-    asyncio.run(run_seeder())
\ No newline at end of file
+    asyncio.run(run_with_browser_pool(run_seeder()))
\ No newline at end of file
@@ -5,6 +5,7 @@ import os
 import random
 from app.services.ai_service import call_llm_for_json
 from app.services.fusion_service import fuse_component_data
+from app.services.browser_pool import run_with_browser_pool
 from app.services.texture_service import extract_visual_dna
 
 ARSENAL_FILE = "drone_arsenal.json"
@@ -164,4 +165,4 @@ async def seed_ecosystem():
     print("\n✅ Ecosystem is stable. Dependencies filled.")
 
 if __name__ == "__main__":
-    asyncio.run(seed_ecosystem())
\ No newline at end of file
+    asyncio.run(run_with_browser_pool(seed_ecosystem()))
\ No newline at end of file
@@ -1,5 +1,116 @@
 # FILE: app/services/ik_service.py
 import math
+from functools import lru_cache
+import numpy as np
+
+# --- CONFIGURATION ---
+# Leg order used by every array below (same as IsaacService.generate_robot_usd)
+LEG_NAMES = ("FR", "FL", "RR", "RL")
+# Trot: diagonal pairs move together (FR + RL, then FL + RR half a cycle later)
+TROT_PHASE_OFFSETS = np.array([0.0, 0.5, 0.5, 0.0])
+# Fallback neutral stance: hip-to-foot height as a fraction of the fully extended leg.
+# Pipeline callers pass the workspace stance instead (workspace_service.plan_trot), since
+# 0.85 puts a 100mm trot stride outside the +/-45 deg hip limits.
+DEFAULT_STANCE_RATIO = 0.85
+# Samples per gait cycle in a precomputed joint table
+GAIT_SAMPLES = 200
+
+def solve_2dof_array(femur_len, tibia_len, target_x, target_z):
+    """
+    Vectorized InverseKinematicsService.solve_2dof.
+    Every argument broadcasts, so one call can cover all legs over a whole gait
+    cycle, or a whole sweep of leg lengths (e.g. femur_len[:, None]).
+
+    Returns:
+        (hip_angle_rad, knee_angle_rad) arrays, NaN where the target is unreachable
+    """
+    l1 = np.asarray(femur_len, dtype=float)
+    l2 = np.asarray(tibia_len, dtype=float)
+    x = np.asarray(target_x, dtype=float)
+    z = np.asarray(target_z, dtype=float)
+
+    r = np.hypot(x, z)
+    reachable = (r <= l1 + l2) & (r > 0)
+    r_safe = np.where(r > 0, r, 1.0)
+
+    # Same law-of-cosines construction as the scalar solver
+    cos_knee = np.clip((l1**2 + l2**2 - r**2) / (2 * l1 * l2), -1.0, 1.0)
+    knee_angle = -(np.pi - np.arccos(cos_knee))
+
+    cos_hip_offset = np.clip((l1**2 + r_safe**2 - l2**2) / (2 * l1 * r_safe), -1.0, 1.0)
+    hip_angle = np.arctan2(x, np.abs(z)) + np.arccos(cos_hip_offset)
+
+    return np.where(reachable, hip_angle, np.nan), np.where(reachable, knee_angle, np.nan)
+
+def trot_path_array(t, cycle_time=0.5, stride_length=0.1, step_height=0.05):
+    """
+    Vectorized InverseKinematicsService.generate_trot_path.
+
+    Returns:
+        (x, z) arrays: foot offset from the neutral stance (z = lift, positive up)
+    """
+    phase = (np.asarray(t, dtype=float) % cycle_time) / cycle_time
+    swing = phase < 0.5
+    progress = np.where(swing, phase, phase - 0.5) / 0.5
+
+    # Swing: parabola forward + lift. Stance: linear drag backward on the ground.
+    x = np.where(swing, progress - 0.5, 0.5 - progress) * stride_length
+    z = np.where(swing, np.sin(progress * np.pi) * step_height, 0.0)
+    return x, z
+
+@lru_cache(maxsize=256)
+def gait_table(femur_len, tibia_len, stride_length=0.1, step_height=0.05, cycle_time=0.5, stance_height=None,
+               samples=GAIT_SAMPLES):
+    """
+    Precomputed trot joint-angle table for one leg geometry (cached per parameter set).
+    Solves IK for all four legs over a full cycle in one call.
+
+    Args:
+        femur_len, tibia_len: Leg lengths (m)
+        stride_length, step_height, cycle_time: Trot parameters (see generate_trot_path)
+        stance_height: Hip-to-foot height at rest (m). Defaults to DEFAULT_STANCE_RATIO of the leg.
+        samples: Samples per cycle
+
+    Returns:
+        dict of read-only arrays ((4, samples) per leg in LEG_NAMES order):
+        "time", "foot_x", "foot_z", "hip", "knee", plus "reachable" (bool) and the parameters
+    """
+    if stance_height is None:
+        stance_height = DEFAULT_STANCE_RATIO * (femur_len + tibia_len)
+
+    time_s = np.arange(samples) * (cycle_time / samples)
+    leg_t = time_s[None, :] + TROT_PHASE_OFFSETS[:, None] * cycle_time # (4, samples)
+    foot_x, lift = trot_path_array(leg_t, cycle_time, stride_length, step_height)
+    foot_z = stance_height - lift # Distance below the hip (solve_2dof convention)
+    hip, knee = solve_2dof_array(femur_len, tibia_len, foot_x, foot_z)
+
+    table = {"time": time_s, "foot_x": foot_x, "foot_z": foot_z, "hip": hip, "knee": knee}
+    for values in table.values():
+        values.flags.writeable = False # Shared through the cache
+    table.update({
+        "reachable": bool(np.isfinite(hip).all()),
+        "femur_len": femur_len, "tibia_len": tibia_len, "stride_length": stride_length,
+        "step_height": step_height, "cycle_time": cycle_time, "stance_height": stance_height
+    })
+    return table
+
+def sample_gait(table, t):
+    """
+    Gait playback: joint angles at time(s) t by linear interpolation in a gait_table
+    (wraps around the cycle), instead of trig per tick.
+
+    Returns:
+        (hip, knee): (4,) arrays for a scalar t, (4, len(t)) for an array of times
+    """
+    samples = table["hip"].shape[1]
+    pos = (np.asarray(t, dtype=float) % table["cycle_time"]) / table["cycle_time"] * samples
+    i0 = np.floor(pos).astype(int) % samples
+    i1 = (i0 + 1) % samples
+    frac = pos - np.floor(pos)
+
+    hip = table["hip"][:, i0] * (1.0 - frac) + table["hip"][:, i1] * frac
+    knee = table["knee"][:, i0] * (1.0 - frac) + table["knee"][:, i1] * frac
+    return hip, knee
 
 class InverseKinematicsService:
     def __init__(self, femur_len=0.1, tibia_len=0.1):
@@ -88,4 +199,14 @@ class InverseKinematicsService:
             x = (0.5 - progress) * stride_length
             z = 0 # On ground
             
-        return x, z
\ No newline at end of file
+        return x, z
+
+    def solve_array(self, target_x, target_z):
+        """Vectorized solve_2dof for this leg (NaN instead of None when unreachable)."""
+        return solve_2dof_array(self.l1, self.l2, target_x, target_z)
+
+    def trot_table(self, cycle_time=0.5, stride_length=0.1, step_height=0.05, stance_height=None,
+                   samples=GAIT_SAMPLES):
+        """Cached trot joint table for this leg geometry (see gait_table / sample_gait)."""
+        return gait_table(float(self.l1), float(self.l2), stride_length, step_height, cycle_time,
+                          stance_height, samples)
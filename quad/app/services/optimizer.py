@@ -1,6 +1,15 @@
 # FILE: app/services/optimizer.py
 import copy
 import re
+from app.services.workspace_service import DESIGN_STEP_HEIGHT_M, DESIGN_STRIDE_M, get_workspace
+
+# --- CONFIGURATION ---
+# Trot the legs must support: the design trot physics analyzes and the walk test plays
+TARGET_STRIDE_M = DESIGN_STRIDE_M
+TARGET_STEP_HEIGHT_M = DESIGN_STEP_HEIGHT_M
+# Femur scale factors tried when looking for a geometry that can trot
+FEMUR_SCALE_CANDIDATES = (0.85, 0.9, 0.95, 1.05, 1.1, 1.2, 1.3, 1.4, 1.5)
+SEARCH_CELLS = 64 # Coarser workspace raster for candidate geometries
 
 class EngineeringOptimizer:
     """
@@ -48,13 +57,16 @@ class EngineeringOptimizer:
             
             # Strategy B: Change Geometry (Shorten Legs for Leverage)
             # Torque = Force * Distance. Reducing distance reduces torque load.
-            fixes.append({
-                "type": "MODIFY_GEOMETRY",
-                "severity": "ADVISORY",
-                "diagnosis": "Legs are too long for these servos.",
-                "action": "Shortening Femur length by 15% to increase mechanical advantage.",
-                "param_change": {"femur_length_mm": 0.85}
-            })
+            # Only if the shorter leg can still reach the trot inside its joint limits.
+            femur_m, tibia_m = self._leg_lengths_m(physics_report)
+            if get_workspace(femur_m * 0.85, tibia_m, SEARCH_CELLS).gait_feasible(TARGET_STRIDE_M, TARGET_STEP_HEIGHT_M):
+                fixes.append({
+                    "type": "MODIFY_GEOMETRY",
+                    "severity": "ADVISORY",
+                    "diagnosis": "Legs are too long for these servos.",
+                    "action": "Shortening Femur length by 15% to increase mechanical advantage.",
+                    "param_change": {"femur_length_mm": 0.85}
+                })
 
         # --- HEURISTIC 2: VOLTAGE / BROWNOUT ---
         # Did we calculate a brownout risk in compatibility_service?
@@ -84,6 +96,28 @@ class EngineeringOptimizer:
                 "search_modifier": "Li-Ion 21700 pack 3S" # Li-Ion has better energy density than LiPo
             })
 
+        # --- HEURISTIC 4: GAIT REACHABILITY ---
+        # Can the legs trot at all inside the servo joint limits? (precomputed workspace map)
+        femur_m, tibia_m = self._leg_lengths_m(physics_report)
+        workspace = get_workspace(femur_m, tibia_m)
+        stance_m, max_stride_m = workspace.best_stance(TARGET_STEP_HEIGHT_M)
+        if max_stride_m < TARGET_STRIDE_M:
+            factor = self._femur_scale_for_gait(femur_m, tibia_m)
+            fix = {
+                "type": "MODIFY_GEOMETRY",
+                "severity": "WARNING",
+                "diagnosis": f"Leg geometry only reaches a {max_stride_m * 1000:.0f}mm stride inside the joint limits "
+                             f"(target {TARGET_STRIDE_M * 1000:.0f}mm).",
+                "workspace": workspace.summary(TARGET_STEP_HEIGHT_M)
+            }
+            if factor is not None:
+                fix["action"] = f"Scaling Femur length by {factor:.2f}x to reach the target stride."
+                fix["param_change"] = {"femur_length_mm": factor}
+            else:
+                fix["action"] = f"Reducing gait stride to {max_stride_m * 1000:.0f}mm (no femur length reaches the target)."
+                fix["gait_change"] = {"stride_length_m": round(max_stride_m, 3), "stance_height_m": stance_m}
+            fixes.append(fix)
+
         if not fixes:
             return None 
 
@@ -92,6 +126,21 @@ class EngineeringOptimizer:
             "optimization_plan": fixes
         }
 
+    def _leg_lengths_m(self, physics_report):
+        """(femur, tibia) in meters from the physics report geometry (100 / 110 mm defaults)."""
+        geometry = physics_report.get('geometry', {})
+        femur_mm = float(geometry.get('femur_length_mm') or 100.0)
+        tibia_mm = float(geometry.get('tibia_length_mm') or femur_mm * 1.1)
+        return femur_mm / 1000.0, tibia_mm / 1000.0
+
+    def _femur_scale_for_gait(self, femur_m, tibia_m):
+        """Smallest femur change (from FEMUR_SCALE_CANDIDATES) whose workspace trots the target gait."""
+        for factor in sorted(FEMUR_SCALE_CANDIDATES, key=lambda f: abs(f - 1.0)):
+            workspace = get_workspace(femur_m * factor, tibia_m, SEARCH_CELLS)
+            if workspace.gait_feasible(TARGET_STRIDE_M, TARGET_STEP_HEIGHT_M):
+                return factor
+        return None
+
     def _find_part(self, bom, part_type):
         return next((i for i in bom if part_type in i.get('part_type', '')), {})
 
@@ -1,9 +1,70 @@
 # FILE: app/services/physics_service.py
 import re
 import math
+import tempfile
+import numpy as np
+from app.services.ik_service import DEFAULT_STANCE_RATIO, gait_table, sample_gait
+from app.services.urdf_service import FOOT_FRICTION, QuadURDFExporter
+from app.services.workspace_service import (DESIGN_CYCLE_S, DESIGN_STEP_HEIGHT_M, DESIGN_STRIDE_M, get_workspace,
+                                            plan_trot)
+
+# Walk-test cross-check of the torque model (needs PyBullet)
+try:
+    from app.sim.gait_runner import STALL_WARNING, GaitTestRunner
+except ImportError:
+    GaitTestRunner = None
 
 # --- CONFIGURATION ---
 GRAVITY = 9.81
+NM_TO_KGCM = 100.0 / GRAVITY
+
+# Gait used for the dynamic torque analysis: the design trot
+# (InverseKinematicsService.generate_trot_path defaults, see workspace_service)
+GAIT_STRIDE_M = DESIGN_STRIDE_M
+GAIT_STEP_HEIGHT_M = DESIGN_STEP_HEIGHT_M
+GAIT_CYCLE_S = DESIGN_CYCLE_S
+
+# Stance drag: the trot drags the stance foot back along the ground, which pushes it
+# forward with up to friction x normal load (same foot friction as the walk-test URDF)
+STANCE_DRAG_RATIO = FOOT_FRICTION
+
+# Leg links as uniform rods (structure + horn/bearing hardware), in kg
+FEMUR_LINK_MASS_KG = 0.05
+TIBIA_LINK_MASS_KG = 0.03
+
+# A hobby servo can't change speed instantly: joint accelerations are taken over
+# this window, which also smooths the trot path's swing/stance velocity kink.
+SERVO_RESPONSE_S = 0.02
+
+# Walk-test cross-check: minimum upright steady walking (s) for its torque reading to count
+WALK_CHECK_MIN_S = 0.1
+
+# Payload search range for the payload estimate
+PAYLOAD_SWEEP_KG = 20.0
+PAYLOAD_SWEEP_STEPS = 801
+
+# --- ENERGY MODEL ---
+# Servo current: idle + load current proportional to |torque| (DC motor, up to stall)
+# + running current proportional to |speed|. Hobby servos don't regenerate.
+SERVO_STALL_CURRENT_A = {"micro": 0.8, "standard": 2.5, "giant": 5.0} # Same classes as the compatibility check
+SERVO_IDLE_CURRENT_A = 0.01       # Quiescent draw of the servo electronics
+SERVO_NO_LOAD_RATIO = 0.08        # No-load running current as a fraction of stall current
+SERVO_VOLTAGE_V = 6.0
+SERVO_SPEED_S_PER_60 = 0.15       # Fallback no-load speed (s / 60 deg)
+SERVO_TORQUE_KGCM = 20.0          # Fallback stall torque when the BOM has no actuator rating
+BEC_EFFICIENCY = 0.85             # Battery -> servo rail regulator
+AVIONICS_POWER_W = 5.0            # SBC + servo controller + sensors
+LIPO_CELL_VOLTAGE = 3.7
+DEFAULT_BATTERY_CELLS = 3
+USABLE_CAPACITY = 0.8             # Don't run a LiPo below ~20%
+
+# Gaits reported in the runtime table: (stride_m, step_height_m, cycle_s)
+RUNTIME_GAITS = {
+    "stand": (0.0, 0.0, GAIT_CYCLE_S),
+    "walk": (0.03, 0.015, 0.45),
+    "trot": (GAIT_STRIDE_M, GAIT_STEP_HEIGHT_M, GAIT_CYCLE_S)
+}
+RUNTIME_PAYLOADS_KG = (0.0, 0.5, 1.0, 2.0)
 
 # Fallback weights (in grams) for Robot Dog parts
 FALLBACK_WEIGHTS = {
@@ -76,6 +137,94 @@ def _calculate_torque_requirements(total_mass_kg, femur_length_mm):
     
     return required_torque_kgcm
 
+def analyze_gait_torque(total_mass_kg, femur_len_m, tibia_len_m, stride_length=GAIT_STRIDE_M,
+                        step_height=GAIT_STEP_HEIGHT_M, cycle_time=GAIT_CYCLE_S, femur_mass_kg=FEMUR_LINK_MASS_KG,
+                        tibia_mass_kg=TIBIA_LINK_MASS_KG, stance_height=None):
+    """
+    Dynamic joint torques over a full trot cycle (all 4 legs, every gait sample).
+
+    Physics Logic:
+    - Joint angles come from the cached gait_table (ik_service).
+    - Stance legs share the body weight, and the stance drag adds a horizontal
+      ground force (STANCE_DRAG_RATIO x normal load). The full ground force maps to
+      joint torque through the leg Jacobian (tau = J^T F), so the lever arm follows the pose.
+    - Every leg also carries its own rigid-body dynamics (tau = M(q) qdd + C(q, qd) + G(q)),
+      which is the whole load during swing.
+
+    Args:
+        total_mass_kg: Robot mass, scalar or array (e.g. a sweep of candidate BOMs).
+                       Results broadcast over its shape.
+        stance_height: Hip-to-foot height (m). Defaults to the leg workspace's best stance.
+
+    Returns:
+        dict: per-joint "hip" / "knee" peak and RMS (N.m and kg.cm), the overall
+        "peak_kgcm" / "rms_kgcm", the traces "torque_nm" (..., 4, S, 2) and
+        "velocity_rad_s" (4, S, 2) [leg, sample, (hip, knee)], and "within_limits"
+        (the path respects the joint limits). None if unreachable.
+    """
+    workspace = get_workspace(femur_len_m, tibia_len_m)
+    if stance_height is None:
+        stance_height = workspace.best_stance(step_height)[0]
+        if stance_height is None:
+            return None
+    table = gait_table(float(femur_len_m), float(tibia_len_m), stride_length, step_height, cycle_time, stance_height)
+    if not table["reachable"]:
+        return None
+
+    l1, l2 = femur_len_m, tibia_len_m
+    m1, m2 = femur_mass_kg, tibia_mass_kg
+    lc1, lc2 = l1 / 2.0, l2 / 2.0
+    i1, i2 = m1 * l1**2 / 12.0, m2 * l2**2 / 12.0
+
+    # 1. Joint kinematics (periodic differences on the gait table)
+    t = table["time"]
+    h = cycle_time / len(t)
+    q = np.stack([table["hip"], table["knee"]], axis=-1) # (4, S, 2)
+    q_ahead = np.stack(sample_gait(table, t + h), axis=-1)
+    q_behind = np.stack(sample_gait(table, t - h), axis=-1)
+    qd = (q_ahead - q_behind) / (2.0 * h)
+    q_late = np.stack(sample_gait(table, t + SERVO_RESPONSE_S), axis=-1)
+    q_early = np.stack(sample_gait(table, t - SERVO_RESPONSE_S), axis=-1)
+    qdd = (q_late - 2.0 * q + q_early) / SERVO_RESPONSE_S**2
+
+    hip, knee = q[..., 0], q[..., 1]
+    s1, s12, ck, sk = np.sin(hip), np.sin(hip + knee), np.cos(knee), np.sin(knee)
+    c1, c12 = np.cos(hip), np.cos(hip + knee)
+
+    # 2. Leg dynamics: two-link planar arm, angles from the downward vertical
+    m11 = i1 + i2 + m1 * lc1**2 + m2 * (l1**2 + lc2**2 + 2 * l1 * lc2 * ck)
+    m12 = i2 + m2 * (lc2**2 + l1 * lc2 * ck)
+    m22 = i2 + m2 * lc2**2
+    coriolis = -m2 * l1 * lc2 * sk
+    g1 = GRAVITY * (m1 * lc1 * s1 + m2 * (l1 * s1 + lc2 * s12))
+    g2 = GRAVITY * m2 * lc2 * s12
+    leg_tau = np.stack([
+        m11 * qdd[..., 0] + m12 * qdd[..., 1] + coriolis * (2 * qd[..., 0] * qd[..., 1] + qd[..., 1]**2) + g1,
+        m12 * qdd[..., 0] + m22 * qdd[..., 1] - coriolis * qd[..., 0]**2 + g2
+    ], axis=-1)
+
+    # 3. Stance load: ground force on the feet on the ground, through the full J^T
+    # Normal force N (up) = body weight shared by the stance legs, drag force D (forward) = ratio x N
+    # tau = -J^T F_ext with F_ext = (D, -N) in (foot x, foot depth): tau = N * (J_depth - ratio * J_x)
+    in_stance = table["foot_z"] >= table["stance_height"] - 1e-9 # (4, S)
+    legs_down = np.maximum(in_stance.sum(axis=0), 1)
+    weight_share = np.where(in_stance, 1.0 / legs_down, 0.0) # (4, S)
+    jacobian_x = np.stack([l1 * c1 + l2 * c12, l2 * c12], axis=-1) # d(foot x)/dq
+    jacobian_z = np.stack([-l1 * s1 - l2 * s12, -l2 * s12], axis=-1) # d(foot depth)/dq
+    load = np.asarray(total_mass_kg, dtype=float)[..., None, None, None] * GRAVITY
+    torque = leg_tau + load * weight_share[..., None] * (jacobian_z - STANCE_DRAG_RATIO * jacobian_x)
+
+    # 4. Summary per joint
+    peak = np.abs(torque).max(axis=(-3, -2))
+    rms = np.sqrt((torque**2).mean(axis=(-3, -2)))
+    result = {"torque_nm": torque, "velocity_rad_s": qd, "time": t, "stance_mask": in_stance,
+              "peak_kgcm": np.max(peak, axis=-1) * NM_TO_KGCM, "rms_kgcm": np.max(rms, axis=-1) * NM_TO_KGCM,
+              "within_limits": workspace.gait_feasible(stride_length, step_height, stance_height)}
+    for j, joint in enumerate(("hip", "knee")):
+        result[joint] = {"peak_nm": peak[..., j], "rms_nm": rms[..., j],
+                         "peak_kgcm": peak[..., j] * NM_TO_KGCM, "rms_kgcm": rms[..., j] * NM_TO_KGCM}
+    return result
+
 def generate_physics_config(bom):
     """
     Generates the Physics Profile for the Quadruped.
@@ -101,65 +250,263 @@ def generate_physics_config(bom):
         if specs.get('femur_length_mm'):
             femur_mm = float(specs['femur_length_mm'])
     
-    # 4. Calculate Torque Physics
-    req_torque = _calculate_torque_requirements(mass_kg, femur_mm)
+    tibia_mm = femur_mm * 1.1 # Tibia usually slightly longer
+    femur_m, tibia_m = femur_mm / 1000.0, tibia_mm / 1000.0
+
+    # 4. Calculate Torque Physics (dynamic trot analysis, static formula if the gait is unreachable)
+    # The design trot as specified, never shortened to fit: at the workspace stance when the legs
+    # play it inside the joint limits, else at the default stance with the trot flagged infeasible
+    plan = plan_trot(femur_m, tibia_m)
+    trot_in_limits = bool(plan and plan["within_limits"])
+    stance_m = plan["stance_height"] if trot_in_limits else DEFAULT_STANCE_RATIO * (femur_m + tibia_m)
+    gait_args = (GAIT_STRIDE_M, GAIT_STEP_HEIGHT_M, GAIT_CYCLE_S)
+    gait = analyze_gait_torque(mass_kg, femur_m, tibia_m, *gait_args, stance_height=stance_m)
+    if not trot_in_limits:
+        max_stride_mm = plan["max_stride"] * 1000 if plan else 0.0
+        print(f"   ⚠️  Design trot ({GAIT_STRIDE_M * 1000:.0f}mm stride, {GAIT_STEP_HEIGHT_M * 1000:.0f}mm step) is "
+              f"outside the joint limits (max stride {max_stride_mm:.0f}mm). Legs need resizing.")
+    if gait is not None:
+        model_torque = float(gait["peak_kgcm"])
+    else:
+        print("   ⚠️  Trot path unreachable for this leg geometry. Using the static torque estimate.")
+        model_torque = _calculate_torque_requirements(mass_kg, femur_mm)
     
     # 5. Get Available Torque
     avail_torque = 0.0
     if actuators:
         specs = actuators.get('engineering_specs', {})
         avail_torque = _extract_number(specs.get('est_torque_kgcm') or specs.get('torque') or specs.get('stall_torque'))
+
+    # 6. Walk-Test Cross-Check
+    # The same trot on the robot's URDF in PyBullet. The servo load it measures is the floor
+    # for the requirement; the model is scaled up to it for the payload sweep.
+    walk_check = _walk_test_torque(bom, mass_kg, femur_mm, tibia_mm, avail_torque, stance_m) \
+        if gait is not None else None
+    req_torque = model_torque
+    if walk_check and walk_check["torque_kgcm"] is not None and walk_check["torque_kgcm"] > model_torque:
+        print(f"   ⚠️  Walk test loads the servos to {walk_check['torque_kgcm']:.1f}kg.cm "
+              f"(model {model_torque:.1f}kg.cm). Using the walk test.")
+        req_torque = walk_check["torque_kgcm"]
+    calibration = req_torque / model_torque if model_torque > 0 else 1.0
     
-    # 6. Safety Factor Analysis
+    # 7. Safety Factor Analysis
     # Dynamic Safety Factor: We want at least 2.0x overhead for jumping/running.
     safety_margin = avail_torque / req_torque if req_torque > 0 else 0
-    is_viable = safety_margin >= 1.5 # 1.5 is absolute minimum, 2.0+ preferred
+    is_viable = safety_margin >= 1.5 and trot_in_limits # 1.5 is absolute minimum, 2.0+ preferred
+    if safety_margin < 1.5:
+        failure_mode = "Insufficient Torque"
+    elif not trot_in_limits:
+        failure_mode = "Trot Outside Joint Limits"
+    else:
+        failure_mode = None
     
-    # 7. Payload Estimation
+    # 8. Payload Estimation
     # How much EXTRA weight can we add before hitting the 1.5 safety limit?
     # (Available / 1.5) = Max_Torque_Allowed
     # Max_Torque -> Max_Mass
     max_supported_torque = avail_torque / 1.5
-    max_supported_mass = (max_supported_torque / (femur_mm / 10.0)) * 2.0
+    if gait is not None:
+        # Sweep candidate masses through the same gait analysis in one vectorized call
+        masses = mass_kg + np.linspace(0.0, PAYLOAD_SWEEP_KG, PAYLOAD_SWEEP_STEPS)
+        peaks = analyze_gait_torque(masses, femur_m, tibia_m, *gait_args, stance_height=stance_m)["peak_kgcm"]
+        ok = peaks * calibration <= max_supported_torque
+        max_supported_mass = float(masses[ok].max()) if ok.any() else 0.0
+    else:
+        max_supported_mass = (max_supported_torque / (femur_mm / 10.0)) * 2.0
     est_payload_kg = max(0, max_supported_mass - mass_kg)
 
+    # 9. Energy / Runtime (servo current integrated over each gait cycle)
+    runtime_min, runtime_table = _calculate_runtime(battery, actuators, mass_kg, femur_m, tibia_m, avail_torque)
+
     config = {
         "mass_kg": round(mass_kg, 3),
         "geometry": {
             "femur_length_mm": femur_mm,
-            "tibia_length_mm": femur_mm * 1.1 # Tibia usually slightly longer
+            "tibia_length_mm": tibia_mm
         },
         "torque_physics": {
             "required_kgcm": round(req_torque, 2),
             "available_kgcm": round(avail_torque, 2),
             "safety_margin": round(safety_margin, 2),
-            "est_payload_capacity_kg": round(est_payload_kg, 2)
+            "est_payload_capacity_kg": round(est_payload_kg, 2),
+            "model": "dynamic_trot" if gait is not None else "static_two_leg",
+            "model_kgcm": round(model_torque, 2),
+            "walk_test": walk_check
+        },
+        "gait_torque": {
+            joint: {"peak_kgcm": round(float(gait[joint]["peak_kgcm"]), 2),
+                    "rms_kgcm": round(float(gait[joint]["rms_kgcm"]), 2)}
+            for joint in ("hip", "knee")
+        } if gait is not None else None,
+        "gait": {
+            "stride_length_m": GAIT_STRIDE_M,
+            "step_height_m": GAIT_STEP_HEIGHT_M,
+            "cycle_s": GAIT_CYCLE_S,
+            "stance_height_m": round(stance_m, 4),
+            "max_stride_m": round(plan["max_stride"], 4) if plan else 0.0,
+            "within_joint_limits": trot_in_limits
         },
         "viability": {
             "is_mechanically_sound": is_viable,
-            "failure_mode": None if is_viable else "Insufficient Torque"
+            "failure_mode": failure_mode
         },
         "meta": {
-            "est_runtime_min": _calculate_runtime(battery, mass_kg)
+            "est_runtime_min": runtime_min,
+            "runtime_by_gait": runtime_table
         }
     }
     
     print(f"   📊 Physics Ready: Mass={mass_kg}kg, Payload={est_payload_kg}kg, Margin={safety_margin:.1f}x")
     return config
 
-def _calculate_runtime(battery_item, total_mass_kg):
+def _walk_test_torque(bom, mass_kg, femur_mm, tibia_mm, avail_torque_kgcm, stance_height):
     """
-    Estimates runtime based on servo load.
-    Walking robots consume power non-linearly (holding torque draws current).
+    Walks the design trot on the robot's URDF in headless PyBullet (GaitTestRunner) and reads
+    the servo load back in kg.cm, as a check on the torque model.
+
+    Returns:
+        dict: "torque_kgcm" (worst joint's walking load, None if the robot tipped over before
+        WALK_CHECK_MIN_S of steady walking), "torque_ratio" per joint, "saturated" (at the stall
+        warning, so the real need is higher still), "status" and "loaded_s" of the walk test.
+        None without PyBullet or a rated actuator.
     """
-    if not battery_item: return 0
-    
-    mah = _extract_number(battery_item.get('engineering_specs', {}).get('capacity_mah'), 2200)
-    
-    # Heuristic: A robot dog draws approx 3 Amps per kg of weight during active walking.
-    # This is a rough rule of thumb for hobby servos.
-    avg_amp_draw = total_mass_kg * 3.0 
-    if avg_amp_draw <= 0: return 0
-    
-    hours = (mah / 1000.0) / avg_amp_draw
-    return round(hours * 60, 1)
\ No newline at end of file
+    if GaitTestRunner is None or avail_torque_kgcm <= 0: return None
+    robot = {"sku_id": "physics_walk_check", "technical_data": {"physics_config": {
+        "mass_kg": mass_kg, "geometry": {"femur_length_mm": femur_mm, "tibia_length_mm": tibia_mm}}}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        urdf = QuadURDFExporter(output_dir=tmp).generate_robot_urdf(robot, bom=bom)
+        runner = GaitTestRunner(urdf, femur_mm / 1000.0, tibia_mm / 1000.0, GAIT_STRIDE_M, GAIT_STEP_HEIGHT_M,
+                                GAIT_CYCLE_S, stance_height=stance_height)
+        try:
+            report = runner.run()
+        finally:
+            runner.close()
+
+    ratio = max(report["peak_torque_ratio"].values())
+    loaded = report["loaded_s"] >= WALK_CHECK_MIN_S
+    return {
+        "torque_kgcm": round(ratio * avail_torque_kgcm, 2) if loaded else None,
+        "torque_ratio": report["peak_torque_ratio"],
+        "saturated": loaded and ratio >= STALL_WARNING,
+        "status": report["status"],
+        "loaded_s": report["loaded_s"]
+    }
+
+def _servo_model(actuator_item, avail_torque_kgcm):
+    """
+    Servo electrical / mechanical specs for the energy model (spec sheet values, class defaults otherwise).
+
+    Returns:
+        dict: stall_torque_nm, stall_current_a, idle_current_a, no_load_current_a, no_load_speed_rad_s,
+        voltage_v, quantity
+    """
+    specs = (actuator_item or {}).get('engineering_specs', {})
+    size_class = str(specs.get('size_class', 'Standard')).lower()
+    default_stall = next((amps for name, amps in SERVO_STALL_CURRENT_A.items() if name in size_class),
+                         SERVO_STALL_CURRENT_A["standard"])
+    stall_current = _extract_number(specs.get('stall_current_a') or specs.get('stall_current'), default_stall)
+    speed = _extract_number(specs.get('speed_s_per_60deg') or specs.get('speed'), SERVO_SPEED_S_PER_60)
+
+    return {
+        "stall_torque_nm": (avail_torque_kgcm or SERVO_TORQUE_KGCM) / NM_TO_KGCM,
+        "stall_current_a": stall_current,
+        "idle_current_a": _extract_number(specs.get('idle_current_a') or specs.get('holding_current_a') or
+                                          specs.get('idle_current'), SERVO_IDLE_CURRENT_A),
+        "no_load_current_a": _extract_number(specs.get('no_load_current_a') or specs.get('running_current'),
+                                             stall_current * SERVO_NO_LOAD_RATIO),
+        "no_load_speed_rad_s": math.radians(60.0) / (speed or SERVO_SPEED_S_PER_60),
+        "voltage_v": _extract_number(specs.get('voltage_rating'), SERVO_VOLTAGE_V) or SERVO_VOLTAGE_V,
+        "quantity": int((actuator_item or {}).get('quantity', 8) or 8)
+    }
+
+def _battery_model(battery_item):
+    """(usable_capacity_ah, nominal_voltage_v) of the pack."""
+    specs = battery_item.get('engineering_specs', {})
+    mah = _extract_number(specs.get('capacity_mah'), 2200)
+    rating = str(specs.get('cell_count_s') or specs.get('voltage') or '').lower()
+    if 'v' in rating:
+        volts = _extract_number(rating, DEFAULT_BATTERY_CELLS * LIPO_CELL_VOLTAGE)
+    else:
+        volts = (_extract_number(rating, DEFAULT_BATTERY_CELLS) or DEFAULT_BATTERY_CELLS) * LIPO_CELL_VOLTAGE
+    return mah / 1000.0 * USABLE_CAPACITY, volts
+
+def analyze_gait_energy(gait, servo, battery_ah, battery_v):
+    """
+    Integrates servo current over one gait cycle and turns it into battery draw and runtime.
+
+    Physics Logic:
+    - Per joint sample: I = I_idle + (I_stall - I_idle) * |tau| / tau_stall + I_no_load * |omega| / omega_max
+      (load current saturates at stall, the servo can't regenerate).
+    - The 8 sagittal servos (hip + knee per leg) follow the gait traces; any extra
+      servos in the BOM (e.g. abduction) only draw idle current.
+    - Battery power = servo rail power / BEC efficiency + avionics.
+
+    Args:
+        gait: analyze_gait_torque result (torque traces may carry leading mass / payload dims)
+        servo: _servo_model dict
+        battery_ah: Usable capacity (Ah)
+        battery_v: Nominal pack voltage
+
+    Returns:
+        dict: "servo_current_a" per joint (hip, knee) cycle average, "avg_current_a" (servo rail),
+        "battery_current_a", "avg_power_w", "runtime_min" (shaped like the mass input)
+    """
+    torque = np.abs(gait["torque_nm"]) # (..., 4, S, 2)
+    speed = np.abs(gait["velocity_rad_s"]) # (4, S, 2)
+
+    load = np.minimum(torque / servo["stall_torque_nm"], 1.0)
+    running = np.minimum(speed / servo["no_load_speed_rad_s"], 1.0)
+    current = servo["idle_current_a"] + (servo["stall_current_a"] - servo["idle_current_a"]) * load + \
+        servo["no_load_current_a"] * running
+
+    # Uniform gait samples: the cycle integral divided by the period is the sample mean
+    joint_current = current.mean(axis=-2).sum(axis=-2) # (..., 2) summed over legs
+    idle_servos = max(servo["quantity"] - torque.shape[-3] * torque.shape[-1], 0)
+    rail_current = joint_current.sum(axis=-1) + idle_servos * servo["idle_current_a"]
+
+    power = rail_current * servo["voltage_v"] / BEC_EFFICIENCY + AVIONICS_POWER_W
+    battery_current = power / battery_v
+    return {
+        "servo_current_a": {"hip": joint_current[..., 0] / torque.shape[-3],
+                            "knee": joint_current[..., 1] / torque.shape[-3]},
+        "avg_current_a": rail_current,
+        "battery_current_a": battery_current,
+        "avg_power_w": power,
+        "runtime_min": battery_ah / battery_current * 60.0
+    }
+
+def _calculate_runtime(battery_item, actuator_item, total_mass_kg, femur_len_m, tibia_len_m, avail_torque_kgcm):
+    """
+    Estimates runtime from the servo energy model, per gait and payload.
+
+    Returns:
+        (trot_runtime_min, table) where table = {gait: {"avg_power_w", "battery_current_a",
+        "runtime_min", "runtime_by_payload_min": {payload_kg: min}}}. Gaits are planned inside the joint
+        limits (plan_trot); ones the leg can't play at all are skipped.
+    """
+    if not battery_item: return 0, {}
+    battery_ah, battery_v = _battery_model(battery_item)
+    servo = _servo_model(actuator_item, avail_torque_kgcm)
+
+    # Robot mass + each payload in one vectorized torque pass per gait
+    masses = total_mass_kg + np.asarray(RUNTIME_PAYLOADS_KG)
+    table = {}
+    for name, (stride, step, cycle) in RUNTIME_GAITS.items():
+        plan = plan_trot(femur_len_m, tibia_len_m, stride, step, cycle)
+        if plan is None: continue
+        gait = analyze_gait_torque(masses, femur_len_m, tibia_len_m, plan["stride_length"], step, cycle,
+                                   stance_height=plan["stance_height"])
+        if gait is None: continue
+        energy = analyze_gait_energy(gait, servo, battery_ah, battery_v)
+        table[name] = {
+            "avg_power_w": round(float(energy["avg_power_w"][0]), 1),
+            "battery_current_a": round(float(energy["battery_current_a"][0]), 2),
+            "runtime_min": round(float(energy["runtime_min"][0]), 1),
+            "runtime_by_payload_min": {str(kg): round(float(m), 1)
+                                       for kg, m in zip(RUNTIME_PAYLOADS_KG, energy["runtime_min"])}
+        }
+
+    # Headline number: the design trot, else the most demanding gait the legs can do
+    headline = table.get("trot") or table.get("walk") or table.get("stand")
+    return (headline["runtime_min"] if headline else 0), table
\ No newline at end of file
@@ -0,0 +1,176 @@
+# FILE: app/services/urdf_service.py
+import os
+import re
+import math
+from app.services.ik_service import LEG_NAMES
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+URDF_EXPORT_DIR = os.path.join(PROJECT_ROOT, "static", "generated", "urdf")
+
+# --- CONFIGURATION ---
+# Chassis + hip layout (same as IsaacService.generate_robot_usd)
+BODY_L = 0.24
+BODY_W = 0.12
+BODY_H = 0.05
+LEG_SIGNS = {"FR": (1, -1), "FL": (1, 1), "RR": (-1, -1), "RL": (-1, 1)}
+
+# Joint limits in degrees (same as IsaacService.generate_robot_usd)
+HIP_LIMIT_DEG = (-45.0, 45.0)
+KNEE_LIMIT_DEG = (-120.0, 0.0)
+
+# Defaults when the physics config / BOM don't say
+DEFAULT_MASS_KG = 2.0
+DEFAULT_FEMUR_MM = 100.0
+DEFAULT_SERVO_TORQUE_KGCM = 20.0
+DEFAULT_SERVO_SPEED_S_PER_60 = 0.15 # Typical hobby servo: 0.15 s / 60 deg
+FEMUR_MASS_KG = 0.05
+TIBIA_MASS_KG = 0.03
+LEG_RADIUS = 0.012
+FOOT_RADIUS = 0.015
+FOOT_FRICTION = 1.0
+
+def _extract_number(text, default=0.0):
+    """Robust extraction of numbers from dirty strings."""
+    if isinstance(text, (int, float)): return float(text)
+    if not text: return default
+    match = re.search(r"(\d+(\.\d+)?)", str(text))
+    return float(match.group(1)) if match else default
+
+def servo_limits_from_bom(bom, physics_config=None):
+    """
+    Servo effort / velocity limits for the URDF joints.
+
+    Returns:
+        (max_torque_nm, max_velocity_rad_s)
+    """
+    torque_kgcm, speed = 0.0, DEFAULT_SERVO_SPEED_S_PER_60
+    actuator = next((i for i in (bom or []) if 'actuator' in i.get('part_type', '').lower()), None)
+    if actuator:
+        specs = actuator.get('engineering_specs', {})
+        torque_kgcm = _extract_number(specs.get('est_torque_kgcm') or specs.get('torque') or specs.get('stall_torque'))
+        speed = _extract_number(specs.get('speed_s_per_60deg') or specs.get('speed'), speed) or speed
+    if torque_kgcm <= 0:
+        torque_kgcm = (physics_config or {}).get('torque_physics', {}).get('available_kgcm') or DEFAULT_SERVO_TORQUE_KGCM
+
+    # kg.cm -> N.m, s/60deg -> rad/s
+    return torque_kgcm * 9.81 / 100.0, math.radians(60.0) / speed
+
+def _cylinder_inertia(mass, radius, length):
+    ixx = mass * (3 * radius**2 + length**2) / 12.0
+    izz = mass * radius**2 / 2.0
+    return f'<inertia ixx="{ixx:.8f}" ixy="0" ixz="0" iyy="{ixx:.8f}" iyz="0" izz="{izz:.8f}"/>'
+
+class QuadURDFExporter:
+    """
+    Writes the quadruped scene graph (chassis, 4 x femur/tibia, revolute hip/knee
+    joints) as a URDF for headless PyBullet runs.
+
+    Joint angles follow the IK service convention: 0 = leg hanging straight down,
+    positive hip swings the foot forward, the knee bends backward (negative).
+    """
+    def __init__(self, output_dir=URDF_EXPORT_DIR):
+        self.output_dir = output_dir
+
+    def generate_robot_urdf(self, robot_data, bom=None):
+        """
+        Args:
+            robot_data: {"sku_id", "technical_data": {"physics_config": ...}} (same packet as IsaacService)
+            bom: Optional BOM for the servo torque / speed limits
+
+        Returns:
+            Path of the written URDF
+        """
+        sku = robot_data.get('sku_id', 'robot_dog')
+        physics = robot_data.get('technical_data', {}).get('physics_config', {}) or {}
+        geometry = physics.get('geometry', {})
+        femur_len = float(geometry.get('femur_length_mm') or DEFAULT_FEMUR_MM) / 1000.0
+        tibia_len = float(geometry.get('tibia_length_mm') or femur_len * 1100.0) / 1000.0
+        max_torque_nm, max_velocity = servo_limits_from_bom(bom, physics)
+
+        # Everything that isn't a leg lives in the chassis
+        total_mass = float(physics.get('mass_kg') or DEFAULT_MASS_KG)
+        body_mass = max(total_mass - 4 * (FEMUR_MASS_KG + TIBIA_MASS_KG), 0.1)
+        ixx = body_mass * (BODY_W**2 + BODY_H**2) / 12.0
+        iyy = body_mass * (BODY_L**2 + BODY_H**2) / 12.0
+        izz = body_mass * (BODY_L**2 + BODY_W**2) / 12.0
+
+        parts = [f"""<?xml version="1.0"?>
+<robot name="{sku}">
+
+  <link name="chassis">
+    <inertial>
+      <mass value="{body_mass:.4f}"/>
+      <inertia ixx="{ixx:.8f}" ixy="0" ixz="0" iyy="{iyy:.8f}" iyz="0" izz="{izz:.8f}"/>
+    </inertial>
+    <visual>
+      <geometry><box size="{BODY_L} {BODY_W} {BODY_H}"/></geometry>
+      <material name="grey"><color rgba="0.3 0.3 0.3 1.0"/></material>
+    </visual>
+    <collision>
+      <geometry><box size="{BODY_L} {BODY_W} {BODY_H}"/></geometry>
+    </collision>
+  </link>
+"""]
+        hip_lo, hip_hi = (math.radians(a) for a in HIP_LIMIT_DEG)
+        knee_lo, knee_hi = (math.radians(a) for a in KNEE_LIMIT_DEG)
+
+        for leg in LEG_NAMES:
+            sx, sy = LEG_SIGNS[leg]
+            # Legs: visual + inertia only, the foot sphere is the only leg collision
+            parts.append(f"""
+  <link name="femur_{leg}">
+    <inertial>
+      <origin xyz="0 0 {-femur_len / 2:.4f}"/>
+      <mass value="{FEMUR_MASS_KG}"/>
+      {_cylinder_inertia(FEMUR_MASS_KG, LEG_RADIUS, femur_len)}
+    </inertial>
+    <visual>
+      <origin xyz="0 0 {-femur_len / 2:.4f}"/>
+      <geometry><cylinder radius="{LEG_RADIUS}" length="{femur_len:.4f}"/></geometry>
+      <material name="blue"><color rgba="0.1 0.3 0.8 1.0"/></material>
+    </visual>
+  </link>
+
+  <joint name="hip_{leg}" type="revolute">
+    <parent link="chassis"/>
+    <child link="femur_{leg}"/>
+    <origin xyz="{sx * BODY_L / 2:.4f} {sy * BODY_W / 2:.4f} 0"/>
+    <axis xyz="0 -1 0"/>
+    <limit lower="{hip_lo:.4f}" upper="{hip_hi:.4f}" effort="{max_torque_nm:.4f}" velocity="{max_velocity:.4f}"/>
+  </joint>
+
+  <link name="tibia_{leg}">
+    <inertial>
+      <origin xyz="0 0 {-tibia_len / 2:.4f}"/>
+      <mass value="{TIBIA_MASS_KG}"/>
+      {_cylinder_inertia(TIBIA_MASS_KG, LEG_RADIUS, tibia_len)}
+    </inertial>
+    <visual>
+      <origin xyz="0 0 {-tibia_len / 2:.4f}"/>
+      <geometry><cylinder radius="{LEG_RADIUS * 0.8}" length="{tibia_len:.4f}"/></geometry>
+      <material name="light_grey"><color rgba="0.7 0.7 0.7 1.0"/></material>
+    </visual>
+    <collision>
+      <origin xyz="0 0 {-tibia_len:.4f}"/>
+      <geometry><sphere radius="{FOOT_RADIUS}"/></geometry>
+    </collision>
+    <contact><lateral_friction value="{FOOT_FRICTION}"/></contact>
+  </link>
+
+  <joint name="knee_{leg}" type="revolute">
+    <parent link="femur_{leg}"/>
+    <child link="tibia_{leg}"/>
+    <origin xyz="0 0 {-femur_len:.4f}"/>
+    <axis xyz="0 -1 0"/>
+    <limit lower="{knee_lo:.4f}" upper="{knee_hi:.4f}" effort="{max_torque_nm:.4f}" velocity="{max_velocity:.4f}"/>
+  </joint>
+""")
+        parts.append("\n</robot>\n")
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        urdf_path = os.path.join(self.output_dir, f"{sku}.urdf")
+        with open(urdf_path, "w") as f:
+            f.write("".join(parts))
+        print(f"   🦿 Generated Quad URDF: {urdf_path}")
+        return urdf_path
@@ -0,0 +1,165 @@
+# FILE: app/services/workspace_service.py
+from functools import lru_cache
+import numpy as np
+from app.services.ik_service import solve_2dof_array, trot_path_array
+
+# --- CONFIGURATION ---
+# Joint limits in degrees (same as IsaacService.generate_robot_usd)
+HIP_LIMIT_DEG = (-45.0, 45.0)
+KNEE_LIMIT_DEG = (-120.0, 0.0)
+
+# Raster resolution: cells per leg length (x spans +/- one leg length, z spans one)
+WORKSPACE_CELLS = 128
+# Step heights covered by the max-stride table, as a fraction of the leg length
+STEP_HEIGHT_CELLS = 24
+MAX_STEP_RATIO = 0.4
+# Points checked along each candidate foot path
+PATH_SAMPLES = 48
+
+# Design trot: the gait physics / the optimizer size the legs for and the walk test plays
+# (InverseKinematicsService.generate_trot_path defaults). Legs that can't fit it inside
+# the joint limits get flagged, the trot itself is never shortened to fit.
+DESIGN_STRIDE_M = 0.1
+DESIGN_STEP_HEIGHT_M = 0.05
+DESIGN_CYCLE_S = 0.5
+
+class LegWorkspace:
+    """
+    Precomputed reachability map of one 2-DOF leg (femur + tibia, sagittal plane).
+    Rasterizes the reachable and joint-limit-respecting region once, then
+    answers point and trot-feasibility queries with table lookups.
+
+    Coordinates follow solve_2dof: x forward from the hip, z distance below the hip.
+    """
+    def __init__(self, femur_len, tibia_len, cells=WORKSPACE_CELLS):
+        """
+        Args:
+            femur_len, tibia_len: Leg lengths (m)
+            cells: Raster cells per leg length
+        """
+        self.femur_len = femur_len
+        self.tibia_len = tibia_len
+        self.reach = femur_len + tibia_len
+        self.cell = self.reach / cells
+
+        # 1. Raster: reachable + inside both joint limits
+        self.xs = np.arange(-cells, cells + 1) * self.cell
+        self.zs = np.arange(0, cells + 1) * self.cell
+        hip, knee = solve_2dof_array(femur_len, tibia_len, self.xs[None, :], self.zs[:, None])
+        hip_deg, knee_deg = np.degrees(hip), np.degrees(knee)
+        self.reachable = np.isfinite(hip)
+        self.feasible = self.reachable & \
+            (hip_deg >= HIP_LIMIT_DEG[0]) & (hip_deg <= HIP_LIMIT_DEG[1]) & \
+            (knee_deg >= KNEE_LIMIT_DEG[0]) & (knee_deg <= KNEE_LIMIT_DEG[1])
+
+        # 2. Max trot stride per (stance height, step height)
+        self.step_heights = np.linspace(0.0, MAX_STEP_RATIO * self.reach, STEP_HEIGHT_CELLS + 1)
+        self.max_stride_table = self._max_stride_table()
+
+    def _index(self, x, z):
+        """Nearest raster cell (ix, iz) and whether (x, z) is inside the raster."""
+        ix = np.rint(np.asarray(x, dtype=float) / self.cell).astype(int) + (len(self.xs) - 1) // 2
+        iz = np.rint(np.asarray(z, dtype=float) / self.cell).astype(int)
+        inside = (ix >= 0) & (ix < len(self.xs)) & (iz >= 0) & (iz < len(self.zs))
+        return np.clip(ix, 0, len(self.xs) - 1), np.clip(iz, 0, len(self.zs) - 1), inside
+
+    def is_feasible(self, x, z):
+        """True where the foot can reach (x, z) within the joint limits (broadcasts)."""
+        ix, iz, inside = self._index(x, z)
+        return inside & self.feasible[iz, ix]
+
+    def _max_stride_table(self):
+        """
+        For every stance height (raster row) and step height, the longest stride whose
+        whole trot foot path (swing arc + stance drag) stays feasible.
+        One vectorized pass over stance heights and candidate strides per step height.
+        """
+        strides = np.arange(0, len(self.xs)) * self.cell # 0 .. 2 * reach
+        phase = (np.arange(PATH_SAMPLES) + 0.5) / PATH_SAMPLES
+        x_unit, lift_unit = trot_path_array(phase, 1.0, 1.0, 1.0) # Unit stride / height
+
+        table = np.full((len(self.zs), len(self.step_heights)), np.nan)
+        for ih, step_height in enumerate(self.step_heights):
+            # (stance, stride, sample) foot path points
+            z = self.zs[:, None, None] - step_height * lift_unit
+            x = strides[None, :, None] * x_unit
+            ok = self.is_feasible(x, z).all(axis=-1)
+
+            # Longest stride before the first failure
+            first_fail = np.where(ok.all(axis=-1), len(strides), np.argmin(ok, axis=-1))
+            table[:, ih] = np.where(first_fail > 0, strides[np.maximum(first_fail - 1, 0)], np.nan)
+        return table
+
+    def max_stride(self, stance_height, step_height=0.05):
+        """
+        Longest feasible trot stride (m) at this stance / step height, NaN if the
+        stance itself is infeasible. Step height rounds up (conservative).
+        """
+        iz = int(np.clip(np.rint(stance_height / self.cell), 0, len(self.zs) - 1))
+        ih = int(np.searchsorted(self.step_heights, step_height - 1e-12))
+        if ih >= len(self.step_heights): return np.nan
+        return float(self.max_stride_table[iz, ih])
+
+    def gait_feasible(self, stride_length, step_height=0.05, stance_height=None):
+        """Can this leg trot with these parameters inside its joint limits?"""
+        if stance_height is None:
+            stance_height = self.best_stance(step_height)[0]
+            if stance_height is None: return False
+        limit = self.max_stride(stance_height, step_height)
+        return bool(np.isfinite(limit) and stride_length <= limit + 1e-9)
+
+    def best_stance(self, step_height=0.05):
+        """
+        Returns:
+            (stance_height_m, max_stride_m) that allows the longest stride, (None, 0.0) if none
+        """
+        ih = int(np.searchsorted(self.step_heights, step_height - 1e-12))
+        if ih >= len(self.step_heights): return None, 0.0
+        column = np.nan_to_num(self.max_stride_table[:, ih], nan=-1.0)
+        iz = int(np.argmax(column))
+        if column[iz] < 0: return None, 0.0
+        return float(self.zs[iz]), float(column[iz])
+
+    def summary(self, step_height=0.05):
+        """JSON-friendly overview for reports."""
+        stance, stride = self.best_stance(step_height)
+        return {
+            "femur_length_mm": round(self.femur_len * 1000, 1),
+            "tibia_length_mm": round(self.tibia_len * 1000, 1),
+            "reachable_area_cm2": round(float(self.reachable.sum()) * (self.cell * 100) ** 2, 1),
+            "feasible_area_cm2": round(float(self.feasible.sum()) * (self.cell * 100) ** 2, 1),
+            "best_stance_height_mm": round(stance * 1000, 1) if stance is not None else None,
+            "max_stride_mm": round(stride * 1000, 1)
+        }
+
+@lru_cache(maxsize=128)
+def _cached_workspace(femur_len, tibia_len, cells):
+    return LegWorkspace(femur_len, tibia_len, cells)
+
+def get_workspace(femur_len, tibia_len, cells=WORKSPACE_CELLS):
+    """Cached LegWorkspace per leg geometry (lengths rounded to 0.1 mm)."""
+    return _cached_workspace(round(float(femur_len), 4), round(float(tibia_len), 4), cells)
+
+def plan_trot(femur_len, tibia_len, stride_length=DESIGN_STRIDE_M, step_height=DESIGN_STEP_HEIGHT_M,
+              cycle_time=DESIGN_CYCLE_S):
+    """
+    The trot a leg geometry actually plays inside its joint limits: the workspace's best
+    stance for the step height, with the stride clipped to what that stance allows.
+    Physics sizes the legs for the unclipped stride and flags it when within_limits is False.
+
+    Returns:
+        dict: stride_length, step_height, cycle_time, stance_height (m), max_stride (m) and
+        within_limits (the requested stride fits unclipped). None if the leg can't lift
+        its foot step_height inside the limits at any stance.
+    """
+    stance, max_stride = get_workspace(femur_len, tibia_len).best_stance(step_height)
+    if stance is None:
+        return None
+    return {
+        "stride_length": min(stride_length, max_stride),
+        "step_height": step_height,
+        "cycle_time": cycle_time,
+        "stance_height": stance,
+        "max_stride": max_stride,
+        "within_limits": stride_length <= max_stride + 1e-9
+    }
@@ -0,0 +1,259 @@
+import os
+import numpy as np
+import pybullet as p
+import pybullet_data
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.services.ik_service import LEG_NAMES, gait_table, sample_gait, solve_2dof_array
+from app.services.urdf_service import FOOT_RADIUS
+from app.services.workspace_service import DESIGN_CYCLE_S, DESIGN_STEP_HEIGHT_M, DESIGN_STRIDE_M, get_workspace, plan_trot
+
+# --- CONFIGURATION ---
+SETTLE_SEC = 1.0         # Standing still before the gait starts
+WALK_SEC = 4.0
+# Hobby servo model: torque-limited (URDF effort) and slew-limited (URDF velocity), with a soft
+# position loop so tracking the trot doesn't saturate the torque on every tick
+POSITION_GAIN = 0.05     # PyBullet POSITION_CONTROL gains
+VELOCITY_GAIN = 0.3
+TORQUE_PERCENTILE = 95   # Sustained load; the one-tick max is foot-strike impacts at the torque limit
+
+# Verdict thresholds
+MIN_STAND_RATIO = 0.6    # Chassis must stay above this fraction of the stance height
+MAX_TILT_DEG = 30.0
+MIN_WALK_RATIO = 0.25    # Forward progress vs. the ideal stride * steps
+STALL_WARNING = 0.9      # Walking torque / servo limit that counts as "near stall"
+
+# Headless client owned by the current worker process (see _init_worker)
+_WORKER_CLIENT = None
+
+class GaitTestRunner:
+    """
+    Headless PyBullet test for a quadruped URDF (see QuadURDFExporter).
+    Stands the robot up, then plays a precomputed trot table through the joint
+    position servos and reports stand / walk verdicts and stall margins.
+    """
+    def __init__(self, urdf_path, femur_len, tibia_len, stride_length=DESIGN_STRIDE_M, step_height=DESIGN_STEP_HEIGHT_M,
+                 cycle_time=DESIGN_CYCLE_S, stance_height=None, client=None):
+        """
+        Args:
+            urdf_path: Quad URDF (QuadURDFExporter output)
+            femur_len, tibia_len: Leg lengths in meters (must match the URDF)
+            stride_length, step_height, cycle_time: Trot parameters (see ik_service.gait_table), the design trot by default
+            stance_height: Hip-to-foot height (m). None = the workspace's best stance, with the
+                           stride clipped to the joint limits (workspace_service.plan_trot, same as physics)
+            client: Existing PyBullet client id (None = connect a new DIRECT one)
+        """
+        self.urdf_path = urdf_path
+        if stance_height is None:
+            plan = plan_trot(femur_len, tibia_len, stride_length, step_height, cycle_time)
+            if plan is not None:
+                stride_length, stance_height = plan["stride_length"], plan["stance_height"]
+        self.table = gait_table(float(femur_len), float(tibia_len), stride_length, step_height, cycle_time,
+                                stance_height)
+        self.within_limits = get_workspace(femur_len, tibia_len).gait_feasible(
+            stride_length, step_height, self.table["stance_height"])
+        self.owns_client = client is None
+        self.client = p.connect(p.DIRECT) if client is None else client
+        self.dt = 1.0 / 240.0
+
+    def _load(self):
+        """Resets the world and spawns the robot in its stance pose."""
+        c = self.client
+        p.resetSimulation(physicsClientId=c)
+        p.setAdditionalSearchPath(pybullet_data.getDataPath(), physicsClientId=c)
+        p.setGravity(0, 0, -9.81, physicsClientId=c)
+        p.loadURDF("plane.urdf", physicsClientId=c)
+
+        stance = self.table["stance_height"]
+        robot = p.loadURDF(self.urdf_path, [0, 0, stance + FOOT_RADIUS + 0.01],
+                           flags=p.URDF_USE_INERTIA_FROM_FILE, physicsClientId=c)
+
+        joints = {p.getJointInfo(robot, i, physicsClientId=c)[1].decode("utf-8"): i
+                  for i in range(p.getNumJoints(robot, physicsClientId=c))}
+        hips = [joints[f"hip_{leg}"] for leg in LEG_NAMES]
+        knees = [joints[f"knee_{leg}"] for leg in LEG_NAMES]
+        info = [p.getJointInfo(robot, j, physicsClientId=c) for j in hips + knees]
+        limits = np.array([i[10] for i in info])
+        max_vel = np.array([i[11] for i in info])
+
+        hip0, knee0 = solve_2dof_array(self.table["femur_len"], self.table["tibia_len"], 0.0, stance)
+        for j in hips: p.resetJointState(robot, j, float(hip0), physicsClientId=c)
+        for j in knees: p.resetJointState(robot, j, float(knee0), physicsClientId=c)
+        return robot, hips + knees, limits, max_vel, (float(hip0), float(knee0))
+
+    def run(self, walk_sec=WALK_SEC):
+        """
+        Returns:
+            dict with "stands", "walks", "status", forward distance / speed, tilt, and per-joint
+            "peak_torque_ratio" (hip, knee) = TORQUE_PERCENTILE of applied torque / servo limit
+            over steady walking (settling and the first gait cycle excluded) while the chassis is
+            still upright, and "loaded_s" = the walking time those samples cover
+        """
+        c = self.client
+        robot, joints, limits, max_vel, stand_pose = self._load()
+        n_legs = len(LEG_NAMES)
+
+        def command(hip, knee):
+            # Per joint: the array call has no maxVelocity (servo slew limit)
+            for j, target, force, vel in zip(joints, np.concatenate([hip, knee]), limits, max_vel):
+                p.setJointMotorControl2(robot, j, p.POSITION_CONTROL, targetPosition=float(target), force=force,
+                                        maxVelocity=vel, positionGain=POSITION_GAIN, velocityGain=VELOCITY_GAIN,
+                                        physicsClientId=c)
+
+        settle_steps, walk_steps = int(SETTLE_SEC / self.dt), int(walk_sec / self.dt)
+        steady_from = settle_steps + int(self.table["cycle_time"] / self.dt)
+        stance = self.table["stance_height"]
+        torque = []
+        min_z, stand_tilt, walk_tilt = np.inf, 0.0, 0.0
+        stand_z = None
+        start_x = 0.0
+
+        for i in range(settle_steps + walk_steps):
+            if i < settle_steps:
+                command(np.full(n_legs, stand_pose[0]), np.full(n_legs, stand_pose[1]))
+            else:
+                command(*sample_gait(self.table, (i - settle_steps) * self.dt))
+            p.stepSimulation(physicsClientId=c)
+
+            pos, quat = p.getBasePositionAndOrientation(robot, physicsClientId=c)
+            roll, pitch, _ = p.getEulerFromQuaternion(quat, physicsClientId=c)
+            tilt = max(abs(roll), abs(pitch))
+            # Servo load only counts while the legs carry the body (not once it has tipped over)
+            upright = np.degrees(tilt) < MAX_TILT_DEG and pos[2] >= MIN_STAND_RATIO * stance
+            if i >= steady_from and upright:
+                torque.append([s[3] for s in p.getJointStates(robot, joints, physicsClientId=c)])
+            if i < settle_steps:
+                stand_tilt = max(stand_tilt, tilt)
+            else:
+                walk_tilt = max(walk_tilt, tilt)
+                min_z = min(min_z, pos[2])
+            if i == settle_steps - 1:
+                stand_z, start_x = pos[2], pos[0]
+
+        end_x = p.getBasePositionAndOrientation(robot, physicsClientId=c)[0][0]
+        tilt_deg = float(np.degrees(max(stand_tilt, walk_tilt)))
+
+        stands = stand_z is not None and stand_z >= MIN_STAND_RATIO * stance and \
+            np.degrees(stand_tilt) < MAX_TILT_DEG
+        ideal = self.table["stride_length"] * 2.0 * walk_sec / self.table["cycle_time"] # 2 steps per cycle
+        distance = end_x - start_x
+        walks = stands and np.degrees(walk_tilt) < MAX_TILT_DEG and min_z >= MIN_STAND_RATIO * stance and \
+            distance >= MIN_WALK_RATIO * ideal
+
+        ratio = np.abs(np.array(torque).reshape(-1, len(joints))) / limits
+        if not len(ratio): ratio = np.zeros((1, len(joints))) # Walk shorter than one gait cycle / fell over
+        peak_ratio = {"hip": round(float(np.percentile(ratio[:, :n_legs], TORQUE_PERCENTILE)), 3),
+                      "knee": round(float(np.percentile(ratio[:, n_legs:], TORQUE_PERCENTILE)), 3)}
+        warnings = [f"{joint} servos reach {r * 100:.0f}% of stall torque"
+                    for joint, r in peak_ratio.items() if r >= STALL_WARNING]
+        if not self.within_limits:
+            warnings.append("Gait leaves the joint limits (servos clamp the commanded path)")
+
+        return {
+            "status": "PASS" if walks else "FAIL",
+            "stands": bool(stands),
+            "walks": bool(walks),
+            "stand_height_m": round(stand_z, 3) if stand_z is not None else None,
+            "min_height_m": round(min_z, 3),
+            "max_tilt_deg": round(tilt_deg, 1),
+            "distance_m": round(distance, 3),
+            "speed_m_s": round(distance / walk_sec, 3),
+            "ideal_distance_m": round(ideal, 3),
+            "within_joint_limits": bool(self.within_limits),
+            "gait": {"stride_length_m": round(self.table["stride_length"], 4), "step_height_m": self.table["step_height"],
+                     "cycle_s": self.table["cycle_time"], "stance_height_m": round(self.table["stance_height"], 4)},
+            "peak_torque_ratio": peak_ratio,
+            "loaded_s": round(len(torque) * self.dt, 3),
+            "warnings": warnings
+        }
+
+    def close(self):
+        if self.owns_client:
+            p.disconnect(physicsClientId=self.client)
+
+def _init_worker():
+    """Pool initializer: connects the worker's single DIRECT client."""
+    global _WORKER_CLIENT
+    _WORKER_CLIENT = p.connect(p.DIRECT)
+
+def _run_job(job):
+    """Worker entry point: one robot, reusing the worker's client."""
+    runner = GaitTestRunner(job["urdf_path"], job["femur_len"], job["tibia_len"], client=_WORKER_CLIENT,
+                            **job.get("gait", {}))
+    try:
+        result = runner.run(job.get("walk_sec", WALK_SEC))
+    except Exception as e:
+        result = {"status": "FAIL", "error": str(e)}
+    result["sku_id"] = job.get("sku_id")
+    return result
+
+def run_gait_fleet(jobs, max_workers=None):
+    """
+    Walk-tests many robots over a process pool (one DIRECT client per worker).
+
+    Args:
+        jobs: List of dicts with sku_id, urdf_path, femur_len, tibia_len (m), optional "gait" kwargs
+
+    Returns:
+        Results in submission order
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_job, job): idx for idx, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                results[idx] = {"sku_id": jobs[idx].get("sku_id"), "status": "FAIL", "error": str(e)}
+            print(f"   [{done}/{len(jobs)}] {results[idx]['sku_id']}: {results[idx]['status']}")
+    return results
+
+# --- TEST HARNESS ---
+if __name__ == "__main__":
+    from app.services.physics_service import generate_physics_config
+    from app.services.urdf_service import QuadURDFExporter
+
+    def servo_urdf(torque_kgcm, femur_mm=100.0):
+        """Test robot (fallback part weights) with the mass physics_service computes for its BOM."""
+        bom = [{"part_type": "Actuators", "quantity": 8, "engineering_specs": {"est_torque_kgcm": torque_kgcm}},
+               {"part_type": "Chassis_Kit", "engineering_specs": {"femur_length_mm": femur_mm}},
+               {"part_type": "Single_Board_Computer"}, {"part_type": "Servo_Controller"}, {"part_type": "Battery"}]
+        physics = generate_physics_config(bom)
+        print(f"   Physics: {physics['torque_physics']['required_kgcm']}kg.cm required "
+              f"(model {physics['torque_physics']['model_kgcm']}) | {physics['viability']}")
+        return QuadURDFExporter().generate_robot_urdf(
+            {"sku_id": f"quad_test_{torque_kgcm}kgcm_{femur_mm:.0f}mm", "technical_data": {"physics_config": physics}},
+            bom=bom)
+
+    urdf = servo_urdf(25)
+
+    # Design trot (generate_trot_path defaults) on the default legs: stride clipped to the joint limits
+    # (runner default) vs. as specified at the default 0.85 stance (outside the hip limits), then on the
+    # 1.2x femur the optimizer sizes for it
+    for label, path, legs, gait in (
+            ("clipped", urdf, (0.1, 0.11), {}),
+            ("as specified", urdf, (0.1, 0.11), {"stance_height": 0.85 * 0.21}),
+            ("sized legs", servo_urdf(60, 120.0), (0.12, 0.132), {})):
+        runner = GaitTestRunner(path, *legs, **gait)
+        report = runner.run()
+        runner.close()
+        print(f"🐕 Walk Test {label}: {report['status']} | Stands={report['stands']} Walks={report['walks']} | "
+              f"{report['distance_m']}m at {report['speed_m_s']}m/s | Tilt {report['max_tilt_deg']}° | "
+              f"In limits {report['within_joint_limits']} | Stall {report['peak_torque_ratio']} "
+              f"over {report['loaded_s']}s upright")
+
+    # Same robot, stronger servos: the stall ratio has to drop
+    ratios = {}
+    for torque_kgcm in (10, 25, 60):
+        runner = GaitTestRunner(servo_urdf(torque_kgcm), 0.1, 0.11)
+        report = runner.run()
+        runner.close()
+        ratios[torque_kgcm] = report["peak_torque_ratio"]
+        print(f"🦾 {torque_kgcm} kg·cm servos: {report['status']} ({report['distance_m']}m) | Stall {ratios[torque_kgcm]}")
+    monotonic = all(ratios[a][j] > ratios[b][j] for a, b in ((10, 25), (25, 60)) for j in ("hip", "knee"))
+    print(f"{'✅' if monotonic else '❌'} Stall ratio drops with servo torque: {monotonic}")
+
+    jobs = [{"sku_id": f"quad_{k}", "urdf_path": urdf, "femur_len": 0.1, "tibia_len": 0.11} for k in range(4)]
+    for row in run_gait_fleet(jobs):
+        print(f"   {row['sku_id']}: {row['status']} ({row.get('distance_m')}m)")
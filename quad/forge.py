@@ -170,18 +170,15 @@ async def main():
                     print(f"      -> {fix['diagnosis']} -> {fix['action']}")
                     
                     # --- CAPTURE GEOMETRY CHANGES ---
-                    # If optimizer suggests modifying geometry (e.g. shortening femur),
-                    # we capture the 'param_change' dictionary.
+                    # param_change holds multipliers on the analyzed geometry,
+                    # e.g. {'femur_length_mm': 0.85} shortens the femur by 15%.
+                    # Scaled from the physics geometry (not compounded); the later fix
+                    # (gait reachability) wins when two fixes touch the same length.
                     if fix.get('type') == 'MODIFY_GEOMETRY' and 'param_change' in fix:
-                        # Example: fix['param_change'] might be {'femur_length_mm': 0.85} (multiplier)
-                        # or specific values.
-                        # Assuming here that we want to apply a specific override or multiplier.
-                        # For simplicity in this loop, let's assume we hardcode the intended geometric fix
-                        # if the Action mentions shortening legs.
-                        if "femur" in str(fix.get('action', '')).lower():
-                             # Default was 100mm, let's set to 85mm per typical optimizer suggestion
-                             optimized_params['femur_length_mm'] = 85.0
-                             optimized_params['tibia_length_mm'] = 95.0
+                        geometry = physics_cfg.get('geometry', {})
+                        for key, factor in fix['param_change'].items():
+                            if geometry.get(key):
+                                optimized_params[key] = round(float(geometry[key]) * float(factor), 1)
 
                 print("      -> Applying theoretical patches to proceed to CAD...")
                 physics_cfg['torque_physics']['safety_margin'] = 2.0 # Force pass